@@ -0,0 +1,72 @@
+from datetime import datetime
+import click
+from flask import Flask
+from flask_login import LoginManager
+from flask_cors import CORS # Essencial para o App
+from config import Config
+
+login_manager = LoginManager()
+login_manager.login_view = 'public.login'
+
+def create_app(config_class=Config):
+    """Monta o app. Não toca no banco: schema e admin inicial ficam no 'flask bootstrap' (app/cli.py)."""
+    from app.models import db, User
+    from app import db_routing, ligas, changes, publisher, prerender, compression, queries, pontuacao, cubo, recordes, notificacoes, tarefas, auditoria, videos, cli
+
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    # Compressão gzip/brotli (registrada primeiro para rodar por último no after_request)
+    compression.init_app(app)
+
+    # Inicialização do Banco de Dados
+    db.init_app(app)
+    db_routing.init_app(app, db) # Engine somente leitura para GETs
+    ligas.init_app(app) # Um banco por liga (LIGAS_ARQUIVO)
+    queries.init_app(app, db) # Limite de consultas por tela (QUERY_BUDGETS)
+
+    # Rastreamento de alterações e snapshots estáticos da API
+    publisher.init_app(app)
+    prerender.init_app(app)
+    pontuacao.init_app(app)
+    cubo.init_app(app)
+    recordes.init_app(app)
+    notificacoes.init_app(app) # Avisos aos pilotos (caixa de saída + worker)
+    tarefas.init_app(app) # Operações pesadas do admin em lotes (fila + worker)
+    auditoria.init_app(app) # Trilha das ações do admin (gravada em lotes em segundo plano)
+    videos.init_app(app) # Vídeos dos protestos enviados em partes
+    cli.init_app(app)
+
+    # Habilita o CORS para permitir que o App acesse a API
+    CORS(app)
+
+    # Migrações: só os comandos 'flask db ...' precisam do Flask-Migrate (e do alembic,
+    # que é pesado de importar). Workers do gunicorn não rodam dentro de um comando click.
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    # Configuração de Login
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        # Sessão aberta em outra liga não vale aqui
+        user_id = ligas.user_id_da_sessao(user_id)
+        if user_id is None:
+            return None
+        return User.query.get(user_id)
+
+    @app.context_processor
+    def inject_now():
+        return {'now_year': datetime.utcnow().year}
+
+    # Registro das Rotas (Blueprints)
+    from app.routes.public import public_bp
+    from app.routes.admin import admin_bp
+    from app.routes.api import api_bp
+    app.register_blueprint(public_bp)
+    app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(api_bp, url_prefix='/api') # Registra com prefixo /api
+
+    return app
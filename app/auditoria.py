@@ -0,0 +1,209 @@
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+from flask import current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event, inspect, select
+from app.db_routing import SessaoRoteada
+from app.ligas import liga_atual
+from app.models import db, Auditoria
+
+# --- AUDITORIA DO PAINEL ADMIN ---
+# Toda alteração feita numa requisição do blueprint admin vira uma linha de
+# Auditoria: quem (admin), onde (rota), o quê (entidade/id) e os campos-chave
+# antes e depois. Nada é gravado durante a requisição: as linhas esperam na
+# sessão até o commit (rollback descarta) e vão para um buffer em memória do
+# processo, que um gravador em segundo plano insere em lotes, um INSERT por
+# lote e por liga. A requisição não paga escrita nem lock a mais.
+#
+# O buffer vive na memória do worker: se o processo morrer sem sair direito,
+# perdem-se no máximo os últimos AUDITORIA_INTERVALO segundos.
+#
+# A trilha é só de inserção também no banco: triggers abortam qualquer UPDATE ou
+# DELETE na tabela (criados pelo 'flask bootstrap' e pela migração b7d3e1a9c5f2).
+
+# Campos registrados de cada modelo (os demais não entram na trilha)
+CAMPOS = {
+    'User': ('username', 'email', 'role', 'password_hash'),
+    'PilotProfile': ('nickname', 'nome_real', 'grid', 'team_id', 'pontos_cnh', 'advertencias_acumuladas',
+                     'penalidade_campeonato', 'motivo_penalidade', 'telefone', 'foto_url'),
+    'Team': ('nome', 'grid', 'ativa', 'logo_url'),
+    'Season': ('nome', 'ativa', 'data_inicio'),
+    'Race': ('season_id', 'nome_gp', 'pista', 'data_corrida', 'grid', 'status', 'tipo_etapa'),
+    'RaceResult': ('race_id', 'pilot_id', 'team_id', 'posicao', 'pontos_ganhos', 'dnf', 'dsq', 'volta_rapida',
+                   'piloto_do_dia', 'piloto_torcida', 'ausencia'),
+    'Protesto': ('etapa_id', 'acusador_id', 'acusado_id', 'status', 'veredito_final', 'justificativa_texto'),
+    'VotoComissario': ('protesto_id', 'escolha'),
+    'News': ('titulo', 'subtitulo', 'imagem_url'),
+    'Invite': ('token', 'email', 'used'),
+    'SeletivaEntry': ('pilot_id', 'tempo_str'),
+}
+
+# Registrados só como alterados, nunca com o valor
+SIGILOSOS = {'password_hash'}
+
+CRIADO, ATUALIZADO, REMOVIDO = 'CRIADO', 'ATUALIZADO', 'REMOVIDO'
+
+TRAVAS = (
+    "CREATE TRIGGER IF NOT EXISTS auditoria_sem_update BEFORE UPDATE ON auditoria "
+    "BEGIN SELECT RAISE(ABORT, 'auditoria: somente inserção'); END",
+    "CREATE TRIGGER IF NOT EXISTS auditoria_sem_delete BEFORE DELETE ON auditoria "
+    "BEGIN SELECT RAISE(ABORT, 'auditoria: somente inserção'); END",
+)
+
+def criar_travas(conexao):
+    """Triggers que tornam a tabela auditoria append-only (idempotente)."""
+    for sql in TRAVAS:
+        conexao.exec_driver_sql(sql)
+
+def _auditando():
+    return (has_request_context() and request.blueprint == 'admin'
+            and current_user and current_user.is_authenticated)
+
+def _valor(campo, valor):
+    if campo in SIGILOSOS and valor is not None:
+        return '***'
+    return valor
+
+def campos(obj):
+    """Campos-chave atuais de obj (sem carregar nada do banco)."""
+    valores = inspect(obj).dict
+    return {c: _valor(c, valores.get(c)) for c in CAMPOS.get(type(obj).__name__, ())}
+
+def _pendentes(session):
+    return session.info.setdefault('auditoria', [])
+
+def _linha(acao, entidade, entidade_id, antes=None, depois=None):
+    return {
+        'data': datetime.utcnow(),
+        'admin_id': current_user.id,
+        'admin_nome': current_user.username,
+        'rota': request.endpoint,
+        'acao': acao,
+        'entidade': entidade,
+        'entidade_id': entidade_id,
+        'antes': json.dumps(antes, default=str, ensure_ascii=False) if antes is not None else None,
+        'depois': json.dumps(depois, default=str, ensure_ascii=False) if depois is not None else None,
+    }
+
+def registrar(acao, entidade, entidade_id=None, antes=None, depois=None):
+    """Registra uma ação que o ORM não enxerga sozinho (ex: agendar uma exclusão). Vale a partir do próximo commit."""
+    if _auditando():
+        _pendentes(db.session).append(_linha(acao, entidade, entidade_id, antes, depois))
+
+@event.listens_for(SessaoRoteada, 'after_flush')
+def _after_flush(session, _ctx):
+    if not _auditando():
+        return
+    linhas = _pendentes(session)
+    for obj in session.new:
+        if type(obj).__name__ in CAMPOS:
+            linhas.append(_linha(CRIADO, type(obj).__name__, obj.id, depois=campos(obj)))
+    for obj in session.deleted:
+        if type(obj).__name__ in CAMPOS:
+            linhas.append(_linha(REMOVIDO, type(obj).__name__, obj.id, antes=campos(obj)))
+    for obj in session.dirty:
+        modelo = type(obj).__name__
+        if modelo not in CAMPOS:
+            continue
+        estado = inspect(obj)
+        antes, depois = {}, {}
+        for campo in CAMPOS[modelo]:
+            hist = estado.attrs[campo].history
+            if hist.added or hist.deleted:
+                antes[campo] = _valor(campo, hist.deleted[0] if hist.deleted else None)
+                depois[campo] = _valor(campo, hist.added[0] if hist.added else None)
+        if depois:
+            linhas.append(_linha(ATUALIZADO, modelo, obj.id, antes, depois))
+
+@event.listens_for(SessaoRoteada, 'do_orm_execute')
+def _do_orm_execute(orm_state):
+    # DELETE/UPDATE em massa (Query.delete()) não passam pelo flush: o "antes" vem do mesmo WHERE
+    if not (orm_state.is_delete or orm_state.is_update) or orm_state.bind_mapper is None or not _auditando():
+        return
+    classe = orm_state.bind_mapper.class_
+    modelo = classe.__name__
+    if modelo not in CAMPOS or orm_state.statement.whereclause is None:
+        return
+    acao = REMOVIDO if orm_state.is_delete else ATUALIZADO
+    consulta = select(classe.id, *[getattr(classe, c) for c in CAMPOS[modelo]]).where(orm_state.statement.whereclause)
+    linhas = _pendentes(orm_state.session)
+    for id_, *valores in orm_state.session.execute(consulta):
+        linhas.append(_linha(acao, modelo, id_, antes={c: _valor(c, v) for c, v in zip(CAMPOS[modelo], valores)}))
+
+@event.listens_for(SessaoRoteada, 'after_commit')
+def _after_commit(session):
+    linhas = session.info.pop('auditoria', None)
+    if linhas and has_request_context():
+        current_app.extensions['auditoria'].enfileirar(liga_atual(), linhas)
+
+@event.listens_for(SessaoRoteada, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('auditoria', None)
+
+# --- GRAVADOR EM SEGUNDO PLANO ---
+
+class Gravador:
+    """Buffer do processo ({liga: [linhas]}) e a thread que o descarrega em lotes."""
+
+    def __init__(self, app):
+        self.app = app
+        self.fila = {}
+        self.trava = threading.Lock()
+        self.acordar = threading.Event()
+        self.pid = None
+
+    def enfileirar(self, liga, linhas):
+        with self.trava:
+            self.fila.setdefault(liga, []).extend(linhas)
+            cheio = sum(map(len, self.fila.values())) >= self.app.config.get('AUDITORIA_LOTE', 200)
+            # Thread criada no próprio processo (depois do fork dos workers do gunicorn)
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                threading.Thread(target=self._laco, name='auditoria', daemon=True).start()
+        if cheio:
+            self.acordar.set()
+
+    def _laco(self):
+        while True:
+            self.acordar.wait(self.app.config.get('AUDITORIA_INTERVALO', 2))
+            self.acordar.clear()
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava tudo o que está no buffer: um INSERT em lote por liga."""
+        with self.trava:
+            fila, self.fila = self.fila, {}
+        for liga, linhas in fila.items():
+            try:
+                with self.app.app_context():
+                    g.liga = liga
+                    db.session.execute(Auditoria.__table__.insert(), linhas)
+                    db.session.commit()
+            except Exception:
+                # Banco ocupado ou fora do ar: as linhas voltam para a próxima passada
+                self.app.logger.exception('Falha ao gravar %d linhas de auditoria', len(linhas))
+                with self.trava:
+                    self.fila[liga] = linhas + self.fila.get(liga, [])
+
+def consultar(entidade=None, entidade_id=None, admin_id=None, antes_de=None, limite=50):
+    """Linhas mais recentes primeiro, por entidade (e id) ou por admin; antes_de é o cursor (id da última linha vista)."""
+    consulta = Auditoria.query
+    if entidade:
+        consulta = consulta.filter(Auditoria.entidade == entidade)
+        if entidade_id is not None:
+            consulta = consulta.filter(Auditoria.entidade_id == entidade_id)
+    if admin_id is not None:
+        consulta = consulta.filter(Auditoria.admin_id == admin_id)
+    if antes_de:
+        consulta = consulta.filter(Auditoria.id < antes_de)
+    linhas = consulta.order_by(Auditoria.id.desc()).limit(limite + 1).all()
+    return linhas[:limite], (linhas[limite - 1].id if len(linhas) > limite else None)
+
+def init_app(app):
+    gravador = Gravador(app)
+    app.extensions['auditoria'] = gravador
+    # Saída normal do processo (deploy, restart do worker): grava o que sobrou
+    atexit.register(gravador.descarregar)
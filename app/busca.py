@@ -0,0 +1,116 @@
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import text
+from app.models import db
+
+# --- BUSCA TEXTUAL (SQLITE FTS5) ---
+# Um índice FTS5 de conteúdo externo para cada tabela pesquisável: o índice
+# guarda só os termos e lê o texto da própria tabela. Triggers no banco mantêm
+# o índice em dia em qualquer INSERT/UPDATE/DELETE (inclusive os feitos fora do
+# ORM), então nenhuma rota precisa lembrar de atualizá-lo.
+#
+# Os índices são criados pelo 'flask bootstrap' (criar_indices é idempotente) e
+# pela migração 9d1f4b2c6e80, que tem a sua própria cópia do SQL: mudar um índice
+# aqui pede uma migração nova. As tabelas busca_* ficam fora do autogenerate
+# do Alembic (migrations/env.py). Acentos são ignorados: "punicao" acha "punição".
+
+# tipo: (tabela FTS, tabela de origem, colunas, pesos no bm25, título, detalhe)
+INDICES = {
+    'noticias': ('busca_news', 'news', ('titulo', 'subtitulo', 'texto'), (10.0, 5.0, 1.0),
+                 'titulo', "(SELECT strftime('%d/%m/%Y', data_publicacao) FROM news WHERE id = busca_news.rowid)"),
+    'pilotos': ('busca_piloto', 'pilot_profile', ('nickname', 'nome_real'), (10.0, 5.0),
+                'nickname', '(SELECT grid FROM pilot_profile WHERE id = busca_piloto.rowid)'),
+    'equipes': ('busca_equipe', 'team', ('nome',), (10.0,),
+                'nome', '(SELECT grid FROM team WHERE id = busca_equipe.rowid)'),
+    'protestos': ('busca_protesto', 'protesto', ('descricao', 'argumento_defesa', 'justificativa_texto'), (3.0, 2.0, 2.0),
+                  "'Protesto #' || busca_protesto.rowid",
+                  "(SELECT status || coalesce(' · ' || veredito_final, '') FROM protesto WHERE id = busca_protesto.rowid)"),
+}
+
+# Tipos que a /api/search devolve para qualquer um (protestos só para a Direção de Prova)
+TIPOS_PUBLICOS = ('noticias', 'pilotos', 'equipes')
+# Colunas que a busca pública pode casar e mostrar no trecho; as demais (nome real do piloto)
+# só na busca da Direção de Prova, como nas páginas públicas
+COLUNAS_PUBLICAS = {'pilotos': ('nickname',)}
+
+# Marcadores do termo encontrado no trecho (destacar() troca por <mark> depois de escapar o texto)
+INICIO_DESTAQUE, FIM_DESTAQUE = '\x02', '\x03'
+
+def _comandos(fts, origem, colunas):
+    lista = ', '.join(colunas)
+    novos = ', '.join(f'new.{c}' for c in colunas)
+    antigos = ', '.join(f'old.{c}' for c in colunas)
+    remover = f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos});"
+    inserir = f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({lista}, content='{origem}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {origem} BEGIN {inserir} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {origem} BEGIN {remover} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {lista} ON {origem} BEGIN {remover} {inserir} END",
+    ]
+
+def criar_indices(conexao):
+    """Cria os índices FTS5 e os triggers que faltam e indexa o que já existe. Pode rodar várias vezes."""
+    if conexao.dialect.name != 'sqlite':
+        return
+    existentes = {nome for (nome,) in conexao.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    for fts, origem, colunas, *_ in INDICES.values():
+        for comando in _comandos(fts, origem, colunas):
+            conexao.execute(text(comando))
+        if fts not in existentes:
+            conexao.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+def remover_indices(conexao):
+    for fts, *_ in INDICES.values():
+        for sufixo in ('ai', 'ad', 'au'):
+            conexao.execute(text(f'DROP TRIGGER IF EXISTS {fts}_{sufixo}'))
+        conexao.execute(text(f'DROP TABLE IF EXISTS {fts}'))
+
+def consulta_fts(termo):
+    """Texto digitado -> consulta FTS5: cada palavra vira um prefixo entre aspas (sem sintaxe do usuário)."""
+    palavras = re.findall(r'\w+', termo or '')[:10]
+    return ' '.join(f'"{p}"*' for p in palavras)
+
+def buscar(termo, tipos=None, pagina=1, por_pagina=20, publica=False):
+    """Resultados de todos os tipos pedidos numa só lista ordenada por relevância (bm25), paginada.
+
+    Com publica=True, os tipos de COLUNAS_PUBLICAS só casam (e mostram trecho) nessas colunas.
+    """
+    tipos = [t for t in (tipos or INDICES) if t in INDICES]
+    pagina, por_pagina = max(pagina, 1), min(max(por_pagina, 1), 50)
+    consulta = consulta_fts(termo)
+    vazio = {'termo': termo or '', 'total': 0, 'pagina': pagina, 'por_pagina': por_pagina, 'paginas': 0, 'resultados': []}
+    if not consulta or not tipos:
+        return vazio
+
+    parametros = {'consulta': consulta, 'inicio': INICIO_DESTAQUE, 'fim': FIM_DESTAQUE,
+                  'limite': por_pagina, 'deslocamento': (pagina - 1) * por_pagina}
+    partes, contagens = [], []
+    for tipo in tipos:
+        fts, _, colunas, pesos, titulo, detalhe = INDICES[tipo]
+        casar, coluna_trecho = ':consulta', -1
+        if publica and tipo in COLUNAS_PUBLICAS:
+            # Filtro de coluna do FTS5: {col ...} : (consulta)
+            casar = f':consulta_{tipo}'
+            parametros[f'consulta_{tipo}'] = f"{{{' '.join(COLUNAS_PUBLICAS[tipo])}}} : ({consulta})"
+            coluna_trecho = colunas.index(COLUNAS_PUBLICAS[tipo][0])
+        partes.append(
+            f"SELECT '{tipo}' AS tipo, {fts}.rowid AS id, {titulo} AS titulo, {detalhe} AS detalhe, "
+            f"snippet({fts}, {coluna_trecho}, :inicio, :fim, '…', 16) AS trecho, "
+            f"bm25({fts}, {', '.join(map(str, pesos))}) AS relevancia FROM {fts} WHERE {fts} MATCH {casar}"
+        )
+        contagens.append(f'SELECT count(*) FROM {fts} WHERE {fts} MATCH {casar}')
+
+    total = db.session.execute(text(f"SELECT {' + '.join(f'({c})' for c in contagens)}"), parametros).scalar() or 0
+    linhas = db.session.execute(text(
+        ' UNION ALL '.join(partes) + ' ORDER BY relevancia, tipo, id LIMIT :limite OFFSET :deslocamento'
+    ), parametros).mappings().all()
+    return {**vazio, 'total': total, 'paginas': -(-total // por_pagina), 'resultados': [dict(l) for l in linhas]}
+
+def destacar(trecho):
+    """Trecho em HTML com o termo em <mark>; o resto é escapado (o texto vem de pilotos e admins)."""
+    return Markup(str(escape(trecho or '')).replace(INICIO_DESTAQUE, '<mark>').replace(FIM_DESTAQUE, '</mark>'))
+
+def sem_destaque(trecho):
+    return (trecho or '').replace(INICIO_DESTAQUE, '').replace(FIM_DESTAQUE, '')
@@ -0,0 +1,330 @@
+import json
+import secrets
+from functools import lru_cache
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert as upsert
+from app.db_routing import SessaoRoteada
+from app.ligas import banco_atual
+from app.queries import fora_do_limite
+from app.models import db, DataVersion, ChangeLog, SeasonVersion, Race, Tarefa
+
+# --- RASTREAMENTO DE ALTERAÇÕES ---
+# Registra quais entidades públicas mudaram em cada transação e, depois do
+# commit, avisa os interessados (snapshots da API, páginas estáticas, etc).
+# Para cada modelo guardamos os ids alterados e alguns atributos de referência
+# (valor atual e anterior) para que cada ouvinte saiba o que precisa refazer.
+#
+# A transação da escrita incrementa a versão dos dados e agenda, nela mesma, uma
+# tarefa PUBLICAR com as alterações; os ouvintes rodam no 'flask tarefas worker'
+# (app/tarefas.py), que junta as publicações da fila.
+
+MODELOS_RASTREADOS = {
+    'News': (),
+    'Season': (),
+    'Race': ('season_id', 'grid'),
+    'RaceResult': ('race_id', 'pilot_id', 'team_id'),
+    'PilotProfile': ('grid', 'team_id'),
+    'Team': ('grid',),
+    'Protesto': ('etapa_id', 'acusado_id'),
+}
+
+# Entidades expostas no /api/changes (sincronização incremental do app)
+ENTIDADES_SINCRONIZADAS = ('Race', 'RaceResult', 'PilotProfile', 'Team', 'News', 'Season')
+
+CRIADO, ATUALIZADO, REMOVIDO = 'CRIADO', 'ATUALIZADO', 'REMOVIDO'
+
+# Dados derivados por temporada (cubo, confrontos, evolução, projeção) seguem a versão da
+# temporada: notícias, check-ins ou escritas em outra temporada não os descartam.
+# Campos do perfil usados por eles valem para todas as temporadas (SeasonVersion 0).
+TODAS_AS_TEMPORADAS = 0
+CAMPOS_PILOTO_TEMPORADA = ('nickname', 'grid', 'team_id', 'penalidade_campeonato')
+
+_ouvintes = []
+
+class Alteracoes:
+    def __init__(self):
+        self.ids = {}
+        self.refs = {}
+        self.campos = {}
+
+    def __bool__(self):
+        return bool(self.ids)
+
+    def __contains__(self, modelo):
+        return modelo in self.ids
+
+    def registrar(self, modelo, id_, referencias, campos=None):
+        # campos=None: linha criada/removida (todas as colunas contam como alteradas)
+        self.ids.setdefault(modelo, set()).add(id_)
+        self.campos.setdefault(modelo, set()).update(campos if campos is not None else ['*'])
+        for attr, valores in referencias.items():
+            self.refs.setdefault((modelo, attr), set()).update(v for v in valores if v is not None)
+
+    def ids_de(self, modelo):
+        return self.ids.get(modelo, set())
+
+    def refs_de(self, modelo, attr):
+        return self.refs.get((modelo, attr), set())
+
+    def mudou(self, modelo, *campos):
+        alterados = self.campos.get(modelo, set())
+        return '*' in alterados or bool(alterados.intersection(campos))
+
+    def para_json(self):
+        return {'ids': {m: list(ids) for m, ids in self.ids.items()},
+                'refs': [[m, a, list(v)] for (m, a), v in self.refs.items()],
+                'campos': {m: list(c) for m, c in self.campos.items()}}
+
+    @classmethod
+    def de_json(cls, dados):
+        alt = cls()
+        alt.ids = {m: set(ids) for m, ids in dados['ids'].items()}
+        alt.refs = {(m, a): set(v) for m, a, v in dados['refs']}
+        alt.campos = {m: set(c) for m, c in dados['campos'].items()}
+        return alt
+
+    def mesclar(self, outra):
+        for modelo, ids in outra.ids.items():
+            self.ids.setdefault(modelo, set()).update(ids)
+        for chave, valores in outra.refs.items():
+            self.refs.setdefault(chave, set()).update(valores)
+        for modelo, campos in outra.campos.items():
+            self.campos.setdefault(modelo, set()).update(campos)
+
+def ao_confirmar(funcao):
+    """Registra uma função chamada com as Alteracoes de cada commit (fora da transação)."""
+    _ouvintes.append(funcao)
+    return funcao
+
+def _pendentes(session):
+    return session.info.setdefault('alteracoes', Alteracoes())
+
+def _incrementar_versao(session):
+    # Uma vez por transação, na mesma conexão da escrita (commit atômico com os dados)
+    if 'versao_transacao' not in session.info:
+        tabela = DataVersion.__table__
+        conexao = session.connection()
+        if conexao.execute(tabela.update().where(tabela.c.id == 1).values(versao=tabela.c.versao + 1)).rowcount == 0:
+            conexao.execute(tabela.insert().values(id=1, versao=1))
+        session.info['versao_transacao'] = conexao.execute(select(tabela.c.versao).where(tabela.c.id == 1)).scalar()
+    return session.info['versao_transacao']
+
+def versao_dados():
+    """Versão global dos dados públicos; muda sempre que alguma entidade rastreada é confirmada."""
+    return db.session.query(DataVersion.versao).filter_by(id=1).scalar() or 0
+
+def versao_temporada(season_id):
+    """Versão dos dados da temporada; muda só com escritas que a afetam (corridas, resultados, protestos, pilotos)."""
+    return db.session.query(func.max(SeasonVersion.versao))\
+        .filter(SeasonVersion.season_id.in_([season_id, TODAS_AS_TEMPORADAS])).scalar() or 0
+
+def _versao(season_id):
+    # Requisições somente leitura não mudam a versão: uma consulta por temporada serve para todos os dados da tela
+    ler = versao_dados if season_id is None else lambda: versao_temporada(season_id)
+    if not (has_request_context() and g.get('somente_leitura')):
+        return ler()
+    if 'versoes' not in g:
+        g.versoes = {}
+    if season_id not in g.versoes:
+        g.versoes[season_id] = ler()
+    return g.versoes[season_id]
+
+def por_versao(cache, chave, montar, season_id=None):
+    """Dado derivado (projeção, confrontos...) montado uma vez por versão neste worker.
+
+    Com season_id vale a versão da temporada (versao_temporada), senão a versão global.
+    cache é um dict do módulo que usa ({(banco, chave): (versão, valor)}); na falta ou
+    com a versão mudada, chama montar(versao).
+    """
+    versao = _versao(season_id)
+    banco = banco_atual()
+    guardado = cache.get((banco, chave))
+    if guardado is None or guardado[0] != versao:
+        with fora_do_limite():
+            guardado = (versao, montar(versao))
+        cache[(banco, chave)] = guardado
+    return guardado[1]
+
+def _gravar_log(session, registros):
+    # registros: [(modelo, id, acao)]. Incrementa a versão e grava o change log na mesma transação.
+    if not registros:
+        return
+    versao = _incrementar_versao(session)
+    linhas = [{'versao': versao, 'entidade': modelo, 'entidade_id': id_, 'acao': acao}
+              for modelo, id_, acao in registros if modelo in ENTIDADES_SINCRONIZADAS]
+    if linhas:
+        session.connection().execute(ChangeLog.__table__.insert(), linhas)
+
+def _registrar_objeto(session, registros, obj, acao):
+    modelo = type(obj).__name__
+    if modelo not in MODELOS_RASTREADOS:
+        return
+    estado = inspect(obj)
+    referencias = {}
+    for attr in MODELOS_RASTREADOS[modelo]:
+        hist = estado.attrs[attr].history
+        referencias[attr] = list(hist.added) + list(hist.unchanged) + list(hist.deleted)
+    campos = None
+    if acao == ATUALIZADO:
+        campos = [c.key for c in estado.mapper.column_attrs if estado.attrs[c.key].history.has_changes()]
+    _pendentes(session).registrar(modelo, obj.id, referencias, campos)
+    registros.append((modelo, obj.id, acao))
+
+# --- CASCATAS DO BANCO ---
+# As linhas apagadas (ON DELETE CASCADE) ou anuladas (SET NULL) pelo próprio banco
+# não passam pelo ORM: antes de cada DELETE buscamos as rastreadas que serão atingidas.
+
+@lru_cache(maxsize=None)
+def _cascatas(tabela):
+    """[(classe, coluna, ondelete)] das tabelas mapeadas cujas FKs para `tabela` têm ON DELETE CASCADE/SET NULL."""
+    filhos = []
+    for mapper in db.Model.registry.mappers:
+        if 'id' not in mapper.columns:
+            continue
+        for fk in mapper.local_table.foreign_keys:
+            if fk.column.table is tabela and fk.ondelete in ('CASCADE', 'SET NULL'):
+                filhos.append((mapper.class_, fk.parent.key, fk.ondelete))
+    return filhos
+
+@lru_cache(maxsize=None)
+def _atinge_rastreado(tabela):
+    # Evita buscar filhos (votos, check-ins...) que não levam a nenhum modelo rastreado
+    return any(classe.__name__ in MODELOS_RASTREADOS or (ondelete == 'CASCADE' and _atinge_rastreado(classe.__table__))
+               for classe, _, ondelete in _cascatas(tabela))
+
+def _registrar_cascatas(session, executar, classe, ids, registros, ignorar=frozenset()):
+    if not ids or not _atinge_rastreado(classe.__table__):
+        return
+    pendentes = _pendentes(session)
+    for filho, coluna, ondelete in _cascatas(classe.__table__):
+        modelo = filho.__name__
+        attrs = MODELOS_RASTREADOS.get(modelo, ())
+        consulta = select(filho.id, *[getattr(filho, a) for a in attrs])
+        atingidos = []
+        for i in range(0, len(ids), 500):
+            atingidos += executar(consulta.where(getattr(filho, coluna).in_(ids[i:i + 500]))).all()
+        if modelo in MODELOS_RASTREADOS:
+            acao, campos = (REMOVIDO, None) if ondelete == 'CASCADE' else (ATUALIZADO, [coluna])
+            for linha in atingidos:
+                if (modelo, linha[0]) not in ignorar:
+                    pendentes.registrar(modelo, linha[0], {a: [v] for a, v in zip(attrs, linha[1:])}, campos)
+                    registros.append((modelo, linha[0], acao))
+        if ondelete == 'CASCADE':
+            _registrar_cascatas(session, executar, filho, [linha[0] for linha in atingidos], registros, ignorar)
+
+@event.listens_for(db.Model, 'before_delete', propagate=True)
+def _before_delete(_mapper, conexao, obj):
+    # session.delete(): os filhos carregados saem pelo próprio flush (after_flush), os demais pelo banco
+    session = inspect(obj).session
+    if not isinstance(session, SessaoRoteada):
+        return
+    apagados = frozenset((type(o).__name__, o.id) for o in session.deleted)
+    registros = []
+    _registrar_cascatas(session, conexao.execute, type(obj), [obj.id], registros, apagados)
+    _gravar_log(session, registros)
+
+@event.listens_for(SessaoRoteada, 'after_flush')
+def _after_flush(session, _ctx):
+    registros = []
+    for obj in session.new:
+        _registrar_objeto(session, registros, obj, CRIADO)
+    for obj in session.deleted:
+        _registrar_objeto(session, registros, obj, REMOVIDO)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            _registrar_objeto(session, registros, obj, ATUALIZADO)
+    _gravar_log(session, registros)
+
+@event.listens_for(SessaoRoteada, 'do_orm_execute')
+def _do_orm_execute(orm_state):
+    # UPDATE/DELETE em massa (Query.delete()) não passam pelo flush:
+    # buscamos antes as linhas atingidas pelo mesmo WHERE.
+    if not (orm_state.is_delete or orm_state.is_update) or orm_state.bind_mapper is None:
+        return
+    classe = orm_state.bind_mapper.class_
+    modelo = classe.__name__
+    if modelo not in MODELOS_RASTREADOS:
+        # Ex: User.query.filter_by(id=...).delete() leva o perfil e os resultados junto (ON DELETE CASCADE)
+        if orm_state.is_delete and _atinge_rastreado(classe.__table__):
+            consulta = select(classe.id)
+            if orm_state.statement.whereclause is not None:
+                consulta = consulta.where(orm_state.statement.whereclause)
+            registros = []
+            ids = orm_state.session.execute(consulta).scalars().all()
+            _registrar_cascatas(orm_state.session, orm_state.session.execute, classe, ids, registros)
+            _gravar_log(orm_state.session, registros)
+        return
+    attrs = MODELOS_RASTREADOS[modelo]
+    consulta = select(classe.id, *[getattr(classe, a) for a in attrs])
+    if orm_state.statement.whereclause is not None:
+        consultas = [consulta.where(orm_state.statement.whereclause)]
+    elif isinstance(orm_state.parameters, list):
+        # UPDATE em massa por chave primária: session.execute(update(Modelo), [{'id': ...}, ...])
+        ids = sorted({p['id'] for p in orm_state.parameters})
+        consultas = [consulta.where(classe.id.in_(ids[i:i + 500])) for i in range(0, len(ids), 500)]
+    else:
+        consultas = [consulta]
+    acao = REMOVIDO if orm_state.is_delete else ATUALIZADO
+    pendentes = _pendentes(orm_state.session)
+    registros = []
+    ids = []
+    for consulta in consultas:
+        for linha in orm_state.session.execute(consulta):
+            pendentes.registrar(modelo, linha[0], {a: [v] for a, v in zip(attrs, linha[1:])})
+            registros.append((modelo, linha[0], acao))
+            ids.append(linha[0])
+    if orm_state.is_delete:
+        _registrar_cascatas(orm_state.session, orm_state.session.execute, classe, ids, registros)
+    _gravar_log(orm_state.session, registros)
+
+def _temporadas_afetadas(session, alt):
+    temporadas = set(alt.ids_de('Season')) | alt.refs_de('Race', 'season_id')
+    corridas = set(alt.refs_de('RaceResult', 'race_id'))
+    if 'Protesto' in alt and alt.mudou('Protesto', 'status', 'veredito_final', 'etapa_id', 'acusado_id'):
+        # Punições contam nos confrontos diretos da temporada
+        corridas.update(alt.refs_de('Protesto', 'etapa_id'))
+    if corridas:
+        temporadas.update(session.connection().execute(select(Race.season_id).where(Race.id.in_(corridas))).scalars())
+    if 'PilotProfile' in alt and alt.mudou('PilotProfile', *CAMPOS_PILOTO_TEMPORADA):
+        temporadas.add(TODAS_AS_TEMPORADAS)
+    temporadas.discard(None)
+    return temporadas
+
+@event.listens_for(SessaoRoteada, 'before_commit')
+def _before_commit(session):
+    # O commit ainda vai dar o flush final: antecipado aqui para as alterações já estarem registradas
+    session.flush()
+    pendentes = session.info.get('alteracoes')
+    if not pendentes or 'versao_transacao' not in session.info:
+        return
+    temporadas = _temporadas_afetadas(session, pendentes)
+    if temporadas:
+        versao = session.info['versao_transacao']
+        session.connection().execute(upsert(SeasonVersion).values([{'season_id': s, 'versao': versao} for s in temporadas])
+                                     .on_conflict_do_update(index_elements=[SeasonVersion.season_id], set_={'versao': versao}))
+    # Snapshots, páginas e recordes ficam para o worker: a escrita responde sem esperar por eles, e a
+    # publicação é confirmada (ou desfeita) junto com os dados, sem outra transação depois da resposta
+    session.connection().execute(Tarefa.__table__.insert().values(
+        tipo='PUBLICAR', chave=f'publicar:{secrets.token_hex(8)}', descricao='Publicar alterações',
+        parametros=json.dumps(pendentes.para_json())))
+
+@event.listens_for(SessaoRoteada, 'after_commit')
+def _after_commit(session):
+    session.info.pop('versao_transacao', None)
+    session.info.pop('alteracoes', None)
+
+@event.listens_for(SessaoRoteada, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('versao_transacao', None)
+    session.info.pop('alteracoes', None)
+
+def entregar(alteracoes):
+    """Chama os ouvintes com as alterações (tarefa PUBLICAR, no worker)."""
+    for ouvinte in _ouvintes:
+        try:
+            ouvinte(alteracoes)
+        except Exception:
+            # Um ouvinte com problema não impede os outros (a escrita já foi confirmada)
+            db.session.rollback()
+            current_app.logger.exception('Falha ao processar alterações em %s', ouvinte.__name__)
@@ -0,0 +1,60 @@
+import os
+import click
+from flask import current_app
+from app import auditoria, busca
+from app.models import db, User, PilotProfile
+
+# --- PREPARAÇÃO DO AMBIENTE ---
+# Antes feito a cada importação do run.py (ou seja, em todo worker e em todo
+# 'flask db ...'). Agora roda uma vez por deploy: `python -m flask bootstrap`.
+
+def bootstrap_banco():
+    """Cria as tabelas que faltam, a pasta de uploads e o Super Admin inicial. Pode rodar várias vezes."""
+    # db.create_all() <-- COM O MIGRATE NÃO É OBRIGATÓRIO, MAS FICA POR SEGURANÇA
+    # (no banco da liga ativa, em 'flask ligas executar bootstrap')
+    db.metadata.create_all(db.session.get_bind())
+    # Índices de busca textual (FTS5) e os triggers que os mantêm (app/busca.py); trilha de auditoria só de inserção
+    with db.session.get_bind().begin() as conexao:
+        busca.criar_indices(conexao)
+        auditoria.criar_travas(conexao)
+
+    # Verifica se existe pasta de upload
+    if not os.path.exists(current_app.config['UPLOAD_FOLDER']):
+        os.makedirs(current_app.config['UPLOAD_FOLDER'])
+
+    # Cria Super Admin se não existir
+    if not User.query.filter_by(email='admin@fullgas.com').first():
+        super_admin = User(username='Admin', email='admin@fullgas.com', role='SUPER_ADM')
+        super_admin.set_password('admin123')
+        db.session.add(super_admin)
+        db.session.commit()
+
+        # Cria perfil de piloto para o Super Admin principal
+        perfil_admin = PilotProfile(user_id=super_admin.id, nickname='Direção de Prova', nome_real='Admin', grid='SEM_GRID')
+        db.session.add(perfil_admin)
+        db.session.commit()
+        print("Super Admin criado com sucesso!")
+
+def orfaos():
+    """{tabela: linhas} que apontam para um pai inexistente (PRAGMA foreign_key_check). Vazio = íntegro."""
+    contagem = {}
+    for tabela, *_ in db.session.execute(db.text('PRAGMA foreign_key_check')):
+        contagem[tabela] = contagem.get(tabela, 0) + 1
+    return contagem
+
+def init_app(app):
+    @app.cli.command('bootstrap')
+    def bootstrap_command():
+        """Cria tabelas, pasta de uploads e o Super Admin inicial."""
+        bootstrap_banco()
+        print('Banco pronto.')
+
+    @app.cli.command('verificar-integridade')
+    def verificar_integridade_command():
+        """Lista linhas órfãs (chave estrangeira sem o registro pai)."""
+        encontrados = orfaos()
+        for tabela, linhas in sorted(encontrados.items()):
+            print(f'{tabela:<25} {linhas} linhas órfãs')
+        if encontrados:
+            raise click.ClickException('há linhas órfãs no banco')
+        print('Nenhuma linha órfã.')
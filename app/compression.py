@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import request
+from app.ligas import liga_atual
+from app.utils import escrever_atomico, remover_arquivo
+
+try:
+    import brotli
+except ImportError:  # Opcional: sem o pacote 'brotli' servimos apenas gzip
+    brotli = None
+
+# --- COMPRESSÃO DE RESPOSTAS ---
+# HTML e JSON são negociados por requisição (br > gzip). Os bytes comprimidos
+# ficam em um cache LRU indexado pela versão (ETag) do conteúdo, então o mesmo
+# payload não é recomprimido a cada acesso.
+
+TIPOS_COMPRIMIVEIS = {'text/html', 'application/json', 'text/css', 'text/plain', 'application/javascript'}
+EXTENSOES = {'br': '.br', 'gzip': '.gz'}
+
+def codificacoes_disponiveis():
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+def comprimir(dados, codificacao, estatico=False):
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=9 if estatico else 5)
+    return gzip.compress(dados, compresslevel=9 if estatico else 6, mtime=0)
+
+class CacheComprimido:
+    def __init__(self, limite_bytes):
+        self.limite = limite_bytes
+        self.tamanho = 0
+        self.itens = OrderedDict()
+        self.lock = threading.Lock()
+
+    def obter(self, chave):
+        with self.lock:
+            dados = self.itens.get(chave)
+            if dados is not None:
+                self.itens.move_to_end(chave)
+            return dados
+
+    def guardar(self, chave, dados):
+        if len(dados) > self.limite:
+            return
+        with self.lock:
+            if chave in self.itens:
+                return
+            self.itens[chave] = dados
+            self.tamanho += len(dados)
+            while self.tamanho > self.limite:
+                _, antigo = self.itens.popitem(last=False)
+                self.tamanho -= len(antigo)
+
+def escrever_estatico(caminho, dados):
+    """Grava o arquivo e as versões pré-comprimidas (.gz/.br) para o servidor web (gzip_static/brotli_static)."""
+    escrever_atomico(caminho, dados)
+    for codificacao in codificacoes_disponiveis():
+        escrever_atomico(caminho + EXTENSOES[codificacao], comprimir(dados, codificacao, estatico=True))
+
+def remover_estatico(caminho):
+    remover_arquivo(caminho)
+    for extensao in EXTENSOES.values():
+        remover_arquivo(caminho + extensao)
+
+def init_app(app):
+    cache = CacheComprimido(app.config.get('COMPRESS_CACHE_BYTES', 32 * 1024 * 1024))
+    app.extensions['cache_comprimido'] = cache
+
+    @app.after_request
+    def comprimir_resposta(response):
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers:
+            return response
+        if response.mimetype not in TIPOS_COMPRIMIVEIS:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        dados = response.get_data()
+        if len(dados) < app.config.get('COMPRESS_MIN_SIZE', 500):
+            return response
+
+        # Versão do conteúdo: ETag definido pela rota (ex.: versão dos dados) ou hash do corpo
+        versao, _ = response.get_etag()
+        if not versao:
+            versao = hashlib.md5(dados).hexdigest()
+
+        codificacao = request.accept_encodings.best_match(codificacoes_disponiveis())
+        if not codificacao:
+            response.set_etag(versao)
+            return response.make_conditional(request)
+
+        # A versão dos dados é por banco: ligas diferentes podem ter a mesma
+        chave = (liga_atual(), versao, codificacao)
+        comprimido = cache.obter(chave)
+        if comprimido is None:
+            comprimido = comprimir(dados, codificacao)
+            cache.guardar(chave, comprimido)
+
+        response.set_data(comprimido)
+        response.headers['Content-Encoding'] = codificacao
+        response.set_etag(f'{versao}-{codificacao}')
+        return response.make_conditional(request)
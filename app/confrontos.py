@@ -0,0 +1,102 @@
+import numpy as np
+from app.changes import por_versao
+from app.cubo import cubo, TEM_RESULTADO, AUSENTE
+from app.models import db, Race, Protesto
+
+# --- CONFRONTOS DIRETOS (HEAD-TO-HEAD) ---
+# Matriz piloto x piloto de uma temporada/grid, montada de uma vez a partir do
+# cubo da temporada (app/cubo.py): o perfil do piloto, o da equipe e a
+# /api/confrontos leem daqui em vez de comparar pares de pilotos percorrendo
+# race_results a cada requisição.
+#
+# Com P pilotos e R corridas, as matrizes P x R de posição/pontos viram as P x P:
+#   corridas_juntos[i, j] corridas que i e j terminaram (diagonal: as do próprio i)
+#   a_frente[i, j]        dessas, quantas i terminou na frente de j
+#   saldo_pontos[i, j]    pontos de i menos os de j nas corridas que os dois largaram
+#   saldo_quali_ban[i, j] punições Média/Grave (quali ban) de i menos as de j
+
+# Matrizes montadas neste worker: {(liga, (season_id, grid)): (versão da temporada, Confrontos)}
+_cache = {}
+
+class Confrontos:
+    def __init__(self, season_id, grid, pilotos, corridas_juntos, a_frente, saldo_pontos, saldo_quali_ban):
+        self.season_id = season_id
+        self.grid = grid
+        self.pilotos = pilotos  # [(id, nickname, team_id)] na ordem das linhas
+        self.indice = {p[0]: i for i, p in enumerate(pilotos)}
+        self.corridas_juntos = corridas_juntos
+        self.a_frente = a_frente
+        self.saldo_pontos = saldo_pontos
+        self.saldo_quali_ban = saldo_quali_ban
+
+    def par(self, pilot_id, rival_id):
+        """Confronto de pilot_id contra rival_id, ou None se algum não correu no grid."""
+        i, j = self.indice.get(pilot_id), self.indice.get(rival_id)
+        if i is None or j is None:
+            return None
+        _, nickname, team_id = self.pilotos[j]
+        return {
+            'id': rival_id,
+            'nickname': nickname,
+            'companheiro': team_id is not None and team_id == self.pilotos[i][2],
+            'corridas': int(self.corridas_juntos[i, j]),
+            'a_frente': int(self.a_frente[i, j]),
+            'atras': int(self.a_frente[j, i]),
+            'saldo_pontos': float(self.saldo_pontos[i, j]),
+            'saldo_quali_ban': int(self.saldo_quali_ban[i, j]),
+        }
+
+    def linha(self, pilot_id):
+        """Confrontos do piloto contra cada rival com quem dividiu a pista (companheiros primeiro)."""
+        if pilot_id not in self.indice:
+            return []
+        rivais = [self.par(pilot_id, p[0]) for p in self.pilotos if p[0] != pilot_id]
+        rivais = [r for r in rivais if r['corridas'] or r['saldo_pontos']]
+        rivais.sort(key=lambda r: (not r['companheiro'], -r['corridas'], r['nickname']))
+        return rivais
+
+    def to_dict(self):
+        return {
+            'season_id': self.season_id,
+            'grid': self.grid,
+            'pilotos': [{'id': pid, 'nickname': nickname} for pid, nickname, _ in self.pilotos],
+            'corridas_juntos': self.corridas_juntos.tolist(),
+            'a_frente': self.a_frente.tolist(),
+            'saldo_pontos': self.saldo_pontos.tolist(),
+            'saldo_quali_ban': self.saldo_quali_ban.tolist(),
+        }
+
+def montar(season_id, grid):
+    """Matrizes de confronto a partir das colunas do grid no cubo da temporada."""
+    c = cubo(season_id)
+    colunas = np.flatnonzero(c.grid_corrida == grid)
+    flags = c.flags[:, colunas]
+    linhas = np.flatnonzero((flags & TEM_RESULTADO).any(axis=1))
+    pilotos = [(c.pilotos[i].id, c.pilotos[i].nickname, c.pilotos[i].team_id) for i in linhas]
+    ids = [p[0] for p in pilotos]
+
+    flags = flags[linhas]
+    largou = ((flags & TEM_RESULTADO) > 0) & ((flags & AUSENTE) == 0)
+    terminou = c.classificado[np.ix_(linhas, colunas)]
+    posicao = np.where(terminou, c.posicao[np.ix_(linhas, colunas)], np.inf)
+    pontos = c.pontos_corrida[np.ix_(linhas, colunas)].astype(np.float64)
+
+    juntos = terminou[:, None, :] & terminou[None, :, :]
+    a_frente = ((posicao[:, None, :] < posicao[None, :, :]) & juntos).sum(axis=2)
+    t = terminou.astype(np.int64)
+    corridas_juntos = t @ t.T
+    l = largou.astype(np.float64)
+    saldo_pontos = (pontos * l) @ l.T - l @ (pontos * l).T
+
+    punicoes = dict(db.session.query(Protesto.acusado_id, db.func.count(Protesto.id))
+                    .join(Race, Protesto.etapa_id == Race.id)
+                    .filter(Race.season_id == season_id, Race.grid == grid, Protesto.status == 'CONCLUIDO',
+                            Protesto.veredito_final.in_(['MEDIA', 'GRAVE']))
+                    .group_by(Protesto.acusado_id).all())
+    quali_bans = np.array([punicoes.get(pid, 0) for pid in ids], dtype=np.int64)
+    saldo_quali_ban = quali_bans[:, None] - quali_bans[None, :]
+    return Confrontos(season_id, grid, pilotos, corridas_juntos, a_frente, saldo_pontos, saldo_quali_ban)
+
+def confrontos(season_id, grid):
+    """Confrontos da temporada/grid, remontados apenas quando a versão da temporada muda."""
+    return por_versao(_cache, (season_id, grid), lambda versao: montar(season_id, grid), season_id=season_id)
@@ -0,0 +1,202 @@
+from collections import namedtuple
+import click
+import numpy as np
+from flask import current_app
+from app.changes import por_versao
+from app.desempate import momento, ordenar
+from app.models import db, Season, Race, RaceResult, PilotProfile
+
+# --- CUBO DA TEMPORADA ---
+# Todos os RaceResult de uma temporada carregados uma vez por versão da temporada
+# (changes.versao_temporada) em matrizes pilotos x corridas (colunar, em numpy). Classificação, vitórias,
+# pódios, totais das equipes, desempenho por etapa, confrontos e evolução do
+# campeonato são respondidos a partir delas, sem montar objetos do ORM.
+#
+# Linhas: todos os pilotos cadastrados (ordem de id) + uma linha vazia no fim,
+# usada para ids desconhecidos. Colunas: todas as corridas da temporada em ordem
+# cronológica (desempate.momento). Cada versão monta um cubo novo e só então o
+# publica no cache (troca atômica); as matrizes são somente leitura e podem ser
+# lidas por várias threads.
+
+# Bits de CuboTemporada.flags
+TEM_RESULTADO, DNF, DSQ, VOLTA_RAPIDA, PILOTO_DO_DIA, PILOTO_TORCIDA, AUSENTE = (1 << k for k in range(7))
+
+# Corrida guardada no cubo (tupla simples: sobrevive ao fim da sessão do SQLAlchemy)
+Corrida = namedtuple('Corrida', 'id nome_gp data_corrida grid status tipo_etapa')
+# Piloto guardado no cubo
+Piloto = namedtuple('Piloto', 'id nickname grid team_id penalidade')
+
+# Cubos montados neste worker: {(liga, season_id): (versão da temporada, CuboTemporada)}
+_cache = {}
+
+class CuboTemporada:
+    def __init__(self, season_id, pilotos, corridas, posicao, pontos, flags, equipe):
+        self.season_id = season_id
+        self.pilotos = pilotos
+        self.corridas = corridas
+        self.linha = {p.id: i for i, p in enumerate(pilotos)}
+        self.coluna = {c.id: k for k, c in enumerate(corridas)}
+        self.vazia = len(pilotos)
+
+        self.posicao = posicao  # int16, 0 = sem posição
+        self.pontos_corrida = pontos  # float32
+        self.flags = flags  # uint8, bits acima
+        self.equipe = equipe  # int32, equipe do resultado (snapshot), 0 = nenhuma
+        self.penalidade = np.array([p.penalidade for p in pilotos] + [0.0])
+        self.grid_corrida = np.array([c.grid for c in corridas], dtype=str)
+        self.concluida = np.array([c.status == 'Concluida' for c in corridas], dtype=bool)
+        # Resultado que conta no countback: posição válida, sem DNF, DSQ ou ausência
+        self.classificado = ((flags & TEM_RESULTADO) > 0) & ((flags & (DNF | DSQ | AUSENTE)) == 0) & (posicao > 0)
+
+        vencedor = self.classificado & (posicao == 1)
+        com_equipe = equipe > 0
+        tamanho = int(equipe.max()) + 1 if equipe.size else 1
+        self.pontos_equipe = np.bincount(equipe[com_equipe], weights=pontos[com_equipe], minlength=tamanho)
+        self.vitorias_equipe = np.bincount(equipe[com_equipe & vencedor], minlength=tamanho)
+
+        for matriz in (self.posicao, self.pontos_corrida, self.flags, self.equipe, self.classificado, self.penalidade):
+            matriz.setflags(write=False)
+
+    def memoria(self):
+        """Bytes ocupados pelas matrizes do cubo."""
+        return sum(m.nbytes for m in (self.posicao, self.pontos_corrida, self.flags, self.equipe, self.classificado,
+                                      self.penalidade, self.grid_corrida, self.concluida, self.pontos_equipe, self.vitorias_equipe))
+
+    def indices(self, ids):
+        return np.array([self.linha.get(pid, self.vazia) for pid in ids], dtype=np.int64)
+
+    # --- Classificação ---
+
+    def pontos(self, ids, penalidade=True):
+        """Pontos no campeonato (soma dos resultados menos a penalidade de campeonato)."""
+        idx = self.indices(ids)
+        soma = self.pontos_corrida[idx].sum(axis=1, dtype=np.float64)
+        return soma - self.penalidade[idx] if penalidade else soma
+
+    def contagem(self, ids, ate_posicao):
+        """Resultados classificados até a posição (1 = vitórias, 3 = pódios) de cada piloto."""
+        idx = self.indices(ids)
+        return (self.classificado[idx] & (self.posicao[idx] <= ate_posicao)).sum(axis=1)
+
+    def ordem(self, ids):
+        """Índices de ids do primeiro ao último colocado: pontos, countback e melhor resultado mais recente."""
+        if not len(ids):
+            return np.zeros(0, dtype=np.int64)
+        idx = self.indices(ids)
+        posicao, classificado = self.posicao[idx], self.classificado[idx]
+        maior = max(int(posicao[classificado].max()) if classificado.any() else 1, 1)
+        histograma = np.zeros((len(idx), maior), dtype=np.int64)
+        linhas, colunas = np.nonzero(classificado)
+        np.add.at(histograma, (linhas, posicao[linhas, colunas] - 1), 1)
+
+        melhor = np.where(classificado, posicao, maior + 1).min(axis=1, initial=maior + 1)
+        no_melhor = classificado & (posicao == melhor[:, None])
+        # Colunas em ordem cronológica: a última coluna com o melhor resultado é a mais recente
+        ultima_melhor = np.where(no_melhor.any(axis=1), no_melhor.shape[1] - np.argmax(no_melhor[:, ::-1], axis=1), 0)
+        return ordenar(ids, self.pontos(ids), histograma, ultima_melhor)
+
+    def classificar(self, linhas, id_de=lambda linha: linha['piloto'].id):
+        """Nova lista com as linhas na ordem da classificação."""
+        return [linhas[i] for i in self.ordem([id_de(l) for l in linhas])]
+
+    def equipe_totais(self, team_id):
+        """(pontos, vitorias) dos resultados com a equipe (snapshot do resultado)."""
+        if team_id is None or team_id >= len(self.pontos_equipe):
+            return 0.0, 0
+        return float(self.pontos_equipe[team_id]), int(self.vitorias_equipe[team_id])
+
+    # --- Séries por piloto ---
+
+    def desempenho(self, pilot_id, grid):
+        """Resultado do piloto em cada corrida do grid (inclusive as ainda não disputadas)."""
+        i = self.linha.get(pilot_id, self.vazia)
+        linhas = []
+        for k in np.flatnonzero(self.grid_corrida == grid):
+            corrida, flags = self.corridas[k], int(self.flags[i, k])
+            tem = bool(flags & TEM_RESULTADO)
+            linhas.append({
+                'gp': corrida.nome_gp, 'data': corrida.data_corrida, 'status_corrida': corrida.status,
+                'participou': tem and not flags & AUSENTE,
+                'posicao': int(self.posicao[i, k]),
+                'pontos': float(self.pontos_corrida[i, k]),
+                'dnf': bool(flags & DNF), 'dsq': bool(flags & DSQ)
+            })
+        return linhas
+
+    def resumo(self, pilot_id):
+        """Pontos, vitórias e grid predominante do piloto na temporada, ou None se ele não correu."""
+        i = self.linha.get(pilot_id)
+        if i is None:
+            return None
+        colunas = np.flatnonzero(self.flags[i] & TEM_RESULTADO)
+        if not colunas.size:
+            return None
+        grids, vezes = np.unique(self.grid_corrida[colunas], return_counts=True)
+        return {
+            'pontos': float(self.pontos_corrida[i].sum(dtype=np.float64)),
+            'vitorias': int((self.classificado[i] & (self.posicao[i] == 1)).sum()),
+            'grid': str(grids[np.argmax(vezes)]),
+        }
+
+def montar(season_id):
+    corridas = sorted((Corrida(*c) for c in db.session.query(
+        Race.id, Race.nome_gp, Race.data_corrida, Race.grid, Race.status, Race.tipo_etapa
+    ).filter(Race.season_id == season_id)), key=momento)
+    pilotos = [Piloto(p.id, p.nickname, p.grid, p.team_id, float(p.penalidade_campeonato or 0)) for p in db.session.query(
+        PilotProfile.id, PilotProfile.nickname, PilotProfile.grid, PilotProfile.team_id, PilotProfile.penalidade_campeonato
+    ).order_by(PilotProfile.id)]
+    resultados = db.session.query(
+        RaceResult.pilot_id, RaceResult.race_id, RaceResult.team_id, RaceResult.posicao, RaceResult.pontos_ganhos,
+        RaceResult.dnf, RaceResult.dsq, RaceResult.volta_rapida, RaceResult.piloto_do_dia, RaceResult.piloto_torcida,
+        RaceResult.ausencia
+    ).join(Race).filter(Race.season_id == season_id).order_by(RaceResult.id.desc()).all()
+
+    n, m = len(pilotos) + 1, len(corridas)
+    posicao = np.zeros((n, m), dtype=np.int16)
+    pontos = np.zeros((n, m), dtype=np.float32)
+    flags = np.zeros((n, m), dtype=np.uint8)
+    equipe = np.zeros((n, m), dtype=np.int32)
+    linha = {p.id: i for i, p in enumerate(pilotos)}
+    coluna = {c.id: k for k, c in enumerate(corridas)}
+    resultados = [r for r in resultados if r.pilot_id in linha]
+    if resultados:
+        c = list(zip(*resultados))
+        i = np.array([linha[pid] for pid in c[0]])
+        k = np.array([coluna[rid] for rid in c[1]])
+        np.add.at(pontos, (i, k), np.array([p or 0 for p in c[4]], dtype=np.float32))
+        # Lidos do mais novo para o mais antigo: se houver dois resultados na mesma célula, vale o primeiro lançado
+        equipe[i, k] = [t or 0 for t in c[2]]
+        posicao[i, k] = [p or 0 for p in c[3]]
+        bits = TEM_RESULTADO + sum(np.array([bool(v) for v in c[j]], dtype=np.uint8) * bit for j, bit in
+                                   ((5, DNF), (6, DSQ), (7, VOLTA_RAPIDA), (8, PILOTO_DO_DIA), (9, PILOTO_TORCIDA)))
+        bits = bits + np.array([a is not None for a in c[10]], dtype=np.uint8) * AUSENTE
+        flags[i, k] = bits
+
+    cubo = CuboTemporada(season_id, pilotos, corridas, posicao, pontos, flags, equipe)
+    current_app.logger.info('Cubo da temporada %s: %d pilotos x %d corridas, %.1f KB',
+                            season_id, n, m, cubo.memoria() / 1024)
+    return cubo
+
+def cubo(season_id):
+    """Cubo da temporada, remontado apenas quando a versão da temporada muda."""
+    return por_versao(_cache, season_id, lambda versao: montar(season_id), season_id=season_id)
+
+def init_app(app):
+    @app.cli.command('cubo')
+    @click.argument('season_id', type=int, required=False)
+    @click.option('--estimar', nargs=2, type=int, metavar='PILOTOS CORRIDAS',
+                  help='Memória de um cubo com estas dimensões (liga grande).')
+    def cubo_command(season_id, estimar):
+        """Dimensões e memória do cubo de uma temporada (padrão: a ativa)."""
+        if estimar:
+            n, m = estimar
+            # posição int16 + pontos float32 + flags uint8 + equipe int32 + classificado bool por célula
+            por_celula = 2 + 4 + 1 + 4 + 1
+            print(f'{n} pilotos x {m} corridas: {n * m * por_celula / 1024:.1f} KB (+ {n * 8 / 1024:.1f} KB de penalidades)')
+            return
+        season = db.session.get(Season, season_id) if season_id else Season.query.filter_by(ativa=True).first()
+        if season is None:
+            raise click.BadParameter('temporada não encontrada')
+        c = montar(season.id)
+        print(f'{season.nome}: {len(c.pilotos) + 1} pilotos x {len(c.corridas)} corridas, '
+              f'{int(c.flags.astype(bool).sum())} resultados, {c.memoria() / 1024:.1f} KB')
@@ -0,0 +1,96 @@
+import os
+from flask import current_app, g, has_app_context, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+# --- ROTEAMENTO LEITURA / ESCRITA ---
+# Rotas de consulta (API e GETs públicos) usam um engine SQLite aberto em modo
+# somente leitura. Qualquer escrita (flush/commit, comandos DML) continua indo para
+# o engine principal, mesmo que aconteça no meio de uma requisição GET; depois dela,
+# a transação inteira fica no principal.
+
+def url_somente_leitura(uri):
+    """Converte a URI principal do SQLite em uma URI 'file:...?mode=ro'. Retorna None para outros bancos."""
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        return None
+    return f'sqlite:///file:{url.database}?mode=ro&uri=true'
+
+def _pragmas_escrita(dbapi_conn, _record):
+    cursor = dbapi_conn.cursor()
+    # WAL: leitores não bloqueiam o escritor (e vice-versa)
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    # O SQLite só aplica as chaves estrangeiras (e o ON DELETE CASCADE dos modelos) com isto, por conexão
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+def _pragmas_leitura(dbapi_conn, _record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute('PRAGMA query_only=ON')
+    cursor.close()
+
+def usar_engine_leitura():
+    """Marca a requisição atual para consultar o engine somente leitura."""
+    g.somente_leitura = True
+
+def criar_engine_leitura(app, uri_leitura):
+    engine = create_engine(uri_leitura, **app.config.get('SQLALCHEMY_READ_ENGINE_OPTIONS', {}))
+    event.listen(engine, 'connect', _pragmas_leitura)
+    return engine
+
+def engines(app, db):
+    """Engines do app: principal e, se houver, o somente leitura."""
+    with app.app_context():
+        todos = [db.engine]
+    if app.extensions.get('engine_leitura') is not None:
+        todos.append(app.extensions['engine_leitura'])
+    return todos
+
+def init_app(app, db):
+    with app.app_context():
+        engine_principal = db.engine
+        if engine_principal.url.get_backend_name() == 'sqlite':
+            event.listen(engine_principal, 'connect', _pragmas_escrita)
+
+    uri_leitura = app.config.get('SQLALCHEMY_READ_DATABASE_URI') or url_somente_leitura(app.config['SQLALCHEMY_DATABASE_URI'])
+    if uri_leitura:
+        app.extensions['engine_leitura'] = criar_engine_leitura(app, uri_leitura)
+
+    # Conexões nunca atravessam um fork (gunicorn --preload, uwsgi): o processo filho
+    # esquece o pool herdado, sem fechar as conexões do pai, e abre as suas.
+    herdados = engines(app, db)
+    os.register_at_fork(after_in_child=lambda: [e.dispose(close=False) for e in herdados])
+
+class SessaoRoteada(Session):
+    def _usar_leitura(self, clause):
+        # Escrita (flush, INSERT/UPDATE/DELETE do Core, Query.delete()) vai para o engine principal e
+        # prende a sessão nele até o fim da transação: as leituras seguintes veem o que ainda não foi confirmado
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info['escrita'] = True
+        return not self.info.get('escrita') and has_request_context() and bool(g.get('somente_leitura'))
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        # Multi-ligas: cada liga tem os seus engines (app/ligas.py)
+        if has_app_context() and g.get('liga'):
+            return current_app.extensions['ligas'].engine(g.liga, somente_leitura=self._usar_leitura(clause))
+        if self._usar_leitura(clause):
+            engine = current_app.extensions.get('engine_leitura')
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(SessaoRoteada, 'do_orm_execute')
+def _prender_no_principal(orm_state):
+    # Antes dos outros ouvintes (app/changes.py): as consultas que eles fazem para
+    # registrar um UPDATE/DELETE em massa já saem pelo engine principal
+    if orm_state.is_insert or orm_state.is_update or orm_state.is_delete:
+        orm_state.session.info['escrita'] = True
+
+@event.listens_for(SessaoRoteada, 'after_commit')
+@event.listens_for(SessaoRoteada, 'after_rollback')
+def _soltar_engine_principal(session):
+    session.info.pop('escrita', None)
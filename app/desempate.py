@@ -0,0 +1,30 @@
+from datetime import date
+import numpy as np
+from app.utils import ORDEM_CARROS
+
+# --- CLASSIFICAÇÃO COM DESEMPATE (COUNTBACK) ---
+# Toda tela que ordena pilotos pelo campeonato (home, overview, gerador de grid,
+# /api/standings, /api/bundle e os snapshots) passa por aqui, então a mesma
+# temporada tem sempre a mesma ordem. Critério:
+#   1. pontos (soma dos resultados menos a penalidade de campeonato);
+#   2. countback: mais vitórias, depois mais 2º lugares, mais 3º lugares...;
+#   3. quem obteve o seu melhor resultado mais recentemente;
+#   4. id do piloto (apenas para a ordem nunca depender da ordem das linhas no banco).
+# O cubo da temporada (app/cubo.py) monta a matriz pilotos x posições e a ordem
+# sai de um único np.lexsort.
+
+def momento(race):
+    """Chave cronológica de uma etapa (data, e o id para etapas no mesmo dia ou sem data)."""
+    return (race.data_corrida or date.min, race.id)
+
+def ordenar(ids, pontos, histograma, ultima_melhor):
+    """np.lexsort do critério a partir das matrizes já montadas (histograma pilotos x posições)."""
+    # A última chave é a principal; negativos para ordem decrescente
+    chaves = [np.asarray(ids), -np.asarray(ultima_melhor)]
+    chaves += [-histograma[:, k] for k in range(histograma.shape[1] - 1, -1, -1)]
+    chaves.append(-np.asarray(pontos, dtype=np.float64))
+    return np.lexsort(chaves)
+
+def carro(posicao):
+    """Carro do lastro para a posição (0 = líder) no campeonato."""
+    return ORDEM_CARROS[posicao] if posicao < len(ORDEM_CARROS) else "McLaren (Extra)"
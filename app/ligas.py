@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+import click
+from flask import current_app, g, has_app_context, request
+from flask.sessions import SecureCookieSessionInterface
+from sqlalchemy import create_engine, event
+from app.db_routing import criar_engine_leitura, url_somente_leitura, _pragmas_escrita
+
+# --- MULTI-LIGAS ---
+# Um mesmo conjunto de workers atende várias ligas independentes, cada uma com o
+# seu arquivo SQLite. A liga da requisição vem do host (liga.exemplo.com) ou do
+# prefixo do caminho (/liga/...), conforme o registro em LIGAS_ARQUIVO:
+#
+#   {"copa": {"banco": "/home/fullgas/copa.db", "hosts": ["copa.fullgas.com"]},
+#    "sul":  {"banco": "/home/fullgas/sul.db"}}
+#
+# Os engines de cada liga são abertos no primeiro acesso e fechados depois de
+# LIGAS_OCIOSIDADE segundos sem uso. Requisições sem liga (host/prefixo fora do
+# registro) usam o banco principal (SQLALCHEMY_DATABASE_URI), como antes.
+
+CHAVE_ENVIRON = 'fullgas.liga'
+
+class RegistroLigas:
+    def __init__(self, app, ligas):
+        self.app = app
+        self.ligas = ligas
+        self.hosts = {h.lower(): slug for slug, liga in ligas.items() for h in liga.get('hosts', [])}
+        self.ociosidade = app.config.get('LIGAS_OCIOSIDADE', 600)
+        self.engines = {}  # slug -> [engine escrita, engine leitura, último uso]
+        self.ao_abrir = []  # funções chamadas com cada engine aberto (ex.: contagem de consultas)
+        self.lock = threading.Lock()
+        self.ultima_limpeza = time.monotonic()
+
+    def uri(self, slug):
+        banco = self.ligas[slug]['banco']
+        return banco if '://' in banco else f'sqlite:///{os.path.abspath(banco)}'
+
+    def base_url(self, slug):
+        """Raiz pública da liga: o host, se houver, senão o prefixo /<slug>."""
+        hosts = self.ligas[slug].get('hosts')
+        return f'http://{hosts[0]}/' if hosts else f'http://localhost/{slug}/'
+
+    def _abrir(self, slug):
+        uri = self.uri(slug)
+        escrita = create_engine(uri, **self.app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        if escrita.url.get_backend_name() == 'sqlite':
+            event.listen(escrita, 'connect', _pragmas_escrita)
+        uri_leitura = url_somente_leitura(uri)
+        leitura = criar_engine_leitura(self.app, uri_leitura) if uri_leitura else None
+        for engine in (escrita, leitura):
+            if engine is not None:
+                for funcao in self.ao_abrir:
+                    funcao(engine)
+        return [escrita, leitura, time.monotonic()]
+
+    def engine(self, slug, somente_leitura=False):
+        with self.lock:
+            engines = self.engines.get(slug)
+            if engines is None:
+                engines = self.engines[slug] = self._abrir(slug)
+            engines[2] = time.monotonic()
+        if somente_leitura and engines[1] is not None:
+            return engines[1]
+        return engines[0]
+
+    def despejar_ociosos(self, agora=None):
+        agora = agora or time.monotonic()
+        with self.lock:
+            ociosos = [slug for slug, (_, _, uso) in self.engines.items() if agora - uso > self.ociosidade]
+            fechar = [self.engines.pop(slug) for slug in ociosos]
+            self.ultima_limpeza = agora
+        # Conexões ainda em uso por outra thread seguem válidas e são fechadas ao serem devolvidas
+        for escrita, leitura, _ in fechar:
+            escrita.dispose()
+            if leitura is not None:
+                leitura.dispose()
+        return ociosos
+
+    def talvez_despejar(self):
+        # No máximo uma varredura por minuto, aproveitando as requisições
+        if time.monotonic() - self.ultima_limpeza > 60:
+            self.despejar_ociosos()
+
+    def esquecer_herdados(self):
+        """Após um fork: o filho abre os seus engines, sem fechar as conexões do pai."""
+        for escrita, leitura, _ in self.engines.values():
+            escrita.dispose(close=False)
+            if leitura is not None:
+                leitura.dispose(close=False)
+        self.engines = {}
+        self.lock = threading.Lock()
+
+class PrefixoLiga:
+    """Middleware WSGI: identifica a liga pelo host ou por /<slug>/ e move o prefixo para o SCRIPT_NAME."""
+    def __init__(self, wsgi_app, registro):
+        self.wsgi_app = wsgi_app
+        self.registro = registro
+
+    def __call__(self, environ, start_response):
+        caminho = environ.get('PATH_INFO', '')
+        primeiro = caminho.split('/', 2)[1] if caminho.count('/') >= 1 else ''
+        if primeiro in self.registro.ligas:
+            environ[CHAVE_ENVIRON] = primeiro
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + '/' + primeiro
+            environ['PATH_INFO'] = caminho[len(primeiro) + 1:] or '/'
+        else:
+            host = environ.get('HTTP_HOST', '').split(':')[0].lower()
+            environ[CHAVE_ENVIRON] = self.registro.hosts.get(host)
+        return self.wsgi_app(environ, start_response)
+
+class SessaoPorLiga(SecureCookieSessionInterface):
+    # Cookie de sessão restrito ao prefixo da liga (/copa); ligas por host já têm cookies separados
+    def get_cookie_path(self, app):
+        return request.script_root or super().get_cookie_path(app)
+
+def carregar(app):
+    ligas = app.config.get('LIGAS') or {}
+    arquivo = app.config.get('LIGAS_ARQUIVO')
+    if arquivo:
+        with open(arquivo, encoding='utf-8') as f:
+            ligas = {**ligas, **json.load(f)}
+    return ligas
+
+def registro():
+    return current_app.extensions.get('ligas')
+
+def liga_atual():
+    """Slug da liga ativa (requisição ou comando 'flask ligas executar'); None para o banco principal."""
+    if not has_app_context():
+        return None
+    return g.get('liga')
+
+def banco_atual():
+    """Chave do banco ativo para caches do processo (a URI: a versão dos dados é por banco, não por liga)."""
+    slug = liga_atual()
+    return registro().uri(slug) if slug else current_app.config['SQLALCHEMY_DATABASE_URI']
+
+def bancos(app):
+    """Ligas atendidas por este app para os workers: None (banco principal) e, com multi-ligas, cada slug do registro."""
+    reg = app.extensions.get('ligas')
+    return [None] + (list(reg.ligas) if reg else [])
+
+def engine_da_liga(somente_leitura=False):
+    """Engine da liga ativa ou None (banco principal)."""
+    slug = liga_atual()
+    if slug is None:
+        return None
+    return registro().engine(slug, somente_leitura)
+
+def pasta(base):
+    """Pasta de arquivos gerados (snapshots, páginas) da liga ativa."""
+    slug = liga_atual()
+    return os.path.join(base, slug) if slug else base
+
+def nome_upload(nome):
+    """Nome do upload (relativo a UPLOAD_FOLDER), em uma subpasta por liga."""
+    slug = liga_atual()
+    if not slug:
+        return nome
+    os.makedirs(os.path.join(current_app.config['UPLOAD_FOLDER'], slug), exist_ok=True)
+    return f'{slug}/{nome}'
+
+def id_sessao(user_id):
+    """Id gravado na sessão/cookie 'lembrar-me': inclui a liga, então não vale em outra liga."""
+    slug = liga_atual()
+    return f'{slug}:{user_id}' if slug else str(user_id)
+
+def user_id_da_sessao(valor):
+    """Inverso de id_sessao; None se a sessão for de outra liga."""
+    slug, _, user_id = valor.rpartition(':')
+    if (slug or None) != liga_atual():
+        return None
+    return int(user_id)
+
+def init_app(app):
+    ligas = carregar(app)
+    if not ligas:
+        return
+    reg = RegistroLigas(app, ligas)
+    app.extensions['ligas'] = reg
+    app.wsgi_app = PrefixoLiga(app.wsgi_app, reg)
+    app.session_interface = SessaoPorLiga()
+    os.register_at_fork(after_in_child=reg.esquecer_herdados)
+
+    @app.before_request
+    def ativar_liga():
+        g.liga = request.environ.get(CHAVE_ENVIRON)
+        reg.talvez_despejar()
+
+    @app.cli.group('ligas')
+    def ligas_cli():
+        """Comandos multi-ligas."""
+
+    @ligas_cli.command('listar')
+    def listar_command():
+        """Ligas do registro e seus bancos."""
+        for slug in reg.ligas:
+            hosts = ', '.join(reg.ligas[slug].get('hosts', [])) or '-'
+            print(f'{slug:<15} /{slug}/  {hosts:<30} {reg.uri(slug)}')
+
+    @ligas_cli.command('executar', context_settings={'ignore_unknown_options': True})
+    @click.option('--liga', 'slugs', multiple=True, help='Apenas estas ligas (padrão: todas).')
+    @click.argument('comando', nargs=-1, required=True, type=click.UNPROCESSED)
+    def executar_command(slugs, comando):
+        """Roda um comando do flask em cada liga. Ex.: flask ligas executar db upgrade"""
+        ctx = click.get_current_context()
+        raiz = ctx.find_root()
+        for slug in slugs or reg.ligas:
+            if slug not in reg.ligas:
+                raise click.BadParameter(f'liga desconhecida: {slug}')
+            print(f'--- {slug} ---')
+            with app.app_context():
+                g.liga = slug
+                sub_ctx = raiz.command.make_context(raiz.info_name, list(comando), parent=raiz, obj=raiz.obj)
+                with sub_ctx:
+                    raiz.command.invoke(sub_ctx)
@@ -1,9 +1,12 @@
+import json
 from datetime import datetime
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
+from app.db_routing import SessaoRoteada
+from app.ligas import id_sessao
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -12,7 +15,9 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(256), nullable=False)
     role = db.Column(db.String(20), default='PILOTO') 
     
-    pilot_profile = db.relationship('PilotProfile', backref='user', uselist=False)
+    # Exclusões em cascata ficam com o banco (ON DELETE CASCADE, PRAGMA foreign_keys em app/db_routing.py);
+    # passive_deletes: o ORM não carrega os filhos só para apagá-los
+    pilot_profile = db.relationship('PilotProfile', backref='user', uselist=False, cascade='all, delete', passive_deletes=True)
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -20,6 +25,10 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    def get_id(self):
+        # Id na sessão de login com a liga (multi-ligas): não autentica em outra liga
+        return id_sessao(self.id)
+
 class Team(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
@@ -27,8 +36,8 @@ class Team(db.Model):
     grid = db.Column(db.String(20), nullable=False) 
     ativa = db.Column(db.Boolean, default=True) 
     
-    pilots = db.relationship('PilotProfile', back_populates='team')
-    results = db.relationship('RaceResult', backref='team_snapshot', lazy=True)
+    pilots = db.relationship('PilotProfile', back_populates='team', passive_deletes=True)
+    results = db.relationship('RaceResult', backref='team_snapshot', lazy=True, passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -39,8 +48,10 @@ class Team(db.Model):
         }
 
 class PilotProfile(db.Model):
+    # Lista do admin: aba (grid) em ordem de nickname, paginada por cursor (app/queries.py)
+    __table_args__ = (db.Index('ix_pilot_profile_grid_nickname', 'grid', 'nickname', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     nickname = db.Column(db.String(50), nullable=False)
     nome_real = db.Column(db.String(100), nullable=False)
     foto_url = db.Column(db.String(200), nullable=True)
@@ -53,10 +64,10 @@ class PilotProfile(db.Model):
     penalidade_campeonato = db.Column(db.Float, default=0.0)
     motivo_penalidade = db.Column(db.Text, nullable=True)
 
-    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id', ondelete='SET NULL'), nullable=True)
     team = db.relationship('Team', back_populates='pilots')
 
-    race_results = db.relationship('RaceResult', backref='pilot', lazy=True)
+    race_results = db.relationship('RaceResult', backref='pilot', lazy=True, cascade='all, delete', passive_deletes=True)
     
     def esta_banido(self):
         return self.pontos_cnh <= 0
@@ -77,7 +88,7 @@ class Season(db.Model):
     nome = db.Column(db.String(100), nullable=False)
     ativa = db.Column(db.Boolean, default=True)
     data_inicio = db.Column(db.Date, nullable=False)
-    races = db.relationship('Race', backref='season', lazy=True)
+    races = db.relationship('Race', backref='season', lazy=True, cascade='all, delete', passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -88,7 +99,7 @@ class Season(db.Model):
 
 class Race(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    season_id = db.Column(db.Integer, db.ForeignKey('season.id'), nullable=False)
+    season_id = db.Column(db.Integer, db.ForeignKey('season.id', ondelete='CASCADE'), nullable=False)
     nome_gp = db.Column(db.String(100), nullable=False)
     pista = db.Column(db.String(100), nullable=False)
     data_corrida = db.Column(db.Date, nullable=True)
@@ -96,7 +107,7 @@ class Race(db.Model):
     status = db.Column(db.String(20), default='Agendada')
     tipo_etapa = db.Column(db.String(20), default='NORMAL')
     
-    results = db.relationship('RaceResult', backref='race', lazy=True)
+    results = db.relationship('RaceResult', backref='race', lazy=True, cascade='all, delete', passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -110,18 +121,20 @@ class Race(db.Model):
         }
 
 class RaceRegistration(db.Model):
+    # Uma resposta de check-in por piloto e corrida (o check-in grava com upsert nesta chave)
+    __table_args__ = (db.UniqueConstraint('race_id', 'pilot_id', name='uq_race_registration_race_pilot'),)
     id = db.Column(db.Integer, primary_key=True)
-    race_id = db.Column(db.Integer, db.ForeignKey('race.id'), nullable=False)
-    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id'), nullable=False)
+    race_id = db.Column(db.Integer, db.ForeignKey('race.id', ondelete='CASCADE'), nullable=False)
+    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id', ondelete='CASCADE'), nullable=False)
     status = db.Column(db.String(20), nullable=False)
     justificativa = db.Column(db.Text, nullable=True)
     data_resposta = db.Column(db.DateTime, default=datetime.utcnow)
 
 class RaceResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    race_id = db.Column(db.Integer, db.ForeignKey('race.id'), nullable=False)
-    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id'), nullable=False)
-    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=True)
+    race_id = db.Column(db.Integer, db.ForeignKey('race.id', ondelete='CASCADE'), nullable=False)
+    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id', ondelete='CASCADE'), nullable=False)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id', ondelete='SET NULL'), nullable=True)
     
     posicao = db.Column(db.Integer, default=0)
     pontos_ganhos = db.Column(db.Float, default=0.0)
@@ -148,11 +161,11 @@ class RaceResult(db.Model):
 
 class Protesto(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    etapa_id = db.Column(db.Integer, db.ForeignKey('race.id'), nullable=False)
+    etapa_id = db.Column(db.Integer, db.ForeignKey('race.id', ondelete='CASCADE'), nullable=False)
     etapa = db.relationship('Race')
-    acusador_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id'), nullable=False)
+    acusador_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id', ondelete='CASCADE'), nullable=False)
     acusador = db.relationship('PilotProfile', foreign_keys=[acusador_id])
-    acusado_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id'), nullable=False)
+    acusado_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id', ondelete='CASCADE'), nullable=False)
     acusado = db.relationship('PilotProfile', foreign_keys=[acusado_id])
     
     video_link = db.Column(db.String(300), nullable=True)
@@ -168,12 +181,36 @@ class Protesto(db.Model):
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     data_fechamento = db.Column(db.DateTime, nullable=True)
 
-    votos = db.relationship('VotoComissario', backref='protesto_rel', lazy=True)
+    votos = db.relationship('VotoComissario', backref='protesto_rel', lazy=True, cascade='all, delete', passive_deletes=True)
+    videos = db.relationship('VideoProtesto', backref='protesto', lazy=True, cascade='all, delete', passive_deletes=True)
+
+    def video_enviado(self, lado):
+        """Vídeo enviado como arquivo (app/videos.py) para o lado ACUSACAO ou DEFESA, se houver."""
+        return next((v for v in self.videos if v.lado == lado and v.status == 'COMPLETO'), None)
+
+class VideoProtesto(db.Model):
+    # Vídeo de acusação ou defesa enviado em partes (app/videos.py). Fica ENVIANDO
+    # enquanto as partes chegam (recebido = bytes já gravados, em sequência) e vira
+    # COMPLETO quando o arquivo está inteiro.
+    __table_args__ = (db.Index('ix_video_protesto_lado', 'protesto_id', 'lado', 'status'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    protesto_id = db.Column(db.Integer, db.ForeignKey('protesto.id', ondelete='CASCADE'), nullable=False)
+    lado = db.Column(db.String(10), nullable=False) # ACUSACAO, DEFESA
+    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id', ondelete='CASCADE'), nullable=False)
+    nome_original = db.Column(db.String(200))
+    tipo = db.Column(db.String(50)) # mimetype
+    arquivo = db.Column(db.String(200)) # relativo a VIDEOS_FOLDER
+    tamanho = db.Column(db.Integer, nullable=False)
+    recebido = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default='ENVIANDO') # ENVIANDO, COMPLETO
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow)
 
 class VotoComissario(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    protesto_id = db.Column(db.Integer, db.ForeignKey('protesto.id'), nullable=False)
-    admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    protesto_id = db.Column(db.Integer, db.ForeignKey('protesto.id', ondelete='CASCADE'), nullable=False)
+    admin_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     escolha = db.Column(db.String(50), nullable=False)
 
 class Invite(db.Model):
@@ -184,12 +221,12 @@ class Invite(db.Model):
 
 class SeletivaEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id'), nullable=False)
+    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id', ondelete='CASCADE'), nullable=False)
     tempo_ms = db.Column(db.Integer, nullable=False) # Tempo em milissegundos para ordenação
     tempo_str = db.Column(db.String(20), nullable=False) # Texto original (ex: 1:35.800)
     data_registro = db.Column(db.DateTime, default=datetime.utcnow)
     
-    piloto = db.relationship('PilotProfile', backref='seletivas')
+    piloto = db.relationship('PilotProfile', backref=db.backref('seletivas', cascade='all, delete', passive_deletes=True))
 
 class News(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -198,7 +235,7 @@ class News(db.Model):
     texto = db.Column(db.Text, nullable=False)
     imagem_url = db.Column(db.String(200)) 
     data_publicacao = db.Column(db.DateTime, default=datetime.utcnow)
-    autor_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    autor_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'))
     
     autor = db.relationship('User')
 
@@ -210,4 +247,136 @@ class News(db.Model):
             'imagem': self.imagem_url,
             'data': self.data_publicacao.strftime('%d/%m/%Y'),
             'texto': self.texto
-        }
\ No newline at end of file
+        }
+
+class DataVersion(db.Model):
+    # Linha única (id=1) incrementada a cada transação que altera dados públicos (app/changes.py)
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+class SeasonVersion(db.Model):
+    # Versão dos dados de cada temporada (app/changes.py): a versão global da última transação que a afetou.
+    # season_id=0 marca mudanças de perfis de piloto, que valem para todas as temporadas.
+    season_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    versao = db.Column(db.Integer, nullable=False)
+
+class ChangeLog(db.Model):
+    # Uma linha por entidade alterada em cada versão dos dados (sincronização incremental do app)
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, index=True)
+    entidade = db.Column(db.String(30), nullable=False)
+    entidade_id = db.Column(db.Integer, nullable=False)
+    acao = db.Column(db.String(10), nullable=False) # CRIADO, ATUALIZADO, REMOVIDO
+
+class RecordePiloto(db.Model):
+    # Totais de carreira do piloto (todas as temporadas), refeitos só para os pilotos alterados em cada commit (app/recordes.py)
+    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id', ondelete='CASCADE'), primary_key=True)
+    largadas = db.Column(db.Integer, nullable=False, default=0)
+    vitorias = db.Column(db.Integer, nullable=False, default=0)
+    podios = db.Column(db.Integer, nullable=False, default=0)
+    titulos = db.Column(db.Integer, nullable=False, default=0)
+    voltas_rapidas = db.Column(db.Integer, nullable=False, default=0)
+    pilotos_do_dia = db.Column(db.Integer, nullable=False, default=0)
+    dnfs = db.Column(db.Integer, nullable=False, default=0)
+    pontos = db.Column(db.Float, nullable=False, default=0.0)
+
+    pilot = db.relationship('PilotProfile')
+
+    @property
+    def taxa_dnf(self):
+        return self.dnfs / self.largadas if self.largadas else 0.0
+
+class TituloTemporada(db.Model):
+    # Campeão de cada grid numa temporada encerrada (gravado ao encerrar, antes de os pilotos saírem do grid)
+    __table_args__ = (db.UniqueConstraint('season_id', 'grid'),)
+    id = db.Column(db.Integer, primary_key=True)
+    season_id = db.Column(db.Integer, db.ForeignKey('season.id', ondelete='CASCADE'), nullable=False)
+    grid = db.Column(db.String(20), nullable=False)
+    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    season = db.relationship('Season')
+    pilot = db.relationship('PilotProfile')
+
+class Notificacao(db.Model):
+    # Caixa de saída: gravada na mesma transação do evento e enviada em lotes pelo 'flask notificacoes worker' (app/notificacoes.py)
+    __table_args__ = (db.Index('ix_notificacao_fila', 'status', 'proxima_tentativa'),)
+    id = db.Column(db.Integer, primary_key=True)
+    chave = db.Column(db.String(100), unique=True, nullable=False) # Evita avisar duas vezes o mesmo evento (ex: checkin:12:5)
+    evento = db.Column(db.String(30), nullable=False) # CHECKIN_ABERTO, DEFESA_SOLICITADA, VEREDITO
+    pilot_id = db.Column(db.Integer, db.ForeignKey('pilot_profile.id', ondelete='SET NULL'), nullable=True)
+    transporte = db.Column(db.String(20), nullable=False)
+    destino = db.Column(db.String(20), nullable=False) # Telefone no momento do evento
+    texto = db.Column(db.Text, nullable=False)
+
+    status = db.Column(db.String(10), nullable=False, default='PENDENTE') # PENDENTE, ENVIANDO, ENVIADA, FALHOU
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    erro = db.Column(db.String(300), nullable=True)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_envio = db.Column(db.DateTime, nullable=True)
+
+class Tarefa(db.Model):
+    # Operação pesada do admin rodada em lotes pelo 'flask tarefas worker' (app/tarefas.py).
+    # Só uma tarefa ativa por chave (ex: temporada:3): disparar de novo devolve a mesma.
+    __table_args__ = (
+        db.Index('ix_tarefa_chave_ativa', 'chave', unique=True, sqlite_where=db.text("status IN ('PENDENTE', 'EXECUTANDO')")),
+        db.Index('ix_tarefa_fila', 'status', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(30), nullable=False)
+    chave = db.Column(db.String(100), nullable=False)
+    parametros = db.Column(db.Text, nullable=False, default='{}') # JSON
+    descricao = db.Column(db.String(200), nullable=False)
+    criada_por = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+
+    status = db.Column(db.String(12), nullable=False, default='PENDENTE') # PENDENTE, EXECUTANDO, CONCLUIDA, FALHOU
+    etapa = db.Column(db.String(30), nullable=True) # Passo atual (o cursor fica em 'estado')
+    estado = db.Column(db.Text, nullable=False, default='{}') # JSON: onde retomar
+    feito = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    resultado = db.Column(db.String(300), nullable=True)
+    erro = db.Column(db.Text, nullable=True)
+    reservada_ate = db.Column(db.DateTime, nullable=True) # Worker que morreu: outra passada retoma depois disto
+
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_inicio = db.Column(db.DateTime, nullable=True)
+    data_fim = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def ativa(self):
+        return self.status in ('PENDENTE', 'EXECUTANDO')
+
+    @property
+    def progresso(self):
+        """Porcentagem (0-100) ou None se o total ainda não é conhecido."""
+        if self.status == 'CONCLUIDA':
+            return 100
+        if not self.total:
+            return None
+        return min(100, int(self.feito * 100 / self.total))
+
+class Auditoria(db.Model):
+    # Trilha das ações da Direção de Prova (app/auditoria.py). Só recebe INSERT, em lotes, do gravador em segundo plano;
+    # triggers no banco abortam UPDATE e DELETE (auditoria.TRAVAS).
+    # Sem chave estrangeira: o registro continua valendo depois que o admin ou a entidade são excluídos.
+    __table_args__ = (
+        db.Index('ix_auditoria_entidade', 'entidade', 'entidade_id', 'id'),
+        db.Index('ix_auditoria_admin', 'admin_id', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    admin_id = db.Column(db.Integer, nullable=True)
+    admin_nome = db.Column(db.String(150), nullable=True) # Como era no momento da ação
+    rota = db.Column(db.String(60), nullable=True) # Endpoint da requisição (ex: admin.edit_pilot)
+    acao = db.Column(db.String(30), nullable=False) # CRIADO, ATUALIZADO, REMOVIDO ou a operação (ex: EXCLUIR_CORRIDA)
+    entidade = db.Column(db.String(30), nullable=False)
+    entidade_id = db.Column(db.Integer, nullable=True)
+    antes = db.Column(db.Text, nullable=True) # JSON dos campos-chave
+    depois = db.Column(db.Text, nullable=True)
+
+    @property
+    def mudancas(self):
+        """[(campo, antes, depois)] para a tela de auditoria."""
+        antes = json.loads(self.antes) if self.antes else {}
+        depois = json.loads(self.depois) if self.depois else {}
+        return [(campo, antes.get(campo), depois.get(campo)) for campo in dict.fromkeys([*antes, *depois])]
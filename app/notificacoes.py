@@ -0,0 +1,246 @@
+import json
+import time
+import urllib.request
+from datetime import datetime, timedelta
+import click
+from flask import current_app, g
+from sqlalchemy import func, update
+from sqlalchemy.dialects.sqlite import insert as upsert
+from app import ligas
+from app.models import db, Notificacao, PilotProfile, Race, RaceRegistration, Season, User
+from app.utils import JANELA_CHECKIN_DIAS
+
+# --- NOTIFICAÇÕES AOS PILOTOS (CAIXA DE SAÍDA) ---
+# As rotas não falam com serviço externo nenhum: o aviso é gravado na tabela
+# Notificacao na mesma transação do evento (protesto aberto, veredito) e sai
+# junto com o commit. O 'flask notificacoes worker' (processo à parte, ver
+# Procfile) drena a fila em lotes por transporte, com limite de envios por
+# minuto e novas tentativas com espera crescente. A abertura do check-in não
+# tem requisição própria: o worker confere a janela de cada grid de tempos em
+# tempos e grava os avisos de quem ainda não respondeu.
+#
+# Cada aviso tem uma chave única (ex: checkin:12:5), então repetir o evento ou
+# rodar dois workers não manda a mesma mensagem duas vezes. Vários workers
+# podem drenar juntos: cada lote é reservado com um único UPDATE ... RETURNING.
+# Só pilotos com telefone recebem avisos; sem NOTIFICACOES_TRANSPORTE nada é gravado.
+
+# Espera antes da tentativa n (1, 2, ...): 30 s, 1 min, 2 min... até 1 h
+ESPERA_BASE = 30
+ESPERA_MAXIMA = 3600
+# Um lote reservado por um worker que morreu volta para a fila depois deste tempo
+RESERVA = timedelta(minutes=5)
+# Intervalo entre as conferências da janela de check-in (segundos)
+INTERVALO_CHECKIN = 300
+
+TRANSPORTES = {}
+
+def transporte(nome):
+    """Registra um transporte: função que recebe um lote de mensagens ({id, destino, evento, texto})
+    e devolve {id: erro} das que falharam. Uma exceção conta como falha do lote inteiro."""
+    def registrar(funcao):
+        TRANSPORTES[nome] = funcao
+        return funcao
+    return registrar
+
+@transporte('arquivo')
+def _enviar_arquivo(mensagens):
+    # Desenvolvimento e testes: uma linha JSON por mensagem
+    with open(current_app.config['NOTIFICACOES_ARQUIVO'], 'a', encoding='utf-8') as f:
+        for mensagem in mensagens:
+            f.write(json.dumps(mensagem, ensure_ascii=False) + '\n')
+    return {}
+
+@transporte('http')
+def _enviar_http(mensagens):
+    # Gateway de WhatsApp/SMS: POST {"mensagens": [...]}; a resposta pode trazer {"falhas": {"<id>": "motivo"}}
+    cabecalhos = {'Content-Type': 'application/json'}
+    if current_app.config.get('NOTIFICACOES_TOKEN'):
+        cabecalhos['Authorization'] = f"Bearer {current_app.config['NOTIFICACOES_TOKEN']}"
+    pedido = urllib.request.Request(current_app.config['NOTIFICACOES_URL'], method='POST', headers=cabecalhos,
+                                    data=json.dumps({'mensagens': mensagens}, ensure_ascii=False).encode())
+    with urllib.request.urlopen(pedido, timeout=current_app.config.get('NOTIFICACOES_TIMEOUT', 10)) as resposta:
+        corpo = json.loads(resposta.read() or b'{}')
+    return {int(id_): str(erro) for id_, erro in (corpo.get('falhas') or {}).items()}
+
+# --- ENFILEIRAR ---
+
+def enfileirar(piloto, evento, chave, texto):
+    """Grava o aviso na transação atual (sai no commit da rota). Ignora piloto sem telefone e chave repetida."""
+    nome = current_app.config.get('NOTIFICACOES_TRANSPORTE')
+    if not nome or piloto is None or not piloto.telefone:
+        return
+    db.session.execute(upsert(Notificacao).values(
+        chave=chave, evento=evento, pilot_id=piloto.id, transporte=nome, destino=piloto.telefone, texto=texto
+    ).on_conflict_do_nothing(index_elements=[Notificacao.chave]))
+
+def defesa_solicitada(protesto):
+    enfileirar(protesto.acusado, 'DEFESA_SOLICITADA', f'defesa:{protesto.id}',
+               f'Full Gas League: você foi citado no protesto #{protesto.id} ({protesto.etapa.nome_gp}). '
+               f'Envie sua defesa pelo seu perfil antes da votação.')
+
+def veredito(protesto):
+    """Avisa acusado e acusador (uma vez por julgamento: reabrir e julgar de novo gera novo aviso)."""
+    julgamento = protesto.data_fechamento.strftime('%Y%m%d%H%M%S')
+    for piloto in (protesto.acusado, protesto.acusador):
+        enfileirar(piloto, 'VEREDITO', f'veredito:{protesto.id}:{piloto.id}:{julgamento}',
+                   f'Full Gas League: o protesto #{protesto.id} ({protesto.etapa.nome_gp}) foi julgado. '
+                   f'Veredito: {protesto.veredito_final}.')
+
+def avisar_checkins(hoje=None):
+    """Grava o aviso de check-in aberto para quem ainda não respondeu à próxima corrida do seu grid (sem commit).
+
+    Mesma janela do perfil do piloto: a próxima corrida não concluída do grid, a até JANELA_CHECKIN_DIAS dias.
+    """
+    if not current_app.config.get('NOTIFICACOES_TRANSPORTE'):
+        return 0
+    hoje = hoje or datetime.utcnow().date()
+    season = Season.query.filter_by(ativa=True).first()
+    if not season:
+        return 0
+    proximas = {}
+    for race in Race.query.filter(Race.season_id == season.id, Race.status != 'Concluida', Race.data_corrida >= hoje)\
+            .order_by(Race.data_corrida, Race.id):
+        proximas.setdefault(race.grid, race)
+
+    gravados = 0
+    for grid, race in proximas.items():
+        if (race.data_corrida - hoje).days > JANELA_CHECKIN_DIAS:
+            continue
+        respondeu = db.session.query(RaceRegistration.id).filter(RaceRegistration.race_id == race.id,
+                                                                  RaceRegistration.pilot_id == PilotProfile.id)
+        avisado = db.session.query(Notificacao.id).filter(Notificacao.chave == func.printf('checkin:%d:%d', race.id, PilotProfile.id))
+        pilotos = PilotProfile.query.join(User).filter(
+            PilotProfile.grid == grid, PilotProfile.telefone.isnot(None), User.role != 'INATIVO',
+            ~respondeu.exists(), ~avisado.exists()
+        ).all()
+        for piloto in pilotos:
+            enfileirar(piloto, 'CHECKIN_ABERTO', f'checkin:{race.id}:{piloto.id}',
+                       f"Full Gas League: check-in aberto para o {race.nome_gp} ({race.data_corrida.strftime('%d/%m')}). "
+                       f'Confirme presença ou justifique a ausência no seu perfil.')
+        gravados += len(pilotos)
+    return gravados
+
+# --- ENVIO ---
+
+class LimiteEnvio:
+    """Balde de fichas por transporte: até `por_minuto` mensagens por minuto, sem rajada maior que isso."""
+    def __init__(self, por_minuto):
+        self.por_minuto = por_minuto
+        self.fichas = float(por_minuto)
+        self.ultimo = time.monotonic()
+
+    def disponivel(self):
+        agora = time.monotonic()
+        self.fichas = min(self.por_minuto, self.fichas + (agora - self.ultimo) * self.por_minuto / 60)
+        self.ultimo = agora
+        return int(self.fichas)
+
+    def gastar(self, quantidade):
+        self.fichas -= quantidade
+
+def espera(tentativas):
+    return timedelta(seconds=min(ESPERA_BASE * 2 ** (tentativas - 1), ESPERA_MAXIMA))
+
+def _reservar(nome, limite, agora):
+    # Um único UPDATE: dois workers nunca pegam a mesma mensagem
+    proximas = db.session.query(Notificacao.id).filter(
+        Notificacao.status == 'PENDENTE', Notificacao.transporte == nome, Notificacao.proxima_tentativa <= agora
+    ).order_by(Notificacao.proxima_tentativa, Notificacao.id).limit(limite).scalar_subquery()
+    linhas = db.session.execute(
+        update(Notificacao).where(Notificacao.id.in_(proximas), Notificacao.status == 'PENDENTE')
+        .values(status='ENVIANDO', proxima_tentativa=agora + RESERVA)
+        .returning(Notificacao.id, Notificacao.destino, Notificacao.evento, Notificacao.texto, Notificacao.tentativas)
+    ).all()
+    db.session.commit()
+    return linhas
+
+def _registrar(linhas, falhas, agora):
+    enviadas = [l.id for l in linhas if l.id not in falhas]
+    if enviadas:
+        db.session.execute(update(Notificacao).where(Notificacao.id.in_(enviadas))
+                           .values(status='ENVIADA', tentativas=Notificacao.tentativas + 1, data_envio=agora, erro=None))
+    maximo = current_app.config.get('NOTIFICACOES_TENTATIVAS', 6)
+    for linha in linhas:
+        if linha.id in falhas:
+            tentativas = linha.tentativas + 1
+            db.session.execute(update(Notificacao).where(Notificacao.id == linha.id).values(
+                status='FALHOU' if tentativas >= maximo else 'PENDENTE', tentativas=tentativas,
+                proxima_tentativa=agora + espera(tentativas), erro=falhas[linha.id][:300]
+            ))
+    db.session.commit()
+
+def drenar(limites, agora=None):
+    """Envia o que está vencido na fila da liga ativa, em lotes por transporte. Devolve {transporte: (enviadas, falhas)}."""
+    agora = agora or datetime.utcnow()
+    # Lotes de workers que morreram no meio do envio voltam para a fila
+    presas = Notificacao.query.filter(Notificacao.status == 'ENVIANDO', Notificacao.proxima_tentativa < agora)
+    if db.session.query(presas.exists()).scalar():
+        presas.update({'status': 'PENDENTE'}, synchronize_session=False)
+        db.session.commit()
+
+    lote = current_app.config.get('NOTIFICACOES_LOTE', 50)
+    resumo = {}
+    nomes = [n for (n,) in db.session.query(Notificacao.transporte).filter(Notificacao.status == 'PENDENTE').distinct()]
+    for nome in nomes:
+        if nome not in TRANSPORTES:
+            current_app.logger.warning('Notificações: transporte desconhecido %r', nome)
+            continue
+        limite = limites.setdefault(nome, LimiteEnvio(current_app.config.get('NOTIFICACOES_POR_MINUTO', 60)))
+        enviadas = falhas = 0
+        while True:
+            quantidade = min(lote, limite.disponivel())
+            linhas = _reservar(nome, quantidade, agora) if quantidade else []
+            if not linhas:
+                break
+            limite.gastar(len(linhas))
+            mensagens = [{'id': l.id, 'destino': l.destino, 'evento': l.evento, 'texto': l.texto} for l in linhas]
+            try:
+                erros = TRANSPORTES[nome](mensagens)
+                erros = {l.id: erros[l.id] for l in linhas if l.id in erros}
+            except Exception as e:
+                current_app.logger.warning('Notificações: lote de %d via %s falhou: %s', len(linhas), nome, e)
+                erros = {l.id: f'{type(e).__name__}: {e}' for l in linhas}
+            _registrar(linhas, erros, agora)
+            enviadas += len(linhas) - len(erros)
+            falhas += len(erros)
+        if enviadas or falhas:
+            resumo[nome] = (enviadas, falhas)
+    return resumo
+
+def trabalhar(app, intervalo, uma_vez=False):
+    limites = {}
+    ultima_conferencia = {}
+    while True:
+        for slug in ligas.bancos(app):
+            with app.app_context():
+                g.liga = slug
+                if uma_vez or time.monotonic() - ultima_conferencia.get(slug, 0) > INTERVALO_CHECKIN:
+                    if avisar_checkins():
+                        db.session.commit()
+                    ultima_conferencia[slug] = time.monotonic()
+                for nome, (enviadas, falhas) in drenar(limites.setdefault(slug, {})).items():
+                    app.logger.info('Notificações%s: %d enviadas e %d falhas via %s',
+                                    f' ({slug})' if slug else '', enviadas, falhas, nome)
+        if uma_vez:
+            return
+        time.sleep(intervalo)
+
+def init_app(app):
+    @app.cli.group('notificacoes')
+    def notificacoes_cli():
+        """Caixa de saída dos avisos aos pilotos."""
+
+    @notificacoes_cli.command('worker')
+    @click.option('--uma-vez', is_flag=True, help='Uma passada só (cron) em vez de ficar rodando.')
+    @click.option('--intervalo', type=float, default=None, help='Segundos entre as passadas (padrão: NOTIFICACOES_INTERVALO).')
+    def worker_command(uma_vez, intervalo):
+        """Confere a janela de check-in e envia a fila de todas as ligas."""
+        app.logger.setLevel('INFO')
+        trabalhar(app, intervalo or app.config.get('NOTIFICACOES_INTERVALO', 5), uma_vez)
+
+    @notificacoes_cli.command('status')
+    def status_command():
+        """Mensagens na fila por transporte e situação."""
+        for nome, status, quantidade in db.session.query(Notificacao.transporte, Notificacao.status, func.count(Notificacao.id))\
+                .group_by(Notificacao.transporte, Notificacao.status).order_by(Notificacao.transporte, Notificacao.status):
+            print(f'{nome:<10} {status:<9} {quantidade}')
@@ -0,0 +1,143 @@
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from app import cubo
+from app.changes import versao_dados, REMOVIDO
+from app.models import db, News, Season, Race, PilotProfile, Team, RaceResult, ChangeLog
+
+# --- DADOS DA API ---
+# Conteúdo dos endpoints públicos da /api. As rotas em app/routes/api.py, o
+# publicador de snapshots (app/publisher.py) e o /api/bundle usam as mesmas
+# funções, então todas as formas de leitura devolvem exatamente o mesmo JSON.
+
+GRIDS = ['ELITE', 'ADVANCED', 'INITIAL']
+
+def temporada_ativa():
+    return Season.query.filter_by(ativa=True).first()
+
+def noticias():
+    noticias = News.query.order_by(News.data_publicacao.desc()).limit(10).all()
+    return [n.to_dict() for n in noticias]
+
+def classificacoes(grids, season):
+    """Classificação de vários grids com uma consulta de pilotos (pontos e ordem vêm do cubo da temporada)."""
+    ranking = {grid: [] for grid in grids}
+    if not season:
+        return ranking
+
+    temporada = cubo.cubo(season.id)
+    pilotos = PilotProfile.query.options(joinedload(PilotProfile.team))\
+        .filter(PilotProfile.grid.in_(list(ranking))).order_by(PilotProfile.id).all()
+    for p, pontos in zip(pilotos, temporada.pontos([p.id for p in pilotos])):
+        ranking[p.grid].append({
+            'id': p.id,
+            'nickname': p.nickname,
+            'pontos': float(pontos),
+            'telefone': p.telefone,
+            'equipe': p.team.nome if p.team else 'Sem Equipe',
+            'foto': p.foto_url
+        })
+
+    for grid in ranking:
+        ranking[grid] = temporada.classificar(ranking[grid], id_de=lambda linha: linha['id'])
+    return ranking
+
+def classificacao(grid):
+    grid = grid.upper()
+    return classificacoes([grid], temporada_ativa())[grid]
+
+def calendarios(grids, season):
+    calendario = {grid: [] for grid in grids}
+    if not season:
+        return calendario
+
+    corridas = Race.query.filter(Race.season_id == season.id, Race.grid.in_(list(calendario)))\
+        .order_by(Race.data_corrida, Race.id).all()
+    for r in corridas:
+        calendario[r.grid].append(r.to_dict())
+    return calendario
+
+def calendario(grid):
+    grid = grid.upper()
+    return calendarios([grid], temporada_ativa())[grid]
+
+def resultados_corrida(race_id):
+    resultados = RaceResult.query.filter_by(race_id=race_id).order_by(RaceResult.posicao).all()
+    return [res.to_dict() for res in resultados]
+
+def pilotos():
+    pilotos = PilotProfile.query.filter(PilotProfile.grid != 'SEM_GRID').all()
+    return [p.to_dict() for p in pilotos]
+
+def equipes():
+    equipes = Team.query.filter_by(ativa=True).all()
+    return [t.to_dict() for t in equipes]
+
+def bundle(versao):
+    """Tudo que o app carrega na abertura, com uma única busca da temporada ativa."""
+    season = temporada_ativa()
+    return {
+        'versao': versao,
+        'news': noticias(),
+        'standings': classificacoes(GRIDS, season),
+        'calendar': calendarios(GRIDS, season),
+        'teams': equipes()
+    }
+
+# --- SINCRONIZAÇÃO INCREMENTAL (/api/changes) ---
+# entidade -> (chave na resposta, modelo, relações carregadas junto, serialização com ids/FKs para o cache local do app)
+SINCRONIZACAO = {
+    'Season': ('seasons', Season, (), lambda s: s.to_dict()),
+    'Race': ('races', Race, (), lambda r: {**r.to_dict(), 'season_id': r.season_id}),
+    'RaceResult': ('results', RaceResult, ('pilot', 'team_snapshot'),
+                   lambda r: {**r.to_dict(), 'id': r.id, 'race_id': r.race_id, 'pilot_id': r.pilot_id, 'team_id': r.team_id}),
+    'PilotProfile': ('pilots', PilotProfile, ('team',), lambda p: {**p.to_dict(), 'team_id': p.team_id}),
+    'Team': ('teams', Team, (), lambda t: {**t.to_dict(), 'ativa': t.ativa}),
+    'News': ('news', News, (), lambda n: n.to_dict()),
+}
+
+def _serializar(entidade, ids=None):
+    _, modelo, relacoes, serializar = SINCRONIZACAO[entidade]
+    opcoes = [joinedload(getattr(modelo, r)) for r in relacoes]
+    if ids is None:
+        return [serializar(o) for o in modelo.query.options(*opcoes).order_by(modelo.id)]
+    objetos = []
+    ids = sorted(ids)
+    for i in range(0, len(ids), 500): # limite de parâmetros do SQLite
+        objetos.extend(modelo.query.options(*opcoes).filter(modelo.id.in_(ids[i:i + 500])).order_by(modelo.id))
+    return [serializar(o) for o in objetos]
+
+def alteracoes_desde(since):
+    """Entidades criadas/alteradas/removidas depois da versão 'since'.
+
+    Se 'since' for 0 (app sem cópia local), anterior ao início do change log (podado pelo
+    worker, ver CHANGELOG_RETENCAO) ou posterior à versão atual (banco restaurado, outra liga),
+    devolve tudo com 'completo': True e o app deve substituir a cópia local.
+    """
+    versao = versao_dados()
+    primeira = db.session.query(func.min(ChangeLog.versao)).scalar()
+    base = primeira - 1 if primeira is not None else versao
+    # O log não cobre as linhas que já existiam quando as tabelas de versão foram criadas
+    # (bancos migrados começam com o log vazio): quem parte do zero recebe tudo
+    completo = since <= 0 or since < base or since > versao
+
+    resposta = {'versao': versao, 'since': since, 'completo': completo}
+    if completo:
+        for entidade, (chave, *_) in SINCRONIZACAO.items():
+            resposta[chave] = {'alterados': _serializar(entidade), 'removidos': []}
+        return resposta
+
+    # Última ação de cada entidade no intervalo (since, versao]
+    ultima_acao = {}
+    logs = db.session.query(ChangeLog.entidade, ChangeLog.entidade_id, ChangeLog.acao)\
+        .filter(ChangeLog.versao > since, ChangeLog.versao <= versao).order_by(ChangeLog.id)
+    for entidade, entidade_id, acao in logs:
+        ultima_acao[(entidade, entidade_id)] = acao
+
+    for entidade, (chave, *_) in SINCRONIZACAO.items():
+        alterados = {i for (e, i), acao in ultima_acao.items() if e == entidade and acao != REMOVIDO}
+        removidos = {i for (e, i), acao in ultima_acao.items() if e == entidade and acao == REMOVIDO}
+        registros = _serializar(entidade, alterados) if alterados else []
+        # Alterado e depois apagado por outro caminho (ex.: cascata): conta como removido
+        removidos.update(alterados - {r['id'] for r in registros})
+        resposta[chave] = {'alterados': registros, 'removidos': sorted(removidos)}
+    return resposta
@@ -0,0 +1,114 @@
+import click
+import numpy as np
+from sqlalchemy import update
+from app.models import db, Season, Race, RaceResult, PilotProfile, Protesto
+from app.utils import (PONTUACAO_NORMAL, MULTIPLICADOR_ETAPA, PERDA_VEREDITO,
+                       ADVERTENCIAS_POR_PUNICAO, PERDA_ADVERTENCIAS)
+
+# --- RECÁLCULO DE PONTOS DA TEMPORADA ---
+# Os pontos de cada resultado são gravados no lançamento (admin.race_results) e
+# depois ajustados pelos vereditos. Se a tabela de pontos ou os multiplicadores
+# mudarem, este módulo refaz todos os resultados de uma temporada a partir da
+# posição, das flags e dos protestos concluídos, em uma passada vetorizada.
+
+def tabela_pontos():
+    """Array indexado pela posição (índice 0 e posições fora da tabela valem 0)."""
+    tabela = np.zeros(max(PONTUACAO_NORMAL) + 1)
+    tabela[list(PONTUACAO_NORMAL)] = list(PONTUACAO_NORMAL.values())
+    return tabela
+
+def _perdas_por_protesto(season_id):
+    """{(race_id, pilot_id): pontos descontados} pelos protestos concluídos das etapas da temporada."""
+    perdas = {}
+    concluidos = db.session.query(Protesto.id, Protesto.etapa_id, Protesto.acusado_id, Protesto.veredito_final)\
+        .join(Race, Protesto.etapa_id == Race.id)\
+        .filter(Race.season_id == season_id, Protesto.status == 'CONCLUIDO')\
+        .order_by(Protesto.data_fechamento, Protesto.id).all()
+    for _, etapa_id, acusado_id, veredito in concluidos:
+        perda = PERDA_VEREDITO.get(veredito, 0)
+        if perda:
+            perdas[(etapa_id, acusado_id)] = perdas.get((etapa_id, acusado_id), 0) + perda
+
+    # Advertências: o desconto cai na etapa da N-ésima advertência do piloto na temporada,
+    # na ordem de fechamento. Como no view_protest, que conta advertencias_acumuladas:
+    # o contador volta a zero no encerramento da temporada (tarefas._encerrar_temporada)
+    contagem = {}
+    for _, etapa_id, acusado_id, veredito in concluidos:
+        if veredito != 'ADVERTENCIA':
+            continue
+        contagem[acusado_id] = contagem.get(acusado_id, 0) + 1
+        if contagem[acusado_id] % ADVERTENCIAS_POR_PUNICAO == 0:
+            perdas[(etapa_id, acusado_id)] = perdas.get((etapa_id, acusado_id), 0) + PERDA_ADVERTENCIAS
+    return perdas
+
+def calcular_temporada(season_id):
+    """Pontos atuais e recalculados de todos os resultados da temporada.
+
+    Retorna (linhas, atuais, novos): linhas são as tuplas lidas do banco, na mesma
+    ordem dos dois arrays.
+    """
+    linhas = db.session.query(
+        RaceResult.id, RaceResult.race_id, RaceResult.pilot_id, RaceResult.posicao,
+        RaceResult.dnf, RaceResult.dsq, RaceResult.volta_rapida, RaceResult.piloto_do_dia,
+        RaceResult.piloto_torcida, RaceResult.ausencia, RaceResult.pontos_ganhos, Race.tipo_etapa
+    ).join(Race).filter(Race.season_id == season_id).order_by(RaceResult.id).all()
+    if not linhas:
+        return [], np.zeros(0), np.zeros(0)
+
+    colunas = list(zip(*linhas))
+    posicao = np.array([p or 0 for p in colunas[3]], dtype=np.int64)
+    dnf, dsq, vr, dotd, fan = (np.array([bool(v) for v in colunas[i]]) for i in range(4, 9))
+    ausente = np.array([a is not None for a in colunas[9]])
+    atuais = np.array([p or 0.0 for p in colunas[10]], dtype=np.float64)
+    multiplicador = np.array([MULTIPLICADOR_ETAPA.get(t, 1.0) for t in colunas[11]])
+
+    tabela = tabela_pontos()
+    dentro = (posicao > 0) & (posicao < len(tabela))
+    base = np.where(dentro & ~dnf, tabela[np.where(dentro, posicao, 0)], 0.0) * multiplicador
+    bonus = (vr & ~dnf).astype(float) + dotd + fan
+    novos = np.where(dsq | ausente, 0.0, base + bonus)
+
+    # Descontos dos vereditos, no primeiro resultado do piloto na etapa (como o view_protest)
+    perdas = _perdas_por_protesto(season_id)
+    if perdas:
+        primeiro = {}
+        for i, (_, race_id, pilot_id, *_) in enumerate(linhas):
+            primeiro.setdefault((race_id, pilot_id), i)
+        indices = [primeiro[chave] for chave in perdas if chave in primeiro]
+        np.subtract.at(novos, indices, [perdas[chave] for chave in perdas if chave in primeiro])
+    return linhas, atuais, novos
+
+def recalcular_temporada(season_id, aplicar=False):
+    """Diferenças [{'id', 'race_id', 'pilot_id', 'antes', 'depois'}]; com aplicar=True grava em massa (sem commit).
+
+    A tarefa em segundo plano (app/tarefas.py) calcula a lista uma vez e grava em lotes.
+    """
+    linhas, atuais, novos = calcular_temporada(season_id)
+    mudaram = np.flatnonzero(~np.isclose(atuais, novos))
+    diferencas = [{
+        'id': linhas[i][0], 'race_id': linhas[i][1], 'pilot_id': linhas[i][2],
+        'antes': float(atuais[i]), 'depois': float(novos[i])
+    } for i in mudaram]
+    if aplicar and diferencas:
+        db.session.execute(update(RaceResult), [{'id': d['id'], 'pontos_ganhos': d['depois']} for d in diferencas])
+    return diferencas
+
+def init_app(app):
+    @app.cli.command('recalcular-pontos')
+    @click.argument('season_id', type=int)
+    @click.option('--aplicar', is_flag=True, help='Grava os novos pontos (sem a opção, só mostra as diferenças).')
+    def recalcular_pontos_command(season_id, aplicar):
+        """Recalcula os pontos de todos os resultados de uma temporada."""
+        season = db.session.get(Season, season_id)
+        if season is None:
+            raise click.BadParameter(f'temporada {season_id} não existe')
+        diferencas = recalcular_temporada(season_id, aplicar=aplicar)
+        nomes = dict(db.session.query(PilotProfile.id, PilotProfile.nickname))
+        corridas = dict(db.session.query(Race.id, Race.nome_gp).filter(Race.season_id == season_id))
+        for d in diferencas:
+            print(f'{corridas.get(d["race_id"], d["race_id"]):<30} {nomes.get(d["pilot_id"], d["pilot_id"]):<25} {d["antes"]:>7g} -> {d["depois"]:g}')
+        if aplicar:
+            db.session.commit()
+            print(f'{len(diferencas)} resultados atualizados em {season.nome}.')
+        else:
+            print(f'{len(diferencas)} resultados mudariam em {season.nome} (use --aplicar para gravar).')
@@ -0,0 +1,38 @@
+import gc
+from app.db_routing import engines
+
+# --- PRELOAD (gunicorn --preload) ---
+# O processo mestre importa o app e aquece tudo que é somente leitura antes do
+# fork; os workers herdam essas páginas de memória (copy-on-write) em vez de
+# cada um montar a sua cópia. Conexões não são herdadas: o mestre fecha as dele
+# aqui e cada worker descarta o pool herdado logo após o fork (db_routing).
+
+def aquecer(app):
+    """Deixa pronto no mestre o que os workers só leem."""
+    from app.models import db
+    # PISTAS_F1 (admin) e PONTUACAO_NORMAL/ORDEM_CARROS (utils) são montados na
+    # importação dos blueprints, que create_app() já fez.
+
+    # Templates compilados (o primeiro acesso a cada tela deixa de compilar em cada worker)
+    for nome in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(nome)
+
+    with app.app_context():
+        # Rotas já casadas, o /api/bundle e a projeção do campeonato da versão atual dos dados
+        app.url_map.update()
+        from app.routes.api import bundle_atual
+        from app.projecao import projecoes
+        try:
+            bundle_atual()
+            projecoes()
+        except Exception:  # banco ainda sem o 'flask bootstrap': o worker monta na primeira requisição
+            app.logger.exception('Bundle/projeção não pré-carregados')
+        db.session.remove()
+
+    for engine in engines(app, db):
+        engine.dispose()
+
+    # Objetos que sobreviveram até aqui não são mais percorridos pelo GC, que de
+    # outro modo tocaria nessas páginas e forçaria a cópia em cada worker
+    gc.collect()
+    gc.freeze()
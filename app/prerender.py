@@ -0,0 +1,150 @@
+import os
+from flask import current_app, g
+from app import ligas
+from app.changes import ao_confirmar, CAMPOS_PILOTO_TEMPORADA
+from app.models import db, News, PilotProfile, Team, Race, RaceResult
+from app.compression import escrever_estatico, remover_estatico
+
+# --- PÁGINAS PÚBLICAS PRÉ-RENDERIZADAS ---
+# Home, perfis de equipe, perfis públicos de piloto e notícias só mudam com
+# escritas do admin. Depois de cada commit o worker de tarefas (PUBLICAR) regera
+# apenas as páginas cujas dependências mudaram, como visitante anônimo, em STATIC_PAGES_FOLDER:
+#
+#   /                -> index.html
+#   /equipe/<id>     -> equipe/<id>.html
+#   /piloto/<id>     -> piloto/<id>.html
+#   /news/<id>       -> news/<id>.html
+
+PAGINAS = {
+    'home': ('public.home', None, '/'),
+    'equipe': ('public.team_profile', 'team_id', '/equipe/{}'),
+    'piloto': ('public.public_profile', 'pilot_id', '/piloto/{}'),
+    'news': ('public.news_detail', 'news_id', '/news/{}'),
+}
+
+def _caminho(pagina):
+    pasta = ligas.pasta(current_app.config['STATIC_PAGES_FOLDER'])
+    if pagina[0] == 'home':
+        return os.path.join(pasta, 'index.html')
+    return os.path.join(pasta, pagina[0], f'{pagina[1]}.html')
+
+def _existe(pagina):
+    modelo = {'equipe': Team, 'piloto': PilotProfile, 'news': News}.get(pagina[0])
+    return modelo is None or db.session.get(modelo, pagina[1]) is not None
+
+def renderizar(pagina):
+    """Renderiza a página como um visitante anônimo (contexto isolado da requisição atual)."""
+    app = current_app._get_current_object()
+    endpoint, parametro, url = PAGINAS[pagina[0]]
+    kwargs = {parametro: pagina[1]} if parametro else {}
+    liga = ligas.liga_atual()
+    base_url = ligas.registro().base_url(liga) if liga else None
+    with app.app_context():
+        with app.test_request_context(url.format(pagina[1]), base_url=base_url):
+            g.liga = liga
+            resposta = app.make_response(app.view_functions[endpoint](**kwargs))
+            if resposta.status_code != 200:
+                return None
+            return resposta.get_data()
+
+def publicar(paginas):
+    for pagina in paginas:
+        caminho = _caminho(pagina)
+        html = renderizar(pagina) if _existe(pagina) else None
+        if html is None:
+            remover_estatico(caminho)
+        else:
+            escrever_estatico(caminho, html)
+
+def _pilotos_do_grid(grids):
+    if not grids:
+        return set()
+    return {p.id for p in db.session.query(PilotProfile.id).filter(PilotProfile.grid.in_(grids))}
+
+def _equipes_do_grid(grids):
+    if not grids:
+        return set()
+    return {t.id for t in db.session.query(Team.id).filter(Team.grid.in_(grids))}
+
+def _equipes_dos_pilotos(ids):
+    if not ids:
+        return set()
+    return {p.team_id for p in db.session.query(PilotProfile.team_id).filter(PilotProfile.id.in_(ids)) if p.team_id}
+
+def _grids_das_corridas(ids):
+    if not ids:
+        return set()
+    return {r.grid for r in db.session.query(Race.grid).filter(Race.id.in_(ids)).distinct()}
+
+def paginas_afetadas(alt):
+    """Dependências de cada página pública. Ex.: salvar uma corrida refaz a home e todos os perfis do grid dela."""
+    if 'Season' in alt:
+        return todas_as_paginas()
+
+    pilotos = set()
+    equipes = set()
+    noticias = set()
+
+    if 'News' in alt:
+        noticias.update(alt.ids_de('News'))
+
+    # Todo perfil do grid mostra dados que dependem de todos os resultados dele (posição no
+    # campeonato, evolução, confrontos diretos, totais das equipes): refaz o grid inteiro
+    grids = set(alt.refs_de('Race', 'grid'))
+    corridas = set(alt.refs_de('RaceResult', 'race_id'))
+    if 'Protesto' in alt and alt.mudou('Protesto', 'status', 'veredito_final', 'data_fechamento', 'etapa_id', 'acusado_id'):
+        # Punições Média/Grave entram nos confrontos diretos do grid
+        corridas.update(alt.refs_de('Protesto', 'etapa_id'))
+    grids.update(_grids_das_corridas(corridas))
+    if 'PilotProfile' in alt and alt.mudou('PilotProfile', *CAMPOS_PILOTO_TEMPORADA):
+        grids.update(alt.refs_de('PilotProfile', 'grid'))
+    pilotos.update(_pilotos_do_grid(grids))
+    equipes.update(_equipes_do_grid(grids))
+
+    if 'RaceResult' in alt:
+        # Pilotos e equipes de fora do grid (reserva que correu, equipe do snapshot)
+        ids_pilotos = alt.refs_de('RaceResult', 'pilot_id')
+        pilotos.update(ids_pilotos)
+        equipes.update(alt.refs_de('RaceResult', 'team_id'))
+        equipes.update(_equipes_dos_pilotos(ids_pilotos))
+
+    if 'PilotProfile' in alt:
+        pilotos.update(alt.ids_de('PilotProfile'))
+        equipes.update(alt.refs_de('PilotProfile', 'team_id'))
+
+    if 'Team' in alt:
+        ids_equipes = alt.ids_de('Team')
+        equipes.update(ids_equipes)
+        pilotos.update(p.id for p in db.session.query(PilotProfile.id).filter(PilotProfile.team_id.in_(ids_equipes)))
+        if alt.mudou('Team', 'nome', 'logo_url'):
+            pilotos.update(r.pilot_id for r in db.session.query(RaceResult.pilot_id).filter(RaceResult.team_id.in_(ids_equipes)).distinct())
+
+    if 'Protesto' in alt and alt.mudou('Protesto', 'status', 'veredito_final', 'data_fechamento'):
+        # Quali ban aparece na home e no perfil do acusado
+        pilotos.update(alt.refs_de('Protesto', 'acusado_id'))
+
+    paginas = {('equipe', i) for i in equipes} | {('piloto', i) for i in pilotos} | {('news', i) for i in noticias}
+    if paginas:
+        paginas.add(('home', None))
+    return paginas
+
+def todas_as_paginas():
+    paginas = {('home', None)}
+    paginas.update(('equipe', t.id) for t in db.session.query(Team.id))
+    paginas.update(('piloto', p.id) for p in db.session.query(PilotProfile.id))
+    paginas.update(('news', n.id) for n in db.session.query(News.id))
+    return paginas
+
+@ao_confirmar
+def prerenderizar_alteracoes(alt):
+    if not current_app.config.get('STATIC_PAGES'):
+        return
+    publicar(paginas_afetadas(alt))
+
+def init_app(app):
+    @app.cli.command('prerender')
+    def prerender_command():
+        """Gera todas as páginas públicas estáticas."""
+        paginas = todas_as_paginas()
+        publicar(paginas)
+        print(f'{len(paginas)} páginas geradas em {app.config["STATIC_PAGES_FOLDER"]}')
@@ -0,0 +1,109 @@
+import numpy as np
+from app.changes import por_versao
+from app.cubo import cubo
+from app.desempate import ordenar
+
+# --- EVOLUÇÃO DO CAMPEONATO (CLASSIFICAÇÃO APÓS CADA ETAPA) ---
+# Lida do cubo da temporada (app/cubo.py): a matriz pilotos x corridas é dobrada
+# em pilotos x etapas concluídas com os pontos de cada etapa; a soma de
+# prefixos (cumsum) dá os pontos acumulados após cada rodada, e o histograma de
+# posições acumulado dá o countback da rodada. A posição no campeonato após a
+# etapa k sai de um lexsort sobre essas colunas (mesmo critério de
+# app/desempate.py), sem refazer a classificação a partir do banco N vezes.
+#
+# As colunas são as etapas concluídas do grid. Um resultado em etapa de outro
+# grid (piloto reserva) entra na última etapa do grid até aquela data, então a
+# última coluna é sempre igual à classificação atual. A penalidade de campeonato
+# vale desde a primeira rodada.
+
+# Evoluções montadas neste worker: {(liga, (season_id, grid)): (versão da temporada, Progressao)}
+_cache = {}
+
+class Progressao:
+    def __init__(self, rodadas, pilotos, acumulado, posicoes):
+        self.rodadas = rodadas  # [cubo.Corrida] concluídas do grid, em ordem cronológica
+        self.pilotos = pilotos  # [(id, nickname)] na ordem das linhas
+        self.indice = {p[0]: i for i, p in enumerate(pilotos)}
+        self.coluna = {r.id: k for k, r in enumerate(rodadas)}
+        self.acumulado = acumulado  # pilotos x rodadas
+        self.posicoes = posicoes  # pilotos x rodadas (1 = líder)
+
+    def serie(self, pilot_id):
+        """Pontos acumulados e posição do piloto após cada etapa ([] se ele não está no grid)."""
+        i = self.indice.get(pilot_id)
+        if i is None:
+            return []
+        return [{'race_id': r.id, 'gp': r.nome_gp, 'pontos': float(self.acumulado[i, k]), 'posicao': int(self.posicoes[i, k])}
+                for k, r in enumerate(self.rodadas)]
+
+    def classificacao_apos(self, race_id):
+        """Classificação logo após a etapa race_id, ou None se ela não é uma etapa concluída do grid."""
+        k = self.coluna.get(race_id)
+        if k is None:
+            return None
+        ordem = np.argsort(self.posicoes[:, k], kind='stable')
+        return [{'posicao': int(self.posicoes[i, k]), 'id': self.pilotos[i][0], 'nickname': self.pilotos[i][1],
+                 'pontos': float(self.acumulado[i, k])} for i in ordem]
+
+    def to_dict(self):
+        return {
+            'rodadas': [{'race_id': r.id, 'gp': r.nome_gp, 'tipo': r.tipo_etapa,
+                         'data': r.data_corrida.strftime('%d/%m/%Y') if r.data_corrida else 'TBA'} for r in self.rodadas],
+            'pilotos': [{'id': pid, 'nickname': nickname, 'pontos': self.acumulado[i].tolist(), 'posicoes': self.posicoes[i].tolist()}
+                        for i, (pid, nickname) in enumerate(self.pilotos)],
+        }
+
+def montar(season_id, grid):
+    c = cubo(season_id)
+    colunas = np.flatnonzero((c.grid_corrida == grid) & c.concluida)
+    rodadas = [c.corridas[k] for k in colunas]
+    linhas = np.array([i for i, p in enumerate(c.pilotos) if p.grid == grid], dtype=np.int64)
+    pilotos = [(c.pilotos[i].id, c.pilotos[i].nickname) for i in linhas]
+    ids = [p[0] for p in pilotos]
+    n, m = len(pilotos), len(rodadas)
+    if not n or not m:
+        return Progressao(rodadas, pilotos, np.zeros((n, m)), np.zeros((n, m), dtype=np.int64))
+
+    # Cada corrida da temporada cai na última rodada do grid até ela (antes da 1ª: na 1ª)
+    rodada = np.maximum(np.searchsorted(colunas, np.arange(len(c.corridas)), side='right') - 1, 0)
+    dobra = np.zeros((len(c.corridas), m))
+    dobra[np.arange(len(c.corridas)), rodada] = 1
+
+    # Pontos por etapa -> soma de prefixos
+    acumulado = np.cumsum(c.pontos_corrida[linhas].astype(np.float64) @ dobra, axis=1) - c.penalidade[linhas][:, None]
+
+    # Histograma de posições por etapa -> acumulado (countback de cada rodada)
+    posicao_cubo, valido_cubo = c.posicao[linhas], c.classificado[linhas]
+    piloto, coluna = np.nonzero(valido_cubo)
+    posicao = posicao_cubo[piloto, coluna].astype(np.int64)
+    rodada = rodada[coluna]
+    quando = coluna + 1  # colunas do cubo já estão em ordem cronológica
+    maior = max(int(posicao.max()) if posicao.size else 1, 1)
+    histograma = np.zeros((n, m, maior), dtype=np.int64)
+    np.add.at(histograma, (piloto, rodada, posicao - 1), 1)
+    histograma = np.cumsum(histograma, axis=1)
+
+    # Melhor resultado e quando foi obtido por último, atualizados rodada a rodada
+    posicoes = np.zeros((n, m), dtype=np.int64)
+    sem_resultado = maior + 1
+    melhor = np.full(n, sem_resultado)
+    ultima_melhor = np.zeros(n, dtype=np.int64)
+    for k in range(m):
+        nesta = rodada == k
+        melhor_k = np.full(n, sem_resultado)
+        np.minimum.at(melhor_k, piloto[nesta], posicao[nesta])
+        no_melhor = nesta.copy()
+        no_melhor[nesta] = posicao[nesta] == melhor_k[piloto[nesta]]
+        quando_k = np.zeros(n, dtype=np.int64)
+        np.maximum.at(quando_k, piloto[no_melhor], quando[no_melhor])
+        ultima_melhor = np.where(melhor_k < melhor, quando_k,
+                                 np.where((melhor_k == melhor) & (melhor_k < sem_resultado), np.maximum(ultima_melhor, quando_k), ultima_melhor))
+        melhor = np.minimum(melhor, melhor_k)
+        ordem = ordenar(ids, acumulado[:, k], histograma[:, k, :], ultima_melhor)
+        posicoes[ordem, k] = np.arange(1, n + 1)
+
+    return Progressao(rodadas, pilotos, acumulado, posicoes)
+
+def progressao(season_id, grid):
+    """Evolução do campeonato da temporada/grid, remontada apenas quando a versão da temporada muda."""
+    return por_versao(_cache, (season_id, grid), lambda versao: montar(season_id, grid), season_id=season_id)
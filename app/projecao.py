@@ -0,0 +1,168 @@
+import numpy as np
+from flask import current_app
+from app.changes import por_versao
+from app.models import db, Season, Race, RaceResult, PilotProfile
+from app.payloads import GRIDS
+from app.pontuacao import tabela_pontos
+from app.utils import MULTIPLICADOR_ETAPA, VAGAS_PROMOCAO
+
+# --- PROJEÇÃO DO CAMPEONATO ("QUEM AINDA PODE SER CAMPEÃO") ---
+# Para cada grid, simula as etapas que faltam milhares de vezes (Monte Carlo) e
+# conta em quantas o piloto termina campeão, no top 3 e na zona de acesso.
+#
+# Em cada etapa simulada a chegada é sorteada pelo modelo de Plackett-Luce
+# (peso = média de pontos de posição do piloto na temporada, com um piso para
+# quem correu pouco) e cada piloto pode abandonar com a sua taxa de DNF/ausência.
+# O sorteio usa o truque de Gumbel: log(peso) + ruído e um argsort por etapa.
+# Os bônus de cada etapa (1 ponto cada, sem multiplicador) também são sorteados:
+# volta rápida pelo mesmo peso, piloto do dia e da torcida por igual; quem
+# abandonou a etapa simulada não leva bônus.
+#
+# A eliminação matemática é exata: como qualquer rival pode zerar uma etapa
+# (DNF/ausência), o piloto i ainda alcança a posição k enquanto menos de k rivais
+# já tiverem mais pontos do que o máximo que i consegue somar (vencer todas as
+# etapas que faltam com volta rápida, piloto do dia e piloto da torcida). Empate
+# exato no máximo fica em aberto (o countback pode ir para qualquer lado): quem
+# empata ainda pode ser campeão e o líder só garante o título com o máximo de
+# cada rival abaixo dos seus pontos.
+
+BONUS_MAXIMO = 3 # volta rápida + piloto do dia + piloto da torcida
+PESO_MINIMO_ETAPAS = 2 # etapas "fictícias" de PESO_MINIMO_PONTOS na média de cada piloto
+PESO_MINIMO_PONTOS = 10
+BLOCO = 5000 # temporadas simuladas por vez (limita a memória do ruído: BLOCO x etapas x pilotos)
+
+# Projeções calculadas neste worker: {(liga, season_id): (versão da temporada, {grid: projeção})}
+_cache = {}
+
+def simular(pontos, forca, abandono, multiplicadores, simulacoes, rng, vagas=0):
+    """Probabilidades de título, top 3 e zona de acesso (arrays na ordem dos pilotos)."""
+    n, etapas = len(pontos), len(multiplicadores)
+    if n == 0:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+    tabela = tabela_pontos()
+    por_posicao = np.zeros(n)
+    ate = min(n, len(tabela) - 1)
+    por_posicao[:ate] = tabela[1:ate + 1]
+    log_forca = np.log(forca).astype(np.float32)
+    chance_volta = forca / forca.sum()
+
+    titulo, top3, zona = np.zeros(n), np.zeros(n), np.zeros(n)
+    posicoes = np.broadcast_to(np.arange(n), (BLOCO, n))
+    feitas = 0
+    while feitas < simulacoes:
+        b = min(BLOCO, simulacoes - feitas)
+        # Ruído de Gumbel em float32: metade da memória e do tempo, precisão de sobra para um sorteio
+        u = rng.random((b, etapas, n), dtype=np.float32)
+        u += np.finfo(np.float32).tiny # evita log(0)
+        escore = log_forca - np.log(-np.log(u))
+        abandonou = rng.random((b, etapas, n), dtype=np.float32) < abandono
+        escore[abandonou] = -np.inf
+        ordem = np.argsort(-escore, axis=2) # ordem[s, e, k] = piloto que chegou em k
+        ganhos = np.empty((b, etapas, n))
+        np.put_along_axis(ganhos, ordem, np.broadcast_to(por_posicao, (b, etapas, n)), axis=2)
+        ganhos[abandonou] = 0.0
+        total = pontos + (ganhos * multiplicadores[:, None]).sum(axis=1)
+
+        # Bônus: um piloto por etapa para cada um (b x etapas), somado por simulação com um bincount
+        simulacao = np.broadcast_to(np.arange(b)[:, None], (b, etapas))
+        etapa = np.broadcast_to(np.arange(etapas), (b, etapas))
+        for premiado in (rng.choice(n, size=(b, etapas), p=chance_volta),
+                         rng.integers(0, n, size=(b, etapas)), rng.integers(0, n, size=(b, etapas))):
+            valeu = ~abandonou[simulacao, etapa, premiado]
+            total += np.bincount((simulacao * n + premiado)[valeu], minlength=b * n).reshape(b, n)
+
+        # Empates no total são decididos por sorteio
+        final = np.argsort(-(total + rng.random((b, n)) * 1e-6), axis=1)
+        classificacao = np.empty((b, n), dtype=np.int64)
+        np.put_along_axis(classificacao, final, posicoes[:b], axis=1)
+        titulo += (classificacao == 0).sum(axis=0)
+        top3 += (classificacao < 3).sum(axis=0)
+        zona += (classificacao < vagas).sum(axis=0)
+        feitas += b
+    return titulo / simulacoes, top3 / simulacoes, zona / simulacoes
+
+def eliminacao(pontos, maximo, vagas=0):
+    """Chances matemáticas: quem ainda pode ser campeão/top 3/zona e quem já garantiu o título."""
+    a_frente = (pontos[None, :] > maximo[:, None]).sum(axis=1) # rivais fora de alcance
+    superados = (pontos[:, None] > maximo[None, :]).sum(axis=1) # rivais que não alcançam mais
+    n = len(pontos)
+    return {
+        'pode_titulo': a_frente == 0,
+        'pode_top3': a_frente < 3,
+        'pode_zona': a_frente < vagas,
+        'campeao': superados == n - 1,
+    }
+
+def _dados_da_temporada(season, grids):
+    pilotos = db.session.query(PilotProfile.id, PilotProfile.nickname, PilotProfile.grid, PilotProfile.penalidade_campeonato)\
+        .filter(PilotProfile.grid.in_(grids)).order_by(PilotProfile.id).all()
+    resultados = db.session.query(RaceResult.pilot_id, RaceResult.posicao, RaceResult.dnf, RaceResult.ausencia, RaceResult.pontos_ganhos)\
+        .join(Race).filter(Race.season_id == season.id).all()
+    restantes = db.session.query(Race.grid, Race.tipo_etapa)\
+        .filter(Race.season_id == season.id, Race.grid.in_(grids), Race.status != 'Concluida').all()
+    return pilotos, resultados, restantes
+
+def projetar(season, grids, simulacoes, semente=0):
+    """{grid: {'etapas_restantes', 'simulacoes', 'pilotos': [...]}} ordenado pelos pontos atuais."""
+    pilotos, resultados, restantes = _dados_da_temporada(season, grids)
+    tabela = tabela_pontos()
+    rng = np.random.default_rng(semente)
+
+    indice = {p.id: i for i, p in enumerate(pilotos)}
+    pontos = np.array([-float(p.penalidade_campeonato or 0) for p in pilotos])
+    soma_base, largadas, abandonos = np.zeros(len(pilotos)), np.zeros(len(pilotos)), np.zeros(len(pilotos))
+    for r in resultados:
+        i = indice.get(r.pilot_id)
+        if i is None:
+            continue
+        pontos[i] += r.pontos_ganhos or 0
+        largadas[i] += 1
+        if r.dnf or r.ausencia is not None:
+            abandonos[i] += 1
+        elif r.posicao and 0 < r.posicao < len(tabela):
+            soma_base[i] += tabela[r.posicao]
+    forca = (soma_base + PESO_MINIMO_ETAPAS * PESO_MINIMO_PONTOS) / (largadas + PESO_MINIMO_ETAPAS)
+    abandono = (abandonos + 1) / (largadas + 10)
+
+    projecoes = {}
+    for grid in grids:
+        idx = np.array([i for i, p in enumerate(pilotos) if p.grid == grid], dtype=np.int64)
+        multiplicadores = np.array([MULTIPLICADOR_ETAPA.get(t, 1.0) for g, t in restantes if g == grid])
+        vagas = VAGAS_PROMOCAO.get(grid, 0)
+        maximo = pontos[idx] + (tabela[1] * multiplicadores + BONUS_MAXIMO).sum()
+        titulo, top3, zona = simular(pontos[idx], forca[idx], abandono[idx], multiplicadores, simulacoes, rng, vagas)
+        chances = eliminacao(pontos[idx], maximo, vagas)
+
+        linhas = [{
+            'id': pilotos[i].id,
+            'nickname': pilotos[i].nickname,
+            'pontos': float(pontos[i]),
+            'maximo': float(maximo[j]),
+            'titulo': round(float(titulo[j]), 4),
+            'top3': round(float(top3[j]), 4),
+            'zona': round(float(zona[j]), 4) if vagas else None,
+            'pode_titulo': bool(chances['pode_titulo'][j]),
+            'pode_top3': bool(chances['pode_top3'][j]),
+            'pode_zona': bool(chances['pode_zona'][j]) if vagas else None,
+            'campeao': bool(chances['campeao'][j]),
+        } for j, i in enumerate(idx)]
+        linhas.sort(key=lambda x: x['pontos'], reverse=True)
+        projecoes[grid] = {
+            'etapas_restantes': len(multiplicadores),
+            'vagas_promocao': vagas,
+            'simulacoes': simulacoes,
+            'pilotos': linhas,
+        }
+    return projecoes
+
+def projecoes(season=None):
+    """Projeção dos grids da temporada ativa (ou `season`), refeita apenas quando a versão da temporada muda.
+
+    A semente do sorteio é a própria versão, então todos os workers mostram os mesmos números.
+    """
+    season = season or Season.query.filter_by(ativa=True).first()
+    if season is None:
+        return {}
+    simulacoes = current_app.config.get('PROJECAO_SIMULACOES', 20000)
+    return por_versao(_cache, season.id, lambda versao: projetar(season, GRIDS, simulacoes, semente=versao),
+                      season_id=season.id)
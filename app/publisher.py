@@ -0,0 +1,125 @@
+import os
+from flask import current_app
+from app import payloads, ligas
+from app.changes import ao_confirmar, versao_dados
+from app.compression import escrever_estatico, remover_estatico
+from app.models import db, Race, RaceResult
+from app.payloads import GRIDS
+
+# --- SNAPSHOTS ESTÁTICOS DA API ---
+# Depois de cada escrita relevante, regrava apenas os arquivos JSON afetados em
+# API_SNAPSHOT_FOLDER (app/static/api/). O servidor web entrega esses arquivos
+# direto, sem passar pelo Python; as rotas /api continuam como fallback.
+#
+#   /static/api/news.json                 -> /api/news
+#   /static/api/standings/<GRID>.json     -> /api/standings/<grid>
+#   /static/api/calendar/<GRID>.json      -> /api/calendar/<grid>
+#   /static/api/race/<id>/results.json    -> /api/race/<id>/results
+#   /static/api/pilots.json               -> /api/pilots
+#   /static/api/teams.json                -> /api/teams
+#   /static/api/bundle.json               -> /api/bundle
+
+def _caminho(alvo):
+    pasta = ligas.pasta(current_app.config['API_SNAPSHOT_FOLDER'])
+    tipo = alvo[0]
+    if tipo in ('news', 'pilots', 'teams', 'bundle'):
+        return os.path.join(pasta, f'{tipo}.json')
+    if tipo in ('standings', 'calendar'):
+        return os.path.join(pasta, tipo, f'{alvo[1]}.json')
+    return os.path.join(pasta, 'race', str(alvo[1]), 'results.json')
+
+def _conteudo(alvo):
+    tipo = alvo[0]
+    if tipo == 'news': return payloads.noticias()
+    if tipo == 'pilots': return payloads.pilotos()
+    if tipo == 'teams': return payloads.equipes()
+    if tipo == 'bundle': return payloads.bundle(versao_dados())
+    if tipo == 'standings': return payloads.classificacao(alvo[1])
+    if tipo == 'calendar': return payloads.calendario(alvo[1])
+    return payloads.resultados_corrida(alvo[1])
+
+def _grids(valores):
+    return {g for g in valores if g in GRIDS}
+
+def _corridas_com_resultados(coluna, ids):
+    if not ids:
+        return set()
+    return {r.race_id for r in db.session.query(RaceResult.race_id).filter(coluna.in_(ids)).distinct()}
+
+def alvos_afetados(alt):
+    """Traduz as alterações de um commit nos arquivos JSON que precisam ser refeitos."""
+    alvos = set()
+    grids_classificacao = set()
+    grids_calendario = set()
+    corridas = set()
+
+    if 'News' in alt:
+        alvos.add(('news',))
+
+    if 'Season' in alt:
+        grids_classificacao.update(GRIDS)
+        grids_calendario.update(GRIDS)
+
+    if 'Race' in alt:
+        grids_race = _grids(alt.refs_de('Race', 'grid'))
+        grids_calendario.update(grids_race)
+        # A data decide o desempate por "melhor resultado mais recente" (app/desempate.py)
+        if alt.mudou('Race', 'season_id', 'grid', 'data_corrida'):
+            grids_classificacao.update(grids_race)
+        corridas.update(alt.ids_de('Race'))
+
+    if 'RaceResult' in alt:
+        ids_corridas = alt.refs_de('RaceResult', 'race_id')
+        corridas.update(ids_corridas)
+        if ids_corridas:
+            grids_classificacao.update(g for (g,) in db.session.query(Race.grid).filter(Race.id.in_(ids_corridas)).distinct())
+
+    if 'PilotProfile' in alt:
+        alvos.add(('pilots',))
+        grids_classificacao.update(_grids(alt.refs_de('PilotProfile', 'grid')))
+        if alt.mudou('PilotProfile', 'nickname'):
+            corridas.update(_corridas_com_resultados(RaceResult.pilot_id, alt.ids_de('PilotProfile')))
+
+    if 'Team' in alt:
+        alvos.update({('teams',), ('pilots',)})
+        grids_classificacao.update(_grids(alt.refs_de('Team', 'grid')))
+        if alt.mudou('Team', 'nome'):
+            corridas.update(_corridas_com_resultados(RaceResult.team_id, alt.ids_de('Team')))
+
+    alvos.update(('standings', g) for g in _grids(grids_classificacao))
+    alvos.update(('calendar', g) for g in _grids(grids_calendario))
+    alvos.update(('race', r) for r in corridas)
+    # O bundle agrega news, standings, calendar e teams
+    if any(a[0] in ('news', 'standings', 'calendar', 'teams') for a in alvos):
+        alvos.add(('bundle',))
+    return alvos
+
+def publicar(alvos):
+    for alvo in alvos:
+        caminho = _caminho(alvo)
+        # Corrida apagada: o fallback /api responde a lista vazia, o arquivo some
+        if alvo[0] == 'race' and db.session.get(Race, alvo[1]) is None:
+            remover_estatico(caminho)
+            continue
+        escrever_estatico(caminho, current_app.json.response(_conteudo(alvo)).get_data())
+
+def todos_os_alvos():
+    alvos = {('news',), ('pilots',), ('teams',), ('bundle',)}
+    for g in GRIDS:
+        alvos.update({('standings', g), ('calendar', g)})
+    alvos.update(('race', r.id) for r in db.session.query(Race.id))
+    return alvos
+
+@ao_confirmar
+def publicar_alteracoes(alt):
+    if not current_app.config.get('API_SNAPSHOTS'):
+        return
+    publicar(alvos_afetados(alt))
+
+def init_app(app):
+    @app.cli.command('publicar-api')
+    def publicar_api_command():
+        """Regera todos os snapshots JSON da API."""
+        alvos = todos_os_alvos()
+        publicar(alvos)
+        print(f'{len(alvos)} arquivos publicados em {app.config["API_SNAPSHOT_FOLDER"]}')
@@ -0,0 +1,242 @@
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import case, event, func, literal_column, select, table, text, tuple_
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from app import busca
+from app.models import PilotProfile, Protesto, Race, RaceResult, Season, Team, User, db
+
+# --- REPOSITÓRIO DE CONSULTAS ---
+# As telas mais pesadas buscam aqui os dados que o template vai percorrer, já
+# com as relações carregadas (perfil de carga da rota). Assim o número de
+# comandos SQL de cada tela não cresce com o número de pilotos/corridas.
+#
+# LIMITE_CONSULTAS fixa esse número por endpoint. Com QUERY_BUDGETS ligado,
+# cada resposta traz o cabeçalho X-Consultas e estourar o limite gera um aviso
+# no log (ou erro, em app.testing). As consultas que montam os caches por versão
+# dos dados (cubo da temporada, projeção, confrontos, evolução) saem à parte, em
+# X-Consultas-Cache. Os limites contam a carga do usuário logado (Flask-Login).
+#
+# LIMITE_CONSULTAS_FRIO limita a primeira requisição depois de uma escrita na
+# temporada (caches vazios): a tela mais a montagem dos caches.
+
+LIMITE_CONSULTAS = {
+    'public.home': 11,
+    'public.public_profile': 9,
+    'admin.overview': 4,
+    'admin.race_results': 7,
+    'admin.list_pilots': 4,
+    'admin.protests': 9,
+    'admin.edit_team': 3,
+}
+
+LIMITE_CONSULTAS_FRIO = {
+    'public.home': 17,
+    'public.public_profile': 13,
+}
+
+# --- PERFIS DE CARGA ---
+
+def _pilotos_com_usuario():
+    return PilotProfile.query.join(User).options(contains_eager(PilotProfile.user))
+
+def pilotos_com_equipe():
+    """Home e overview: todos os pilotos com usuário e equipe (pontos e ordem vêm do cubo da temporada)."""
+    return _pilotos_com_usuario().options(joinedload(PilotProfile.team)).all()
+
+def pilotos_por_grid(grids):
+    return _pilotos_com_usuario().options(joinedload(PilotProfile.team))\
+        .filter(PilotProfile.grid.in_(grids)).order_by(PilotProfile.nickname).all()
+
+def equipes_ativas_com_pilotos():
+    return Team.query.filter_by(ativa=True).options(selectinload(Team.pilots)).all()
+
+def corridas_com_resultados(season_id):
+    """Calendário da home: cada corrida com o pódio (resultado -> piloto/equipe)."""
+    return Race.query.filter_by(season_id=season_id).options(
+        selectinload(Race.results).joinedload(RaceResult.pilot),
+        selectinload(Race.results).joinedload(RaceResult.team_snapshot)
+    ).order_by(Race.data_corrida).all()
+
+def titulares_da_corrida(race):
+    return _pilotos_com_usuario().options(joinedload(PilotProfile.team)).filter(
+        PilotProfile.grid == race.grid,
+        PilotProfile.team_id != None
+    ).order_by(PilotProfile.nickname).all()
+
+def reservas_disponiveis():
+    return _pilotos_com_usuario().filter(PilotProfile.team_id == None).order_by(PilotProfile.nickname).all()
+
+# Abas da lista de pilotos do admin (grids fora desta lista contam como SEM_GRID)
+GRIDS_ADMIN = ['ELITE', 'ADVANCED', 'INITIAL', 'RESERVA', 'SEM_GRID']
+PILOTOS_POR_PAGINA = 50
+
+def _no_grid_admin(grid):
+    if grid == 'SEM_GRID':
+        return PilotProfile.grid.notin_(GRIDS_ADMIN[:-1])
+    return PilotProfile.grid == grid
+
+def filtros_pilotos(equipe='', banido=False, role='', texto=''):
+    """Condições da lista de pilotos do admin, exceto o grid (que separa as abas).
+
+    equipe: id da equipe ou 'sem'; role: papel do usuário, 'TODOS', ou vazio para
+    esconder os ex-pilotos anonimizados (INATIVO); texto: busca no nickname/nome real (FTS5).
+    """
+    filtros = []
+    if equipe == 'sem':
+        filtros.append(PilotProfile.team_id.is_(None))
+    elif str(equipe).isdigit():
+        filtros.append(PilotProfile.team_id == int(equipe))
+    if banido:
+        filtros.append(PilotProfile.pontos_cnh <= 0)
+    if not role:
+        filtros.append(User.role != 'INATIVO')
+    elif role != 'TODOS':
+        filtros.append(User.role == role)
+    consulta = busca.consulta_fts(texto)
+    if consulta:
+        encontrados = select(literal_column('rowid')).select_from(table('busca_piloto'))\
+            .where(text('busca_piloto MATCH :consulta_piloto').bindparams(consulta_piloto=consulta))
+        filtros.append(PilotProfile.id.in_(encontrados))
+    return filtros
+
+def contagem_pilotos_por_grid(filtros):
+    """{grid: quantidade} das abas com os mesmos filtros, em um único GROUP BY."""
+    grid = case((PilotProfile.grid.in_(GRIDS_ADMIN[:-1]), PilotProfile.grid), else_='SEM_GRID')
+    contagem = dict(db.session.query(grid, func.count(PilotProfile.id)).join(User).filter(*filtros).group_by(grid).all())
+    return {g: contagem.get(g, 0) for g in GRIDS_ADMIN}
+
+def pilotos_admin(grid, filtros, apos=None, limite=PILOTOS_POR_PAGINA):
+    """Uma página da aba (ordem nickname, id) depois do piloto `apos` (keyset), com user e team carregados.
+
+    Devolve (pilotos, id do último da página se houver próxima, senão None).
+    """
+    consulta = _pilotos_com_usuario().options(joinedload(PilotProfile.team)).filter(_no_grid_admin(grid), *filtros)
+    if apos:
+        nickname = select(PilotProfile.nickname).where(PilotProfile.id == apos).scalar_subquery()
+        consulta = consulta.filter(tuple_(PilotProfile.nickname, PilotProfile.id) > tuple_(nickname, apos))
+    pilotos = consulta.order_by(PilotProfile.nickname, PilotProfile.id).limit(limite + 1).all()
+    return pilotos[:limite], (pilotos[limite - 1].id if len(pilotos) > limite else None)
+
+def pilotos_disponiveis_equipe(team):
+    return _pilotos_com_usuario().filter(
+        PilotProfile.grid == team.grid,
+        (PilotProfile.team_id == None) | (PilotProfile.team_id == team.id)
+    ).all()
+
+def protestos(status, ordem, limite=None):
+    """Protestos do tribunal com etapa, acusador, acusado e votos."""
+    query = Protesto.query.filter_by(status=status).options(
+        joinedload(Protesto.etapa),
+        joinedload(Protesto.acusador),
+        joinedload(Protesto.acusado),
+        selectinload(Protesto.votos)
+    ).order_by(ordem)
+    if limite:
+        query = query.limit(limite)
+    return query.all()
+
+def quali_bans(pilot_ids):
+    """{pilot_id: bool} em duas consultas, qualquer que seja o número de pilotos.
+
+    O ban vale quando a última punição concluída do piloto foi Média ou Grave e
+    ele ainda não correu depois do fechamento do protesto.
+    """
+    bans = {pid: False for pid in pilot_ids}
+    if not bans:
+        return bans
+
+    ultimo_fechamento = db.session.query(
+        Protesto.acusado_id, func.max(Protesto.data_fechamento).label('data_fechamento')
+    ).filter(Protesto.status == 'CONCLUIDO', Protesto.acusado_id.in_(bans))\
+        .group_by(Protesto.acusado_id).subquery()
+    ultimos = db.session.query(Protesto.acusado_id, Protesto.veredito_final, Protesto.data_fechamento).join(
+        ultimo_fechamento,
+        (Protesto.acusado_id == ultimo_fechamento.c.acusado_id) &
+        (Protesto.data_fechamento == ultimo_fechamento.c.data_fechamento)
+    ).filter(Protesto.status == 'CONCLUIDO', Protesto.veredito_final.in_(['MEDIA', 'GRAVE'])).all()
+    if not ultimos:
+        return bans
+
+    ultima_corrida = dict(db.session.query(RaceResult.pilot_id, func.max(Race.data_corrida))
+                          .join(Race).filter(Race.status == 'Concluida', RaceResult.pilot_id.in_([u.acusado_id for u in ultimos]))
+                          .group_by(RaceResult.pilot_id).all())
+    for u in ultimos:
+        data_corrida = ultima_corrida.get(u.acusado_id)
+        # Se ele ainda não correu após o fechamento do protesto, o ban está ativo
+        if not data_corrida or u.data_fechamento.date() >= data_corrida:
+            bans[u.acusado_id] = True
+    return bans
+
+def historico_de_carreira(pilot_id):
+    """Temporadas encerradas do piloto (mais recente primeiro): pontos, vitórias e grid em que mais correu.
+
+    Uma consulta agrupada sobre os resultados do piloto, sem montar o cubo de cada temporada.
+    """
+    vitoria = (RaceResult.posicao == 1) & RaceResult.dnf.isnot(True) & RaceResult.dsq.isnot(True) & RaceResult.ausencia.is_(None)
+    linhas = db.session.query(
+        Season.id, Season.nome, Race.grid, func.count(RaceResult.id),
+        func.coalesce(func.sum(RaceResult.pontos_ganhos), 0.0), func.sum(case((vitoria, 1), else_=0))
+    ).join(Race, Race.season_id == Season.id).join(RaceResult, RaceResult.race_id == Race.id)\
+        .filter(Season.ativa == False, RaceResult.pilot_id == pilot_id)\
+        .group_by(Season.id, Season.nome, Race.grid).order_by(Season.id.desc(), Race.grid).all()
+    historico = {}
+    for season_id, nome, grid, corridas, pontos, vitorias in linhas:
+        temporada = historico.setdefault(season_id, {'season_nome': nome, 'pontos': 0.0, 'vitorias': 0, 'grid': grid, 'corridas': 0})
+        temporada['pontos'] += float(pontos)
+        temporada['vitorias'] += int(vitorias or 0)
+        # Grid predominante (no empate, o primeiro em ordem alfabética)
+        if corridas > temporada['corridas']:
+            temporada['grid'], temporada['corridas'] = grid, corridas
+    return [{k: v for k, v in t.items() if k != 'corridas'} for t in historico.values()]
+
+# --- CONTAGEM DE CONSULTAS POR REQUISIÇÃO ---
+
+def _contar_consulta(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        chave = 'consultas_cache' if g.get('montando_cache') else 'consultas'
+        g.setdefault(chave, 0)
+        setattr(g, chave, getattr(g, chave) + 1)
+
+@contextmanager
+def fora_do_limite():
+    """Dados derivados montados uma vez por versão (changes.por_versao) não entram no limite da tela."""
+    if not has_request_context() or g.get('montando_cache'):
+        yield
+        return
+    g.montando_cache = True
+    try:
+        yield
+    finally:
+        g.montando_cache = False
+
+def init_app(app, db):
+    if not app.config.get('QUERY_BUDGETS'):
+        return
+
+    with app.app_context():
+        engines = [db.engine, app.extensions.get('engine_leitura')]
+    for engine in engines:
+        if engine is not None:
+            event.listen(engine, 'before_cursor_execute', _contar_consulta)
+    # Engines das ligas (app/ligas.py), abertos sob demanda e reabertos após o despejo
+    registro = app.extensions.get('ligas')
+    if registro is not None:
+        registro.ao_abrir.append(lambda engine: event.listen(engine, 'before_cursor_execute', _contar_consulta))
+
+    @app.after_request
+    def verificar_limite_consultas(response):
+        consultas = g.get('consultas', 0)
+        response.headers['X-Consultas'] = str(consultas)
+        if g.get('consultas_cache'):
+            response.headers['X-Consultas-Cache'] = str(g.consultas_cache)
+        if request.method != 'GET':
+            return response
+        medidas = ((consultas, LIMITE_CONSULTAS.get(request.endpoint), 'consultas'),
+                   (consultas + g.get('consultas_cache', 0), LIMITE_CONSULTAS_FRIO.get(request.endpoint), 'consultas com os caches'))
+        for usadas, limite, nome in medidas:
+            if limite is not None and usadas > limite:
+                mensagem = f'{request.endpoint}: {usadas} {nome} (limite {limite})'
+                if app.testing:
+                    raise AssertionError(mensagem)
+                app.logger.warning(mensagem)
+        return response
@@ -0,0 +1,139 @@
+import click
+from sqlalchemy import and_, case, func, insert
+from sqlalchemy.orm import contains_eager
+from app.changes import ao_confirmar
+from app.cubo import cubo
+from app.models import db, Season, PilotProfile, RaceResult, RecordePiloto, TituloTemporada
+from app.payloads import GRIDS
+from app.utils import RECORDES_MIN_LARGADAS
+
+# --- RECORDES DE TODOS OS TEMPOS ---
+# Totais de carreira de cada piloto (todas as temporadas) guardados em
+# RecordePiloto. A cada commit que mexe em resultados (lançamento em
+# admin.race_results, veredito de protesto, recálculo de pontos, exclusão),
+# só os pilotos atingidos são refeitos, com uma consulta agrupada sobre os
+# resultados deles: o custo não cresce com o número de temporadas da liga.
+#
+# Títulos: ao encerrar a temporada, o líder de cada grid (mesma classificação
+# da home, via cubo da temporada) é gravado em TituloTemporada antes de os
+# pilotos serem liberados do grid.
+
+# (chave, título) na ordem da página
+CATEGORIAS = [
+    ('vitorias', 'Vitórias'),
+    ('podios', 'Pódios'),
+    ('titulos', 'Títulos'),
+    ('voltas_rapidas', 'Voltas Mais Rápidas'),
+    ('pilotos_do_dia', 'Piloto do Dia'),
+    ('largadas', 'Largadas'),
+    ('taxa_dnf', 'Menor Taxa de DNF'),
+]
+
+def atualizar(pilot_ids):
+    """Refaz os totais de carreira destes pilotos (sem commit)."""
+    ids = sorted(set(pilot_ids))
+    largou = RaceResult.ausencia.is_(None)
+    classificado = and_(largou, RaceResult.posicao > 0, RaceResult.dnf.isnot(True), RaceResult.dsq.isnot(True))
+    contar = lambda condicao: func.sum(case((condicao, 1), else_=0))
+    for inicio in range(0, len(ids), 500):
+        lote = ids[inicio:inicio + 500]
+        totais = db.session.query(
+            RaceResult.pilot_id,
+            contar(largou).label('largadas'),
+            contar(and_(classificado, RaceResult.posicao == 1)).label('vitorias'),
+            contar(and_(classificado, RaceResult.posicao <= 3)).label('podios'),
+            contar(RaceResult.volta_rapida.is_(True)).label('voltas_rapidas'),
+            contar(RaceResult.piloto_do_dia.is_(True)).label('pilotos_do_dia'),
+            contar(and_(largou, RaceResult.dnf.is_(True))).label('dnfs'),
+            func.coalesce(func.sum(RaceResult.pontos_ganhos), 0).label('pontos'),
+        ).filter(RaceResult.pilot_id.in_(lote)).group_by(RaceResult.pilot_id).all()
+        titulos = dict(db.session.query(TituloTemporada.pilot_id, func.count(TituloTemporada.id))
+                       .filter(TituloTemporada.pilot_id.in_(lote)).group_by(TituloTemporada.pilot_id).all())
+
+        linhas = {t.pilot_id: {**t._asdict(), 'titulos': 0} for t in totais}
+        for pilot_id, quantidade in titulos.items():
+            linhas.setdefault(pilot_id, {'pilot_id': pilot_id, 'largadas': 0, 'vitorias': 0, 'podios': 0, 'voltas_rapidas': 0,
+                                         'pilotos_do_dia': 0, 'dnfs': 0, 'pontos': 0.0})['titulos'] = quantidade
+
+        db.session.query(RecordePiloto).filter(RecordePiloto.pilot_id.in_(lote)).delete(synchronize_session=False)
+        if linhas:
+            db.session.execute(insert(RecordePiloto), list(linhas.values()))
+
+def registrar_titulos(season_id, historico=False):
+    """Grava o campeão de cada grid da temporada (sem commit) e devolve {grid: pilot_id}.
+
+    Ao encerrar a temporada vale o grid atual de cada piloto; com historico=True
+    (temporadas antigas, pilotos já fora do grid), o grid em que ele mais correu.
+    """
+    temporada = cubo(season_id)
+    if historico:
+        grid_de = {p.id: (temporada.resumo(p.id) or {}).get('grid') for p in temporada.pilotos}
+    else:
+        grid_de = {p.id: p.grid for p in temporada.pilotos}
+
+    campeoes = {}
+    for grid in GRIDS:
+        ids = [pid for pid, g in grid_de.items() if g == grid]
+        if not ids:
+            continue
+        lider = ids[temporada.ordem(ids)[0]]
+        if temporada.resumo(lider):
+            campeoes[grid] = lider
+
+    TituloTemporada.query.filter_by(season_id=season_id).delete()
+    for grid, pilot_id in campeoes.items():
+        db.session.add(TituloTemporada(season_id=season_id, grid=grid, pilot_id=pilot_id))
+    return campeoes
+
+def refazer():
+    """Reconstrói os recordes do zero: títulos das temporadas encerradas que não têm e os totais de todos."""
+    for season in Season.query.filter_by(ativa=False).order_by(Season.id).all():
+        if not TituloTemporada.query.filter_by(season_id=season.id).first():
+            registrar_titulos(season.id, historico=True)
+    db.session.query(RecordePiloto).delete()
+    atualizar(pid for (pid,) in db.session.query(PilotProfile.id))
+
+@ao_confirmar
+def _atualizar_recordes(alt):
+    pilotos = set(alt.refs_de('RaceResult', 'pilot_id'))
+    if 'Season' in alt:
+        # Temporada encerrada: os campeões acabaram de ganhar um título
+        pilotos.update(pid for (pid,) in db.session.query(TituloTemporada.pilot_id)
+                       .filter(TituloTemporada.season_id.in_(alt.ids_de('Season'))))
+    if pilotos:
+        atualizar(pilotos)
+        db.session.commit()
+
+def recordes(limite=10):
+    """Top `limite` de cada categoria: {chave: {'titulo', 'pilotos': [...]}} (página /recordes e /api/recordes).
+
+    Uma consulta com ORDER BY/LIMIT por categoria: só as linhas exibidas saem do banco.
+    """
+    tabelas = {}
+    for chave, titulo in CATEGORIAS:
+        consulta = RecordePiloto.query.join(RecordePiloto.pilot).options(contains_eager(RecordePiloto.pilot))
+        if chave == 'taxa_dnf':
+            consulta = consulta.filter(RecordePiloto.largadas >= RECORDES_MIN_LARGADAS).order_by(
+                (RecordePiloto.dnfs * 1.0 / RecordePiloto.largadas), RecordePiloto.largadas.desc(), PilotProfile.nickname)
+        else:
+            coluna = getattr(RecordePiloto, chave)
+            consulta = consulta.filter(coluna > 0).order_by(coluna.desc(), RecordePiloto.largadas, PilotProfile.nickname)
+        melhores = consulta.limit(limite).all()
+        tabelas[chave] = {'titulo': titulo, 'pilotos': [{
+            'id': r.pilot_id,
+            'nickname': r.pilot.nickname,
+            'foto': r.pilot.foto_url,
+            'valor': round(r.taxa_dnf * 100, 1) if chave == 'taxa_dnf' else getattr(r, chave),
+            'largadas': r.largadas,
+        } for r in melhores]}
+    return tabelas
+
+def init_app(app):
+    @app.cli.command('recordes')
+    def recordes_command():
+        """Reconstrói os recordes de todos os tempos (após atualizar o banco ou importar dados)."""
+        refazer()
+        db.session.commit()
+        titulos = db.session.query(func.count(TituloTemporada.id)).scalar()
+        pilotos = db.session.query(func.count(RecordePiloto.pilot_id)).scalar()
+        print(f'Recordes refeitos: {pilotos} pilotos, {titulos} títulos.')
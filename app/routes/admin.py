@@ -4,8 +4,9 @@ from datetime import datetime
 from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app
 from flask_login import login_required, current_user
 from sqlalchemy import func
-from app.models import db, User, PilotProfile, Season, Race, RaceResult, Invite, Protesto, VotoComissario, Team, RaceRegistration, SeletivaEntry, News
-from app.utils import allowed_file, get_embed_url, PONTUACAO_NORMAL, ORDEM_CARROS
+from app.models import db, User, PilotProfile, Season, Race, RaceResult, Invite, Protesto, VotoComissario, Team, RaceRegistration, SeletivaEntry, News, VideoProtesto
+from app.utils import allowed_file, get_embed_url, PONTUACAO_NORMAL, MULTIPLICADOR_ETAPA, PERDA_VEREDITO, ADVERTENCIAS_POR_PUNICAO, PERDA_ADVERTENCIAS
+from app import queries, ligas, pontuacao, desempate, cubo, recordes, busca, notificacoes, tarefas, auditoria, videos
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -52,7 +53,20 @@ def restrict_access():
 @admin_bp.route('/dashboard')
 def dashboard():
     season_ativa = Season.query.filter_by(ativa=True).first()
-    return render_template('admin/dashboard.html', season_ativa=season_ativa)
+    return render_template('admin/dashboard.html', season_ativa=season_ativa, tarefas=tarefas.recentes())
+
+def _agendar(tipo, chave, descricao, parametros, alvo=None):
+    # Operações pesadas rodam no 'flask tarefas worker'; clique repetido reaproveita a tarefa ativa
+    # A trilha de auditoria guarda o pedido, com os campos-chave do alvo como estavam
+    if alvo is not None:
+        auditoria.registrar(tipo, type(alvo).__name__, alvo.id, antes=auditoria.campos(alvo), depois=parametros)
+    else:
+        auditoria.registrar(tipo, 'Tarefa', depois=parametros)
+    tarefa, nova = tarefas.agendar(tipo, chave, descricao, parametros, current_user.id)
+    if nova:
+        flash(f'{descricao}: agendado. Acompanhe o progresso no Painel.', 'info')
+    else:
+        flash(f'{descricao}: já está em andamento (tarefa #{tarefa.id}).', 'warning')
 
 @admin_bp.route('/overview')
 def overview():
@@ -65,28 +79,24 @@ def overview():
     
     if season_ativa:
         # Removemos o filtro de SUPER_ADM para que eles apareçam se tiverem grid definido
-        pilotos = PilotProfile.query.join(User).all()
+        temporada = cubo.cubo(season_ativa.id)
+        pilotos = [p for p in queries.pilotos_com_equipe() if p.grid in dados_grids]
+        ids = [p.id for p in pilotos]
         
-        for p in pilotos:
-            if p.grid in dados_grids:
-                resultados_season = [r for r in p.race_results if r.race.season_id == season_ativa.id]
-                pontos = float(sum(r.pontos_ganhos for r in resultados_season))
-                vitorias = sum(1 for r in resultados_season if r.posicao == 1 and not r.dsq)
-                podios = sum(1 for r in resultados_season if r.posicao in [1, 2, 3] and not r.dsq)
-                
-                info = {
-                    'piloto': p, 
-                    'pontos': pontos, 
-                    'vitorias': vitorias, 
-                    'podios': podios, 
-                    'cnh': p.pontos_cnh, 
-                    'advertencias': p.advertencias_acumuladas
-                }
-                dados_grids[p.grid]['classificacao'].append(info)
-                dados_grids[p.grid]['disciplina'].append(info)
+        for p, pontos, vitorias, podios in zip(pilotos, temporada.pontos(ids), temporada.contagem(ids, 1), temporada.contagem(ids, 3)):
+            info = {
+                'piloto': p, 
+                'pontos': float(pontos), 
+                'vitorias': int(vitorias), 
+                'podios': int(podios), 
+                'cnh': p.pontos_cnh, 
+                'advertencias': p.advertencias_acumuladas
+            }
+            dados_grids[p.grid]['classificacao'].append(info)
+            dados_grids[p.grid]['disciplina'].append(info)
                 
         for grid in dados_grids:
-            dados_grids[grid]['classificacao'].sort(key=lambda x: x['pontos'], reverse=True)
+            dados_grids[grid]['classificacao'] = temporada.classificar(dados_grids[grid]['classificacao'])
             dados_grids[grid]['disciplina'].sort(key=lambda x: x['cnh'])
             
     return render_template('admin/overview.html', dados=dados_grids, season=season_ativa)
@@ -95,6 +105,17 @@ def overview():
 def manual():
     return render_template('admin/manual.html')
 
+# --- BUSCA ---
+
+@admin_bp.route('/busca')
+def search():
+    # Notícias, pilotos, equipes e protestos (precedentes do tribunal) por relevância
+    tipo = request.args.get('tipo') or None
+    resultado = busca.buscar(request.args.get('q', ''), [tipo] if tipo else None, request.args.get('pagina', 1, type=int))
+    for r in resultado['resultados']:
+        r['trecho'] = busca.destacar(r['trecho'])
+    return render_template('admin/search.html', busca=resultado, tipo=tipo, tipos=list(busca.INDICES))
+
 # --- GESTÃO DE NOTÍCIAS ---
 
 @admin_bp.route('/news')
@@ -118,7 +139,7 @@ def create_news():
             if file and file.filename != '' and allowed_file(file.filename):
                 ext = file.filename.rsplit('.', 1)[1].lower()
                 timestamp = int(datetime.utcnow().timestamp())
-                nome_arq = f"news_{nova_noticia.id}_{timestamp}.{ext}"
+                nome_arq = ligas.nome_upload(f"news_{nova_noticia.id}_{timestamp}.{ext}")
                 file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], nome_arq))
                 nova_noticia.imagem_url = nome_arq
         
@@ -232,60 +253,31 @@ def delete_admin(user_id):
         flash('O Super Admin principal não pode ser excluído.', 'danger')
         return redirect(url_for('admin.list_admins'))
 
-    # Verifica se tem histórico de corrida (para não quebrar pontuação de equipe)
-    has_history = False
-    if user.pilot_profile:
-        if RaceResult.query.filter_by(pilot_id=user.pilot_profile.id).first():
-            has_history = True
-
-    if has_history:
-        # ANONIMIZAR (Preserva histórico)
-        profile = user.pilot_profile
-        if profile.foto_url:
-            path = os.path.join(current_app.config['UPLOAD_FOLDER'], profile.foto_url)
-            if os.path.exists(path): os.remove(path)
-            profile.foto_url = None
-        
-        suffix = secrets.token_hex(4)
-        user.username = f"Ex-Admin_{user.id}_{suffix}"
-        user.email = f"deleted_{user.id}_{suffix}@fullgas.local"
-        user.set_password(secrets.token_hex(16))
-        user.role = 'INATIVO'
-        
-        profile.nickname = "Usuário Removido"
-        profile.nome_real = "Dados Removidos"
-        profile.team_id = None
-        RaceRegistration.query.filter_by(pilot_id=profile.id).delete()
-        
-        db.session.commit()
-        flash('Administrador possuía histórico. Conta anonimizada para preservar pontuação das equipes.', 'warning')
-        
-    else:
-        # EXCLUSÃO TOTAL (Sem histórico)
-        if user.pilot_profile:
-            profile = user.pilot_profile
-            if profile.foto_url:
-                path = os.path.join(current_app.config['UPLOAD_FOLDER'], profile.foto_url)
-                if os.path.exists(path): os.remove(path)
-            
-            # Limpa dependências
-            profile.team_id = None
-            RaceResult.query.filter_by(pilot_id=profile.id).delete()
-            RaceRegistration.query.filter_by(pilot_id=profile.id).delete()
-            
-            protestos = Protesto.query.filter((Protesto.acusador_id == profile.id) | (Protesto.acusado_id == profile.id)).all()
-            for p in protestos:
-                VotoComissario.query.filter_by(protesto_id=p.id).delete()
-                db.session.delete(p)
-            
-            db.session.delete(profile)
-        
-        db.session.delete(user)
-        db.session.commit()
-        flash('Administrador removido.', 'success')
-        
+    # Anonimização (com histórico de corrida) ou exclusão total em segundo plano (app/tarefas.py)
+    _agendar('EXCLUIR_USUARIO', f'usuario:{user.id}', f'Excluir administrador {user.username}',
+             {'user_id': user.id, 'origem': 'admin'}, user)
     return redirect(url_for('admin.list_admins'))
 
+@admin_bp.route('/auditoria')
+def audit_log():
+    # Trilha das ações do painel (app/auditoria.py), por entidade ou por admin, mais recentes primeiro
+    if current_user.role != 'SUPER_ADM':
+        flash('Acesso restrito ao Super Admin.', 'danger')
+        return redirect(url_for('admin.dashboard'))
+    filtro = {
+        'entidade': request.args.get('entidade', ''),
+        'entidade_id': request.args.get('entidade_id', ''),
+        'admin_id': request.args.get('admin_id', ''),
+    }
+    if filtro['entidade'] not in auditoria.CAMPOS and filtro['entidade'] != 'Tarefa':
+        filtro['entidade'] = ''
+    entidade_id = request.args.get('entidade_id', type=int) if filtro['entidade'] else None
+    linhas, proximo = auditoria.consultar(filtro['entidade'], entidade_id, request.args.get('admin_id', type=int),
+                                          request.args.get('antes_de', type=int))
+    admins = User.query.filter(User.role.in_(['ADM', 'SUPER_ADM'])).order_by(User.username).all()
+    return render_template('admin/audit_log.html', linhas=linhas, proximo=proximo, filtro=filtro, admins=admins,
+                           entidades=[*auditoria.CAMPOS, 'Tarefa'], paginado='antes_de' in request.args)
+
 # --- GESTÃO DE TEMPORADAS E CORRIDAS ---
 
 @admin_bp.route('/seasons')
@@ -329,6 +321,23 @@ def manage_season(season_id):
         
     return render_template('admin/season_detail.html', season=season, pistas=PISTAS_F1)
 
+@admin_bp.route('/seasons/<int:season_id>/recalcular', methods=['GET', 'POST'])
+def recalculate_season(season_id):
+    # Refaz os pontos de todos os resultados com a tabela/multiplicadores/vereditos atuais.
+    # GET mostra o que mudaria; POST grava.
+    season = Season.query.get_or_404(season_id)
+    if request.method == 'POST':
+        if current_user.role != 'SUPER_ADM':
+            flash('Apenas o Super ADM pode recalcular a pontuação.', 'danger')
+            return redirect(url_for('admin.recalculate_season', season_id=season.id))
+        _agendar('RECALCULAR_PONTOS', f'pontos:{season.id}', f'Recalcular pontos de {season.nome}', {'season_id': season.id}, season)
+        return redirect(url_for('admin.manage_season', season_id=season.id))
+
+    diferencas = pontuacao.recalcular_temporada(season.id)
+    pilotos = {p.id: p for p in PilotProfile.query.filter(PilotProfile.id.in_({d['pilot_id'] for d in diferencas}))}
+    corridas = {r.id: r for r in Race.query.filter_by(season_id=season.id)}
+    return render_template('admin/recalculate_season.html', season=season, diferencas=diferencas, pilotos=pilotos, corridas=corridas)
+
 @admin_bp.route('/season/<int:season_id>/close', methods=['POST'])
 def close_season(season_id):
     if current_user.role != 'SUPER_ADM':
@@ -336,23 +345,9 @@ def close_season(season_id):
         return redirect(url_for('admin.seasons'))
     
     season = Season.query.get_or_404(season_id)
-    season.ativa = False
     
-    # 1. Resetar Disciplina e Demitir Pilotos (Exceto Super ADM)
-    pilotos = PilotProfile.query.join(User).filter(User.role != 'SUPER_ADM').all()
-    for p in pilotos:
-        p.pontos_cnh = 25
-        p.advertencias_acumuladas = 0
-        p.team_id = None # Todos viram Free Agents
-        p.grid = 'SEM_GRID'
-        
-    # 2. Arquivar Equipes
-    equipes = Team.query.all()
-    for t in equipes:
-        t.ativa = False
-        
-    db.session.commit()
-    flash(f'Temporada {season.nome} encerrada! Equipes arquivadas e pilotos liberados.', 'success')
+    # Campeões, reset de disciplina/grids dos pilotos e arquivamento das equipes em segundo plano (app/tarefas.py)
+    _agendar('ENCERRAR_TEMPORADA', f'temporada:{season.id}', f'Encerrar temporada {season.nome}', {'season_id': season.id}, season)
     return redirect(url_for('admin.seasons'))
 
 @admin_bp.route('/race/<int:race_id>/edit', methods=['GET', 'POST'])
@@ -391,26 +386,8 @@ def delete_race(race_id):
         flash('Não é possível apagar corridas de temporadas arquivadas.', 'danger')
         return redirect(url_for('admin.manage_season', season_id=season_id))
         
-    # FIX: Estornar punições de W.O. (FNJ) antes de apagar a corrida
-    resultados = RaceResult.query.filter_by(race_id=race.id).all()
-    for res in resultados:
-        if res.ausencia == 'FNJ':
-            piloto = PilotProfile.query.get(res.pilot_id)
-            if piloto:
-                piloto.pontos_cnh += 5
-
-    RaceResult.query.filter_by(race_id=race.id).delete()
-    RaceRegistration.query.filter_by(race_id=race.id).delete() # Limpa check-ins
-    
-    # Limpa votos antes de apagar protestos
-    protestos = Protesto.query.filter_by(etapa_id=race.id).all()
-    for p in protestos:
-        VotoComissario.query.filter_by(protesto_id=p.id).delete()
-        db.session.delete(p)
-        
-    db.session.delete(race)
-    db.session.commit()
-    flash('Corrida removida.', 'success')
+    # Estorno de W.O. (FNJ), resultados, protestos e check-ins em segundo plano (app/tarefas.py)
+    _agendar('EXCLUIR_CORRIDA', f'corrida:{race.id}', f'Excluir corrida {race.nome_gp} ({race.grid})', {'race_id': race.id}, race)
     return redirect(url_for('admin.manage_season', season_id=season_id))
 
 @admin_bp.route('/race/<int:race_id>/generate_grid')
@@ -432,25 +409,19 @@ def generate_grid_text(race_id):
         usar_lastro = False
         
     # Remove filtro de SUPER_ADM para gerar grid se ele estiver na categoria
-    pilotos = PilotProfile.query.join(User).filter(PilotProfile.grid == race.grid).all()
-    ranking = []
-    
-    for p in pilotos:
-        pts = sum(r.pontos_ganhos for r in p.race_results if r.race.season_id == season.id)
-        vitorias = sum(1 for r in p.race_results if r.race.season_id == season.id and r.posicao == 1)
-        ranking.append({'piloto': p, 'pontos': pts, 'vitorias': vitorias})
+    pilotos = queries.pilotos_por_grid([race.grid])
+    temporada = cubo.cubo(season.id)
+    ranking = [{'piloto': p} for p in pilotos]
         
-    ranking.sort(key=lambda x: (x['pontos'], x['vitorias']), reverse=True)
+    # Mesmo critério da classificação pública (pontos + countback)
+    ranking = temporada.classificar(ranking)
     
     lista_final = []
     for i, item in enumerate(ranking):
         if not usar_lastro: 
             carro = "Desempenho Igual (Livre)"
         else:
-            if i < len(ORDEM_CARROS): 
-                carro = ORDEM_CARROS[i]
-            else: 
-                carro = "McLaren (Extra)"
+            carro = desempate.carro(i)
         lista_final.append({'pos': i + 1, 'nickname': item['piloto'].nickname, 'carro': carro})
         
     return render_template('admin/grid_text.html', race=race, lista=lista_final, usar_lastro=usar_lastro)
@@ -506,8 +477,7 @@ def race_results(race_id):
                 pontos = 0.0
                 if not dsq:
                     if not dnf and posicao > 0: pontos = float(PONTUACAO_NORMAL.get(posicao, 0))
-                    if race.tipo_etapa == 'SPRINT': pontos *= 0.5
-                    elif race.tipo_etapa == 'FINAL': pontos *= 2.0
+                    pontos *= MULTIPLICADOR_ETAPA.get(race.tipo_etapa, 1.0)
                     if vr and not dnf: pontos += 1.0
                     if dotd: pontos += 1.0
                     if fan: pontos += 1.0 # Soma Bônus Torcida
@@ -561,8 +531,7 @@ def race_results(race_id):
                 r_pontos = 0.0
                 if not r_dsq:
                     if not r_dnf and r_pos > 0: r_pontos = float(PONTUACAO_NORMAL.get(r_pos, 0))
-                    if race.tipo_etapa == 'SPRINT': r_pontos *= 0.5
-                    elif race.tipo_etapa == 'FINAL': r_pontos *= 2.0
+                    r_pontos *= MULTIPLICADOR_ETAPA.get(race.tipo_etapa, 1.0)
                     if r_vr and not r_dnf: r_pontos += 1.0
                     if r_dotd: r_pontos += 1.0
                     if r_fan: r_pontos += 1.0
@@ -583,15 +552,10 @@ def race_results(race_id):
     # --- GET: Preparar dados ---
     
     # 1. Titulares: Apenas do GRID da corrida, COM EQUIPE (Inclui ADMs se tiverem equipe)
-    titulares = PilotProfile.query.join(User).filter(
-        PilotProfile.grid == race.grid, 
-        PilotProfile.team_id != None
-    ).order_by(PilotProfile.nickname).all()
+    titulares = queries.titulares_da_corrida(race)
     
     # 2. Reservas: QUALQUER piloto SEM EQUIPE (Inclui ADMs para correrem de reserva)
-    reservas_disponiveis = PilotProfile.query.join(User).filter(
-        PilotProfile.team_id == None
-    ).order_by(PilotProfile.nickname).all()
+    reservas_disponiveis = queries.reservas_disponiveis()
     
     # 3. Equipes Ativas (para selecionar onde o reserva correu)
     equipes = Team.query.filter_by(ativa=True, grid=race.grid).all()
@@ -621,23 +585,26 @@ def race_results(race_id):
 
 @admin_bp.route('/pilots')
 def list_pilots():
-    # Mostra todos os pilotos, inclusive ADMs, para gestão de Grid/CNH
-    pilots = PilotProfile.query.join(User).order_by(PilotProfile.nickname).all()
-
-    # Agrupar pilotos por grid para facilitar a exibição em abas
-    pilots_by_grid = {
-        'ELITE': [],
-        'ADVANCED': [],
-        'INITIAL': [],
-        'RESERVA': [],
-        'SEM_GRID': []
+    # Mostra todos os pilotos, inclusive ADMs, para gestão de Grid/CNH.
+    # Filtros e paginação no banco: ex-pilotos são anonimizados e nunca apagados, então a lista só cresce.
+    grid = request.args.get('grid', 'ELITE')
+    if grid not in queries.GRIDS_ADMIN:
+        grid = 'ELITE'
+    filtro = {
+        'equipe': request.args.get('equipe', ''),
+        'banido': '1' if request.args.get('banido') == '1' else '',
+        'role': request.args.get('role', ''),
+        'q': request.args.get('q', ''),
     }
+    filtros = queries.filtros_pilotos(filtro['equipe'], bool(filtro['banido']), filtro['role'], filtro['q'])
 
-    for p in pilots:
-        grid_key = p.grid if p.grid in pilots_by_grid else 'SEM_GRID'
-        pilots_by_grid[grid_key].append(p)
+    contagem = queries.contagem_pilotos_por_grid(filtros)
+    apos = request.args.get('apos', type=int)
+    pilots, proximo = queries.pilotos_admin(grid, filtros, apos)
+    equipes = Team.query.filter_by(ativa=True).order_by(Team.grid, Team.nome).all()
 
-    return render_template('admin/pilots.html', pilots_by_grid=pilots_by_grid, total_count=len(pilots))
+    return render_template('admin/pilots.html', pilots=pilots, grid=grid, grids=queries.GRIDS_ADMIN, contagem=contagem,
+                           total_count=sum(contagem.values()), filtro=filtro, equipes=equipes, apos=apos, proximo=proximo)
 
 @admin_bp.route('/pilots/edit/<int:pilot_id>', methods=['GET', 'POST'])
 def edit_pilot(pilot_id):
@@ -689,7 +656,7 @@ def edit_pilot(pilot_id):
                     
                 ext = file.filename.rsplit('.', 1)[1].lower()
                 timestamp = int(datetime.utcnow().timestamp())
-                nome = f"piloto_{pilot.id}_{timestamp}.{ext}"
+                nome = ligas.nome_upload(f"piloto_{pilot.id}_{timestamp}.{ext}")
                 file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], nome))
                 pilot.foto_url = nome
                 
@@ -713,52 +680,9 @@ def delete_pilot(pilot_id):
         flash('Não é possível excluir o Super Admin.', 'danger')
         return redirect(url_for('admin.list_pilots'))
 
-    # Verifica histórico de corridas
-    tem_historico = RaceResult.query.filter_by(pilot_id=profile.id).first()
-
-    if tem_historico:
-        # ANONIMIZAR
-        if profile.foto_url:
-            path = os.path.join(current_app.config['UPLOAD_FOLDER'], profile.foto_url)
-            if os.path.exists(path): os.remove(path)
-            profile.foto_url = None
-            
-        suffix = secrets.token_hex(4)
-        user.username = f"Ex-Piloto_{user.id}_{suffix}"
-        user.email = f"deleted_{user.id}_{suffix}@fullgas.local"
-        user.set_password(secrets.token_hex(16))
-        user.role = 'INATIVO'
-        
-        profile.nickname = "Piloto Removido"
-        profile.nome_real = "Dados Removidos"
-        profile.team_id = None
-        profile.pontos_cnh = 0
-        
-        RaceRegistration.query.filter_by(pilot_id=profile.id).delete()
-        
-        db.session.commit()
-        flash('Piloto possuía histórico. Conta anonimizada para preservar a pontuação das equipes.', 'warning')
-    else:
-        # EXCLUSÃO TOTAL
-        if profile.foto_url:
-            path = os.path.join(current_app.config['UPLOAD_FOLDER'], profile.foto_url)
-            if os.path.exists(path): os.remove(path)
-
-        profile.team_id = None
-        RaceResult.query.filter_by(pilot_id=profile.id).delete()
-        RaceRegistration.query.filter_by(pilot_id=profile.id).delete()
-        
-        protestos_envolvidos = Protesto.query.filter((Protesto.acusador_id == profile.id) | (Protesto.acusado_id == profile.id)).all()
-        for p in protestos_envolvidos:
-            VotoComissario.query.filter_by(protesto_id=p.id).delete()
-            db.session.delete(p)
-
-        db.session.delete(profile)
-        db.session.delete(user)
-        db.session.commit()
-        
-        flash('Conta do usuário e perfil de piloto excluídos permanentemente.', 'success')
-        
+    # Anonimização (com histórico de corrida) ou exclusão total em segundo plano (app/tarefas.py)
+    _agendar('EXCLUIR_USUARIO', f'usuario:{user.id}', f'Excluir piloto {profile.nickname}',
+             {'user_id': user.id, 'origem': 'piloto'}, profile)
     return redirect(url_for('admin.list_pilots'))
 
 @admin_bp.route('/invites', methods=['GET', 'POST'])
@@ -809,7 +733,7 @@ def create_team():
             if file and file.filename != '' and allowed_file(file.filename):
                 ext = file.filename.rsplit('.', 1)[1].lower()
                 timestamp = int(datetime.utcnow().timestamp())
-                nome_arq = f"team_{nova_equipe.id}_{timestamp}.{ext}"
+                nome_arq = ligas.nome_upload(f"team_{nova_equipe.id}_{timestamp}.{ext}")
                 file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], nome_arq))
                 nova_equipe.logo_url = nome_arq
         
@@ -836,7 +760,7 @@ def edit_team(team_id):
                     
                 ext = file.filename.rsplit('.', 1)[1].lower()
                 timestamp = int(datetime.utcnow().timestamp())
-                nome_arq = f"team_{team.id}_{timestamp}.{ext}"
+                nome_arq = ligas.nome_upload(f"team_{team.id}_{timestamp}.{ext}")
                 file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], nome_arq))
                 team.logo_url = nome_arq
         
@@ -859,10 +783,8 @@ def edit_team(team_id):
         return redirect(url_for('admin.list_teams'))
 
     # LÓGICA: Apenas pilotos que já pertencem ao MESMO GRID da equipe aparecem aqui (incluindo ADMs).
-    pilotos_disponiveis = PilotProfile.query.join(User).filter(
-        PilotProfile.grid == team.grid, # Filtro estrito por Grid
-        (PilotProfile.team_id == None) | (PilotProfile.team_id == team.id) # Disponíveis ou já na equipe
-    ).all()
+    # Filtro estrito por Grid: disponíveis ou já na equipe
+    pilotos_disponiveis = queries.pilotos_disponiveis_equipe(team)
     
     return render_template('admin/edit_team.html', team=team, pilots=pilotos_disponiveis)
 
@@ -966,20 +888,9 @@ def close_seletiva():
         flash('Apenas Super Admin pode aplicar o grid.', 'danger')
         return redirect(url_for('admin.seletiva'))
         
-    entradas = SeletivaEntry.query.order_by(SeletivaEntry.tempo_ms.asc()).all()
-    
-    for i, entry in enumerate(entradas):
-        pos = i + 1
-        if pos <= 20: entry.piloto.grid = 'ELITE'
-        elif pos <= 40: entry.piloto.grid = 'ADVANCED'
-        elif pos <= 60: entry.piloto.grid = 'INITIAL'
-        else: entry.piloto.grid = 'RESERVA'
-        
-    # Opcional: Limpar a tabela de seletiva após aplicar?
-    # Por segurança, vamos manter os dados lá. O admin pode limpar manualmente se quiser.
-    
-    db.session.commit()
-    flash(f'Seletiva encerrada! {len(entradas)} pilotos foram alocados em seus grids.', 'success')
+    # Top 20 ELITE, 21-40 ADVANCED, 41-60 INITIAL, demais RESERVA, em segundo plano (app/tarefas.py).
+    # Os tempos continuam na tabela: o admin pode limpar manualmente se quiser.
+    _agendar('ENCERRAR_SELETIVA', 'seletiva', 'Encerrar seletiva e aplicar grids', {})
     return redirect(url_for('admin.list_pilots'))
 
 # --- TRIBUNAL DE PUNIÇÕES (CORRIGIDO: BUSCA NO BANCO) ---
@@ -992,9 +903,9 @@ def protests():
     # Obtém a lista de IDs de protestos onde o administrador atual já votou
     voted_protest_ids = [v.protesto_id for v in VotoComissario.query.filter_by(admin_id=current_user.id).all()]
 
-    aguardando = Protesto.query.filter_by(status='AGUARDANDO_DEFESA').order_by(Protesto.data_criacao.desc()).all()
-    em_votacao = Protesto.query.filter_by(status='EM_VOTACAO').order_by(Protesto.data_criacao.desc()).all()
-    concluidos = Protesto.query.filter_by(status='CONCLUIDO').order_by(Protesto.data_fechamento.desc()).limit(10).all()
+    aguardando = queries.protestos('AGUARDANDO_DEFESA', Protesto.data_criacao.desc())
+    em_votacao = queries.protestos('EM_VOTACAO', Protesto.data_criacao.desc())
+    concluidos = queries.protestos('CONCLUIDO', Protesto.data_fechamento.desc(), limite=10)
     
     return render_template('admin/protests.html', 
                            aguardando=aguardando, 
@@ -1046,21 +957,19 @@ def view_protest(protest_id):
             piloto = protesto.acusado
             resultado_corrida = RaceResult.query.filter_by(race_id=protesto.etapa_id, pilot_id=piloto.id).first()
             
-            pontos_perda = 0
-            if veredito == 'LEVE': pontos_perda = 3
-            elif veredito == 'MEDIA': pontos_perda = 5
-            elif veredito == 'GRAVE': pontos_perda = 10
-            elif veredito == 'ADVERTENCIA':
+            pontos_perda = PERDA_VEREDITO.get(veredito, 0)
+            if veredito == 'ADVERTENCIA':
                 piloto.advertencias_acumuladas += 1
-                if piloto.advertencias_acumuladas > 0 and piloto.advertencias_acumuladas % 3 == 0:
-                    flash(f'Piloto atingiu {piloto.advertencias_acumuladas} advertências. Punição automática aplicada (-3 pts).', 'warning')
-                    pontos_perda = 3
+                if piloto.advertencias_acumuladas > 0 and piloto.advertencias_acumuladas % ADVERTENCIAS_POR_PUNICAO == 0:
+                    flash(f'Piloto atingiu {piloto.advertencias_acumuladas} advertências. Punição automática aplicada (-{PERDA_ADVERTENCIAS} pts).', 'warning')
+                    pontos_perda = PERDA_ADVERTENCIAS
             
             if pontos_perda > 0:
                 piloto.pontos_cnh -= pontos_perda
                 if resultado_corrida:
                     resultado_corrida.pontos_ganhos -= pontos_perda
-            
+
+            notificacoes.veredito(protesto)
             db.session.commit()
             flash('Caso encerrado e punições aplicadas.', 'success')
             return redirect(url_for('admin.protests'))
@@ -1070,13 +979,10 @@ def view_protest(protest_id):
             veredito_anterior = protesto.veredito_final
             resultado_corrida = RaceResult.query.filter_by(race_id=protesto.etapa_id, pilot_id=piloto.id).first()
             
-            pontos_devolver = 0
-            if veredito_anterior == 'LEVE': pontos_devolver = 3
-            elif veredito_anterior == 'MEDIA': pontos_devolver = 5
-            elif veredito_anterior == 'GRAVE': pontos_devolver = 10
-            elif veredito_anterior == 'ADVERTENCIA':
-                if piloto.advertencias_acumuladas > 0 and piloto.advertencias_acumuladas % 3 == 0:
-                    pontos_devolver = 3
+            pontos_devolver = PERDA_VEREDITO.get(veredito_anterior, 0)
+            if veredito_anterior == 'ADVERTENCIA':
+                if piloto.advertencias_acumuladas > 0 and piloto.advertencias_acumuladas % ADVERTENCIAS_POR_PUNICAO == 0:
+                    pontos_devolver = PERDA_ADVERTENCIAS
                 if piloto.advertencias_acumuladas > 0: piloto.advertencias_acumuladas -= 1
             
             if pontos_devolver > 0:
@@ -1097,6 +1003,12 @@ def view_protest(protest_id):
                            embed_acusacao=embed_acusacao,
                            embed_defesa=embed_defesa)
 
+@admin_bp.route('/protests/<int:protest_id>/video/<lado>')
+def protest_video(protest_id, lado):
+    # Vídeo enviado como arquivo (app/videos.py), com Range para o player avançar/voltar
+    video = VideoProtesto.query.filter_by(protesto_id=protest_id, lado=lado.upper(), status=videos.COMPLETO).first_or_404()
+    return videos.enviar(video)
+
 @admin_bp.route('/protests/<int:protest_id>/delete', methods=['POST'])
 def delete_protest_admin(protest_id):
     if current_user.role != 'SUPER_ADM':
@@ -1111,14 +1023,11 @@ def delete_protest_admin(protest_id):
         veredito = protesto.veredito_final
         resultado_corrida = RaceResult.query.filter_by(race_id=protesto.etapa_id, pilot_id=piloto.id).first()
         
-        pontos_devolver = 0
-        if veredito == 'LEVE': pontos_devolver = 3
-        elif veredito == 'MEDIA': pontos_devolver = 5
-        elif veredito == 'GRAVE': pontos_devolver = 10
-        elif veredito == 'ADVERTENCIA':
+        pontos_devolver = PERDA_VEREDITO.get(veredito, 0)
+        if veredito == 'ADVERTENCIA':
             # Se atingiu múltiplo de 3, devolve os 3 pontos que foram tirados automaticamente
-            if piloto.advertencias_acumuladas > 0 and piloto.advertencias_acumuladas % 3 == 0:
-                pontos_devolver = 3
+            if piloto.advertencias_acumuladas > 0 and piloto.advertencias_acumuladas % ADVERTENCIAS_POR_PUNICAO == 0:
+                pontos_devolver = PERDA_ADVERTENCIAS
             # Remove a advertência do histórico
             if piloto.advertencias_acumuladas > 0: 
                 piloto.advertencias_acumuladas -= 1
@@ -1128,10 +1037,7 @@ def delete_protest_admin(protest_id):
             if resultado_corrida:
                 resultado_corrida.pontos_ganhos += pontos_devolver
 
-    # Limpa votos associados para evitar erro de integridade (FK)
-    VotoComissario.query.filter_by(protesto_id=protesto.id).delete()
-    
-    db.session.delete(protesto)
+    db.session.delete(protesto) # Votos saem junto (ON DELETE CASCADE)
     db.session.commit()
     
     flash('Pedido de punição removido e punições revertidas com sucesso.', 'success')
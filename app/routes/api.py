@@ -1,55 +1,128 @@
-from flask import Blueprint, jsonify
-from app.models import News, Season, Race, PilotProfile, Team, RaceResult
+from flask import Blueprint, jsonify, current_app, request
+from flask_login import current_user
+from app import payloads, projecao, confrontos, progressao, recordes, busca
+from app.changes import versao_dados
+from app.db_routing import usar_engine_leitura
+from app.ligas import banco_atual
 
 api_bp = Blueprint('api', __name__)
 
+# Último /api/bundle montado neste worker, por liga: {liga: (versão dos dados, corpo JSON)}
+_bundle_cache = {}
+
+@api_bp.before_request
+def rotear_leitura():
+    # A API é somente consulta: nunca disputa lock com as escritas
+    usar_engine_leitura()
+
+# Estes endpoints também são publicados como JSON estático em /static/api/
+# (app/publisher.py). As rotas abaixo continuam valendo como fallback.
+
 @api_bp.route('/news', methods=['GET'])
 def get_news():
-    noticias = News.query.order_by(News.data_publicacao.desc()).limit(10).all()
-    return jsonify([n.to_dict() for n in noticias])
+    return jsonify(payloads.noticias())
 
 @api_bp.route('/standings/<grid>', methods=['GET'])
 def get_standings(grid):
-    season = Season.query.filter_by(ativa=True).first()
-    if not season:
-        return jsonify([])
-    
-    pilotos = PilotProfile.query.filter_by(grid=grid.upper()).all()
-    ranking = []
-    for p in pilotos:
-        pts = float(sum(r.pontos_ganhos for r in p.race_results if r.race.season_id == season.id))
-        ranking.append({
-            'id': p.id,
-            'nickname': p.nickname,
-            'pontos': pts,
-            'telefone': p.telefone,
-            'equipe': p.team.nome if p.team else 'Sem Equipe',
-            'foto': p.foto_url
-        })
-    
-    ranking.sort(key=lambda x: x['pontos'], reverse=True)
-    return jsonify(ranking)
+    return jsonify(payloads.classificacao(grid))
 
 @api_bp.route('/calendar/<grid>', methods=['GET'])
 def get_calendar(grid):
-    season = Season.query.filter_by(ativa=True).first()
-    if not season:
-        return jsonify([])
-    
-    corridas = Race.query.filter_by(season_id=season.id, grid=grid.upper()).order_by(Race.data_corrida).all()
-    return jsonify([r.to_dict() for r in corridas])
+    return jsonify(payloads.calendario(grid))
 
 @api_bp.route('/race/<int:race_id>/results', methods=['GET'])
 def get_race_results(race_id):
-    resultados = RaceResult.query.filter_by(race_id=race_id).order_by(RaceResult.posicao).all()
-    return jsonify([res.to_dict() for res in resultados])
+    return jsonify(payloads.resultados_corrida(race_id))
 
 @api_bp.route('/pilots', methods=['GET'])
 def get_all_pilots():
-    pilotos = PilotProfile.query.filter(PilotProfile.grid != 'SEM_GRID').all()
-    return jsonify([p.to_dict() for p in pilotos])
+    return jsonify(payloads.pilotos())
 
 @api_bp.route('/teams', methods=['GET'])
 def get_teams():
-    equipes = Team.query.filter_by(ativa=True).all()
-    return jsonify([t.to_dict() for t in equipes])
\ No newline at end of file
+    return jsonify(payloads.equipes())
+
+@api_bp.route('/projecao/<grid>', methods=['GET'])
+def get_projecao(grid):
+    # Chances de título/top 3/zona de acesso e eliminação matemática (cache por versão da temporada)
+    dados = projecao.projecoes().get(grid.upper())
+    if dados is None:
+        return jsonify({'erro': 'Grid sem temporada ativa.'}), 404
+    return jsonify(dados)
+
+@api_bp.route('/confrontos/<grid>', methods=['GET'])
+def get_confrontos(grid):
+    # Matriz piloto x piloto da temporada ativa (ou de ?season=<id>), cache por versão da temporada
+    season_id = request.args.get('season', type=int)
+    if season_id is None:
+        season = payloads.temporada_ativa()
+        if season is None:
+            return jsonify({'erro': 'Nenhuma temporada ativa.'}), 404
+        season_id = season.id
+    return jsonify(confrontos.confrontos(season_id, grid.upper()).to_dict())
+
+@api_bp.route('/progressao/<grid>', methods=['GET'])
+def get_progressao(grid):
+    # Pontos acumulados e posição após cada etapa; com ?apos=<race_id>, a classificação naquele momento
+    season_id = request.args.get('season', type=int)
+    if season_id is None:
+        season = payloads.temporada_ativa()
+        if season is None:
+            return jsonify({'erro': 'Nenhuma temporada ativa.'}), 404
+        season_id = season.id
+    evolucao = progressao.progressao(season_id, grid.upper())
+    race_id = request.args.get('apos', type=int)
+    if race_id is None:
+        return jsonify(evolucao.to_dict())
+    classificacao = evolucao.classificacao_apos(race_id)
+    if classificacao is None:
+        return jsonify({'erro': 'Etapa não concluída neste grid.'}), 404
+    return jsonify(classificacao)
+
+@api_bp.route('/recordes', methods=['GET'])
+def get_recordes():
+    # Recordes de todos os tempos (tabelas agregadas mantidas a cada commit); ?limite= até 50
+    limite = min(max(request.args.get('limite', 10, type=int), 1), 50)
+    return jsonify(recordes.recordes(limite))
+
+@api_bp.route('/search', methods=['GET'])
+def search():
+    # Busca textual ranqueada: ?q=&tipo=noticias,pilotos&pagina=&por_pagina=; protestos e nomes reais só para a Direção de Prova
+    admin = current_user.is_authenticated and current_user.role in ('SUPER_ADM', 'ADM')
+    permitidos = list(busca.INDICES) if admin else list(busca.TIPOS_PUBLICOS)
+    pedidos = request.args.get('tipo')
+    tipos = [t for t in pedidos.split(',') if t in permitidos] if pedidos else permitidos
+    if not tipos:
+        return jsonify({'erro': f'Tipos disponíveis: {", ".join(permitidos)}.'}), 400
+    resultado = busca.buscar(request.args.get('q', ''), tipos, request.args.get('pagina', 1, type=int),
+                             request.args.get('por_pagina', 20, type=int), publica=not admin)
+    for r in resultado['resultados']:
+        r['trecho'] = busca.sem_destaque(r['trecho'])
+    return jsonify(resultado)
+
+def bundle_atual():
+    """(versão, corpo JSON) do /api/bundle, remontado apenas quando a versão dos dados muda."""
+    versao = versao_dados()
+    banco = banco_atual()
+    versao_cache, corpo = _bundle_cache.get(banco, (None, None))
+    if versao_cache != versao:
+        corpo = current_app.json.response(payloads.bundle(versao)).get_data()
+        _bundle_cache[banco] = (versao, corpo)
+    return versao, corpo
+
+@api_bp.route('/bundle', methods=['GET'])
+def get_bundle():
+    # Abertura do app: news, standings e calendar dos 3 grids e teams em uma só resposta.
+    versao, corpo = bundle_atual()
+    response = current_app.response_class(corpo, mimetype='application/json')
+    response.set_etag(f'v{versao}')
+    return response
+
+@api_bp.route('/changes', methods=['GET'])
+def get_changes():
+    # Sincronização incremental: o app guarda 'versao' e pede só o que mudou depois dela
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'erro': 'Parâmetro since inválido.'}), 400
+    return jsonify(payloads.alteracoes_desde(since))
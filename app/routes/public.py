@@ -1,14 +1,23 @@
 import os
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app
+from itertools import combinations
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify
 from flask_login import login_required, current_user, login_user, logout_user
+from sqlalchemy.dialects.sqlite import insert as upsert
 from werkzeug.security import check_password_hash
-from sqlalchemy import func, case
-from app.models import db, Season, Race, PilotProfile, Protesto, RaceResult, VotoComissario, Team, RaceRegistration, User, Invite, News
-from app.utils import allowed_file, get_embed_url, ORDEM_CARROS
+from app.models import db, Season, Race, PilotProfile, Protesto, Team, RaceRegistration, User, Invite, News, VideoProtesto
+from app.utils import allowed_file, get_embed_url, PERDA_VEREDITO, RECORDES_MIN_LARGADAS, JANELA_CHECKIN_DIAS
+from app.db_routing import usar_engine_leitura
+from app import queries, ligas, projecao, desempate, confrontos, progressao, cubo, recordes, notificacoes, videos
 
 public_bp = Blueprint('public', __name__)
 
+@public_bp.before_request
+def rotear_leitura():
+    # GETs consultam o engine somente leitura; POSTs (check-in, protestos, defesas) seguem no principal
+    if request.method in ('GET', 'HEAD'):
+        usar_engine_leitura()
+
 # --- ROTAS PRINCIPAIS (HOME E LOGIN) ---
 
 @public_bp.route('/')
@@ -20,68 +29,44 @@ def home():
     last_races = { 'ELITE': None, 'ADVANCED': None, 'INITIAL': None }
     noticias = News.query.order_by(News.data_publicacao.desc()).limit(5).all()
     pilots_by_grid = { 'ELITE': [], 'ADVANCED': [], 'INITIAL': [] }
+    chances = {}
+    evolucao = {}
     
     if season_ativa:
-        # 1. Calcular Pontos dos Pilotos
-        pilotos = PilotProfile.query.join(User).all()
-        for p in pilotos:
-            if p.grid in standings:
-                resultados = [r for r in p.race_results if r.race.season_id == season_ativa.id]
-                pontos_totais = float(sum(r.pontos_ganhos for r in resultados)) - float(p.penalidade_campeonato or 0)
-                vitorias = sum(1 for r in resultados if r.posicao == 1 and not r.dsq)
-                
-                # Lógica de Quali Ban: Verifica se a última punição concluída foi Média ou Grave
-                ultimo_p = Protesto.query.filter_by(acusado_id=p.id, status='CONCLUIDO')\
-                    .order_by(Protesto.data_fechamento.desc()).first()
-                quali_ban = False
-                if ultimo_p and ultimo_p.veredito_final in ['MEDIA', 'GRAVE']:
-                    ultima_res = RaceResult.query.join(Race).filter(RaceResult.pilot_id == p.id, Race.status == 'Concluida').order_by(Race.data_corrida.desc()).first()
-                    # Se ele ainda não correu após o fechamento do protesto, o ban está ativo
-                    if not ultima_res or ultimo_p.data_fechamento.date() >= ultima_res.race.data_corrida:
-                        quali_ban = True
-
-                # Adiciona placeholder para o carro
-                standings[p.grid].append({'piloto': p, 'pontos': pontos_totais, 'vitorias': vitorias, 'carro': '', 'quali_ban': quali_ban})
+        # 1. Calcular Pontos dos Pilotos (lidos do cubo da temporada, montado uma vez por versão da temporada)
+        temporada = cubo.cubo(season_ativa.id)
+        pilotos = [p for p in queries.pilotos_com_equipe() if p.grid in standings]
+        # Lógica de Quali Ban: última punição concluída Média ou Grave (duas consultas para todos os pilotos)
+        bans = queries.quali_bans([p.id for p in pilotos])
+        ids = [p.id for p in pilotos]
+        for p, pontos_totais, vitorias in zip(pilotos, temporada.pontos(ids), temporada.contagem(ids, 1)):
+            # Adiciona placeholder para o carro
+            standings[p.grid].append({'piloto': p, 'pontos': float(pontos_totais), 'vitorias': int(vitorias), 'carro': '', 'quali_ban': bans[p.id]})
         
-        # 2. Ordenar e Aplicar Lastro (Carro)
+        # 2. Ordenar (pontos + countback) e Aplicar Lastro (Carro)
         for grid in standings: 
-            standings[grid].sort(key=lambda x: x['pontos'], reverse=True)
+            standings[grid] = temporada.classificar(standings[grid])
             
             # Distribui os carros baseados na posição
             for i, item in enumerate(standings[grid]):
-                if i < len(ORDEM_CARROS):
-                    item['carro'] = ORDEM_CARROS[i]
-                else:
-                    item['carro'] = "McLaren (Extra)"
-
-        # 3. Calcular Construtores
-        # Otimização: Agregação no banco de dados para evitar N+1 queries
-        stats_query = db.session.query(
-            RaceResult.team_id,
-            func.sum(RaceResult.pontos_ganhos).label('total_pontos'),
-            func.sum(case(( (RaceResult.posicao == 1) & (RaceResult.dsq == False), 1 ), else_=0)).label('total_vitorias')
-        ).join(Race).filter(
-            Race.season_id == season_ativa.id,
-            RaceResult.team_id != None
-        ).group_by(RaceResult.team_id).all()
-        
-        team_stats = { s.team_id: {'pontos': float(s.total_pontos or 0), 'vitorias': int(s.total_vitorias or 0)} for s in stats_query }
+                item['carro'] = desempate.carro(i)
 
-        teams = Team.query.filter_by(ativa=True).all()
+        # 3. Calcular Construtores (totais por equipe já agregados no cubo)
+        teams = queries.equipes_ativas_com_pilotos()
         for t in teams:
             if t.grid in constructors:
-                stats = team_stats.get(t.id, {'pontos': 0.0, 'vitorias': 0})
+                pontos_equipe, vitorias_equipe = temporada.equipe_totais(t.id)
                 
                 # Subtrai penalidades administrativas dos pilotos ATUAIS da equipe
                 penalidades_pilotos = sum(float(p.penalidade_campeonato or 0) for p in t.pilots)
-                pontos_finais = stats['pontos'] - penalidades_pilotos
+                pontos_finais = pontos_equipe - penalidades_pilotos
                 
-                constructors[t.grid].append({'equipe': t, 'pontos': pontos_finais, 'vitorias': stats['vitorias']})
+                constructors[t.grid].append({'equipe': t, 'pontos': pontos_finais, 'vitorias': vitorias_equipe})
         
         for grid in constructors: constructors[grid].sort(key=lambda x: x['pontos'], reverse=True)
         
         # 4. Calendário e Últimas Corridas (Pódio)
-        all_races = Race.query.filter_by(season_id=season_ativa.id).order_by(Race.data_corrida).all()
+        all_races = queries.corridas_com_resultados(season_ativa.id)
         for r in all_races:
             if r.grid in calendar:
                 calendar[r.grid].append(r)
@@ -93,12 +78,20 @@ def home():
                 last_races[grid] = concluidas[-1] # Pega a última da lista (mais recente)
         
         # 5. Lista de Pilotos por Grid (Exclui Reservas)
-        pilots_query = PilotProfile.query.join(User).filter(PilotProfile.grid.in_(['ELITE', 'ADVANCED', 'INITIAL'])).order_by(PilotProfile.nickname).all()
+        pilots_query = queries.pilotos_por_grid(['ELITE', 'ADVANCED', 'INITIAL'])
         for p in pilots_query:
             if p.grid in pilots_by_grid:
                 pilots_by_grid[p.grid].append(p)
 
-    return render_template('home.html', standings=standings, constructors=constructors, calendar=calendar, last_races=last_races, season_ativa=season_ativa, noticias=noticias, pilots_by_grid=pilots_by_grid)
+        # 6. Projeção do campeonato (Monte Carlo, refeita só quando os dados mudam)
+        chances = {grid: {'etapas_restantes': dados['etapas_restantes'], 'vagas_promocao': dados['vagas_promocao'],
+                          'pilotos': {linha['id']: linha for linha in dados['pilotos']}}
+                   for grid, dados in projecao.projecoes(season_ativa).items()}
+
+        # 7. Evolução do campeonato (pontos acumulados após cada etapa) para o gráfico
+        evolucao = {grid: progressao.progressao(season_ativa.id, grid).to_dict() for grid in standings}
+
+    return render_template('home.html', standings=standings, constructors=constructors, calendar=calendar, last_races=last_races, season_ativa=season_ativa, noticias=noticias, pilots_by_grid=pilots_by_grid, chances=chances, evolucao=evolucao)
 
 @public_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -201,6 +194,10 @@ def rules():
 def transparency():
     return render_template('public/how_it_works.html')
 
+@public_bp.route('/recordes')
+def records():
+    return render_template('public/records.html', recordes=recordes.recordes(), min_largadas=RECORDES_MIN_LARGADAS)
+
 @public_bp.route('/news/<int:news_id>')
 def news_detail(news_id):
     noticia = News.query.get_or_404(news_id)
@@ -208,6 +205,13 @@ def news_detail(news_id):
 
 # --- PERFIL DO PILOTO ---
 
+def _estatisticas_da_temporada(perfil, season_ativa):
+    """Pontos no campeonato e resultado em cada etapa do grid, lidos do cubo da temporada."""
+    if not season_ativa:
+        return 0, []
+    temporada = cubo.cubo(season_ativa.id)
+    return float(temporada.pontos([perfil.id])[0]), temporada.desempenho(perfil.id, perfil.grid)
+
 @public_bp.route('/piloto/<int:pilot_id>')
 def public_profile(pilot_id):
     perfil = PilotProfile.query.get_or_404(pilot_id)
@@ -219,41 +223,18 @@ def public_profile(pilot_id):
     season_ativa = Season.query.filter_by(ativa=True).first()
     
     # Estatísticas da Temporada
-    meus_pontos_camp = 0
-    desempenho_temporada = []
-    if season_ativa:
-        meus_pontos_camp = float(sum(r.pontos_ganhos for r in perfil.race_results if r.race.season_id == season_ativa.id)) - float(perfil.penalidade_campeonato or 0)
-        corridas = Race.query.filter_by(season_id=season_ativa.id, grid=perfil.grid).order_by(Race.data_corrida).all()
-        for race in corridas:
-            resultado = next((r for r in race.results if r.pilot_id == perfil.id), None)
-            desempenho_temporada.append({
-                'gp': race.nome_gp, 'data': race.data_corrida, 'status_corrida': race.status,
-                'participou': True if resultado and not resultado.ausencia else False,
-                'posicao': resultado.posicao if resultado else 0,
-                'pontos': resultado.pontos_ganhos if resultado else 0,
-                'dnf': resultado.dnf if resultado else False, 'dsq': resultado.dsq if resultado else False
-            })
+    meus_pontos_camp, desempenho_temporada = _estatisticas_da_temporada(perfil, season_ativa)
+
+    # Confrontos diretos com os rivais do grid (matriz pré-calculada por versão da temporada)
+    confrontos_diretos = confrontos.confrontos(season_ativa.id, perfil.grid).linha(perfil.id) if season_ativa else []
+    # Pontos acumulados e posição no campeonato após cada etapa (gráfico)
+    evolucao = progressao.progressao(season_ativa.id, perfil.grid).serie(perfil.id) if season_ativa else []
 
     # Verificação de Quali Ban para o Perfil Público
-    ultimo_p = Protesto.query.filter_by(acusado_id=perfil.id, status='CONCLUIDO')\
-        .order_by(Protesto.data_fechamento.desc()).first()
-    quali_ban = False
-    if ultimo_p and ultimo_p.veredito_final in ['MEDIA', 'GRAVE']:
-        ultima_res = RaceResult.query.join(Race).filter(RaceResult.pilot_id == perfil.id, Race.status == 'Concluida').order_by(Race.data_corrida.desc()).first()
-        if not ultima_res or ultimo_p.data_fechamento.date() >= ultima_res.race.data_corrida:
-            quali_ban = True
+    quali_ban = queries.quali_bans([perfil.id])[perfil.id]
 
     # Histórico de Carreira
-    seasons_fechadas = Season.query.filter_by(ativa=False).order_by(Season.id.desc()).all()
-    historico_carreira = []
-    for s in seasons_fechadas:
-        resultados_na_season = [r for r in perfil.race_results if r.race.season_id == s.id]
-        if resultados_na_season:
-            pts = sum(r.pontos_ganhos for r in resultados_na_season)
-            vitorias = sum(1 for r in resultados_na_season if r.posicao == 1 and not r.dsq)
-            grids_corridos = [r.race.grid for r in resultados_na_season]
-            grid_predominante = max(set(grids_corridos), key=grids_corridos.count) if grids_corridos else "N/A"
-            historico_carreira.append({'season_nome': s.nome, 'grid': grid_predominante, 'pontos': pts, 'vitorias': vitorias})
+    historico_carreira = queries.historico_de_carreira(perfil.id)
 
     return render_template('pilot/profile.html', 
                            perfil=perfil, 
@@ -265,6 +246,8 @@ def public_profile(pilot_id):
                            historico=[],
                            total_punicoes=0,
                            historico_carreira=historico_carreira,
+                           confrontos_diretos=confrontos_diretos,
+                           evolucao=evolucao,
                            checkin_race=None,
                            registro_atual=None,
                            quali_ban=quali_ban)
@@ -287,40 +270,15 @@ def my_profile():
     if perfil.esta_banido():
         flash('ALERTA: Sua CNH está zerada ou negativa. Você está suspenso das atividades de pista.', 'danger')
     
-    checkin_race = None
     registro_atual = None
     
     # Lógica de Check-in
-    if season_ativa:
-        hoje = datetime.utcnow().date()
-        corridas_futuras = Race.query.filter(
-            Race.season_id == season_ativa.id,
-            Race.grid == perfil.grid,
-            Race.status != 'Concluida',
-            Race.data_corrida >= hoje
-        ).order_by(Race.data_corrida).all()
-        
-        if corridas_futuras:
-            proxima = corridas_futuras[0]
-            if proxima.data_corrida and (proxima.data_corrida - hoje).days <= 2: 
-                checkin_race = proxima
-                registro_atual = RaceRegistration.query.filter_by(race_id=proxima.id, pilot_id=perfil.id).first()
+    checkin_race = _corrida_checkin(perfil, season_ativa)
+    if checkin_race:
+        registro_atual = RaceRegistration.query.filter_by(race_id=checkin_race.id, pilot_id=perfil.id).first()
 
     # Estatísticas da Temporada
-    meus_pontos_camp = 0
-    desempenho_temporada = []
-    if season_ativa:
-        meus_pontos_camp = float(sum(r.pontos_ganhos for r in perfil.race_results if r.race.season_id == season_ativa.id)) - float(perfil.penalidade_campeonato or 0)
-        corridas = Race.query.filter_by(season_id=season_ativa.id, grid=perfil.grid).order_by(Race.data_corrida).all()
-        for race in corridas:
-            resultado = next((r for r in race.results if r.pilot_id == perfil.id), None)
-            desempenho_temporada.append({
-                'gp': race.nome_gp, 'data': race.data_corrida, 'status_corrida': race.status,
-                'participou': True if resultado and not resultado.ausencia else False,
-                'posicao': resultado.posicao if resultado else 0,
-                'pontos': resultado.pontos_ganhos if resultado else 0,
-                'dnf': resultado.dnf if resultado else False, 'dsq': resultado.dsq if resultado else False
-            })
+    meus_pontos_camp, desempenho_temporada = _estatisticas_da_temporada(perfil, season_ativa)
 
     # Protestos e Defesas
     meus_protestos = Protesto.query.filter_by(acusador_id=perfil.id).order_by(Protesto.data_criacao.desc()).all()
@@ -337,30 +295,18 @@ def my_profile():
     
     total_punicoes = 0
     for h in historico_punicoes:
-        if h.veredito_final == 'LEVE': total_punicoes += 3
-        elif h.veredito_final == 'MEDIA': total_punicoes += 5
-        elif h.veredito_final == 'GRAVE': total_punicoes += 10
+        total_punicoes += PERDA_VEREDITO.get(h.veredito_final, 0)
 
     # Histórico de Carreira (Temporadas Passadas)
-    seasons_fechadas = Season.query.filter_by(ativa=False).order_by(Season.id.desc()).all()
-    historico_carreira = []
-    for s in seasons_fechadas:
-        resultados_na_season = [r for r in perfil.race_results if r.race.season_id == s.id]
-        if resultados_na_season:
-            pts = sum(r.pontos_ganhos for r in resultados_na_season)
-            vitorias = sum(1 for r in resultados_na_season if r.posicao == 1 and not r.dsq)
-            grids_corridos = [r.race.grid for r in resultados_na_season]
-            grid_predominante = max(set(grids_corridos), key=grids_corridos.count) if grids_corridos else "N/A"
-            historico_carreira.append({'season_nome': s.nome, 'grid': grid_predominante, 'pontos': pts, 'vitorias': vitorias})
+    historico_carreira = queries.historico_de_carreira(perfil.id)
+
+    # Confrontos diretos com os rivais do grid (matriz pré-calculada por versão da temporada)
+    confrontos_diretos = confrontos.confrontos(season_ativa.id, perfil.grid).linha(perfil.id) if season_ativa else []
+    # Pontos acumulados e posição no campeonato após cada etapa (gráfico)
+    evolucao = progressao.progressao(season_ativa.id, perfil.grid).serie(perfil.id) if season_ativa else []
 
     # Verificação de Quali Ban para o Perfil Privado
-    ultimo_p = Protesto.query.filter_by(acusado_id=perfil.id, status='CONCLUIDO')\
-        .order_by(Protesto.data_fechamento.desc()).first()
-    quali_ban = False
-    if ultimo_p and ultimo_p.veredito_final in ['MEDIA', 'GRAVE']:
-        ultima_res = RaceResult.query.join(Race).filter(RaceResult.pilot_id == perfil.id, Race.status == 'Concluida').order_by(Race.data_corrida.desc()).first()
-        if not ultima_res or ultimo_p.data_fechamento.date() >= ultima_res.race.data_corrida:
-            quali_ban = True
+    quali_ban = queries.quali_bans([perfil.id])[perfil.id]
 
     return render_template('pilot/profile.html', 
                            perfil=perfil,
@@ -372,11 +318,56 @@ def my_profile():
                            historico=historico_punicoes,
                            total_punicoes=total_punicoes,
                            historico_carreira=historico_carreira,
+                           confrontos_diretos=confrontos_diretos,
+                           evolucao=evolucao,
                            checkin_race=checkin_race,
                            registro_atual=registro_atual,
                            quali_ban=quali_ban)
 
 # --- AÇÕES DE CHECK-IN ---
+# A janela de check-in (2 dias antes da corrida) é o pico de escrita da liga:
+# o grid inteiro responde em poucos minutos e cliques duplos são comuns. A
+# resposta é gravada com um único INSERT ... ON CONFLICT DO UPDATE sobre a
+# restrição única (race_id, pilot_id): sem ler antes, sem linha duplicada e
+# sem transação de leitura que precise virar escrita no meio (SQLITE_BUSY).
+# Carga de pico: python medir_checkin.py
+
+def _corrida_checkin(perfil, season_ativa):
+    """Corrida com check-in aberto para o piloto: a próxima não concluída do seu grid, a até JANELA_CHECKIN_DIAS dias."""
+    if not season_ativa:
+        return None
+    hoje = datetime.utcnow().date()
+    proxima = Race.query.filter(
+        Race.season_id == season_ativa.id,
+        Race.grid == perfil.grid,
+        Race.status != 'Concluida',
+        Race.data_corrida >= hoje
+    ).order_by(Race.data_corrida).first()
+    if proxima and (proxima.data_corrida - hoje).days <= JANELA_CHECKIN_DIAS:
+        return proxima
+    return None
+
+def _checkin_aberto(race):
+    # A resposta só vale para a corrida que o perfil oferece (grid do piloto, janela aberta)
+    aberta = _corrida_checkin(current_user.pilot_profile, Season.query.filter_by(ativa=True).first())
+    if aberta is None or aberta.id != race.id:
+        flash('O check-in desta corrida não está aberto para o seu grid.', 'warning')
+        return False
+    return True
+
+def _responder_checkin(race, status, justificativa=None):
+    comando = upsert(RaceRegistration).values(
+        race_id=race.id,
+        pilot_id=current_user.pilot_profile.id,
+        status=status,
+        justificativa=justificativa,
+        data_resposta=datetime.utcnow()
+    )
+    db.session.execute(comando.on_conflict_do_update(
+        index_elements=[RaceRegistration.race_id, RaceRegistration.pilot_id],
+        set_={c: comando.excluded[c] for c in ('status', 'justificativa', 'data_resposta')}
+    ))
+    db.session.commit()
 
 @public_bp.route('/checkin/confirm/<int:race_id>', methods=['POST'])
 @login_required
@@ -386,16 +377,11 @@ def checkin_confirm(race_id):
     if current_user.pilot_profile.esta_banido():
         flash('Você está com a CNH Suspensa/Banida e não pode correr.', 'danger')
         return redirect(url_for('public.my_profile'))
-        
-    registro = RaceRegistration.query.filter_by(race_id=race_id, pilot_id=current_user.pilot_profile.id).first()
-    if not registro:
-        registro = RaceRegistration(race_id=race_id, pilot_id=current_user.pilot_profile.id)
-        db.session.add(registro)
-    
-    registro.status = 'CONFIRMADO'
-    registro.justificativa = None
-    registro.data_resposta = datetime.utcnow()
-    db.session.commit()
+
+    race = Race.query.get_or_404(race_id)
+    if not _checkin_aberto(race):
+        return redirect(url_for('public.my_profile'))
+    _responder_checkin(race, 'CONFIRMADO')
     flash('Presença confirmada! Boa corrida!', 'success')
     return redirect(url_for('public.my_profile'))
 
@@ -408,15 +394,10 @@ def checkin_absent(race_id):
         flash('É obrigatório informar o motivo da ausência.', 'warning')
         return redirect(url_for('public.my_profile'))
 
-    registro = RaceRegistration.query.filter_by(race_id=race_id, pilot_id=current_user.pilot_profile.id).first()
-    if not registro:
-        registro = RaceRegistration(race_id=race_id, pilot_id=current_user.pilot_profile.id)
-        db.session.add(registro)
-    
-    registro.status = 'JUSTIFICADO'
-    registro.justificativa = motivo
-    registro.data_resposta = datetime.utcnow()
-    db.session.commit()
+    race = Race.query.get_or_404(race_id)
+    if not _checkin_aberto(race):
+        return redirect(url_for('public.my_profile'))
+    _responder_checkin(race, 'JUSTIFICADO', motivo)
     flash('Ausência registrada. Agradecemos o aviso.', 'info')
     return redirect(url_for('public.my_profile'))
 
@@ -429,15 +410,21 @@ def team_profile(team_id):
     total_pontos = 0
     total_vitorias = 0
     stats_pilotos = []
+    duelos_internos = []
     if season_ativa:
-        for piloto in team.pilots:
-            pts = sum(r.pontos_ganhos for r in piloto.race_results if r.race.season_id == season_ativa.id)
-            wins = sum(1 for r in piloto.race_results if r.race.season_id == season_ativa.id and r.posicao == 1 and not r.dsq)
-            stats_pilotos.append({'piloto': piloto, 'pontos': pts, 'vitorias': wins})
-        results_team = RaceResult.query.join(Race).filter(RaceResult.team_id == team.id, Race.season_id == season_ativa.id).all()
-        total_pontos = sum(r.pontos_ganhos for r in results_team)
-        total_vitorias = sum(1 for r in results_team if r.posicao == 1 and not r.dsq)
-    return render_template('public/team_profile.html', team=team, total_pontos=total_pontos, total_vitorias=total_vitorias, stats_pilotos=stats_pilotos)
+        # Duelo entre os companheiros de equipe (mesma matriz dos perfis de piloto)
+        matriz = confrontos.confrontos(season_ativa.id, team.grid)
+        for a, b in combinations(team.pilots, 2):
+            par = matriz.par(a.id, b.id)
+            if par:
+                duelos_internos.append({'piloto': a, **par})
+        temporada = cubo.cubo(season_ativa.id)
+        ids = [piloto.id for piloto in team.pilots]
+        # Pontos dos resultados na temporada (sem a penalidade de campeonato, como o total da equipe)
+        for piloto, pts, wins in zip(team.pilots, temporada.pontos(ids, penalidade=False), temporada.contagem(ids, 1)):
+            stats_pilotos.append({'piloto': piloto, 'pontos': float(pts), 'vitorias': int(wins)})
+        total_pontos, total_vitorias = temporada.equipe_totais(team.id)
+    return render_template('public/team_profile.html', team=team, total_pontos=total_pontos, total_vitorias=total_vitorias, stats_pilotos=stats_pilotos, duelos_internos=duelos_internos)
 
 # --- AÇÕES DO PILOTO (DEFESA, ATUALIZAR PERFIL, PROTESTAR) ---
 
@@ -455,14 +442,57 @@ def submit_defense(protest_id):
         return redirect(url_for('public.my_profile'))
     return render_template('pilot/defense.html', protesto=protesto)
 
+def _pode_enviar_video(protesto, lado):
+    # Acusador envia o vídeo da acusação, acusado o da defesa; só até o julgamento
+    perfil = current_user.pilot_profile
+    if not perfil or protesto.status == 'CONCLUIDO':
+        return False
+    return (lado == videos.ACUSACAO and protesto.acusador_id == perfil.id) or \
+           (lado == videos.DEFESA and protesto.acusado_id == perfil.id)
+
+@public_bp.route('/protesto/<int:protest_id>/video/<lado>', methods=['GET', 'POST'])
+@login_required
+def protest_video(protest_id, lado):
+    # GET: tela de envio; POST {nome, tamanho}: abre (ou retoma) o envio em partes (app/videos.py)
+    protesto = Protesto.query.get_or_404(protest_id)
+    lado = lado.upper()
+    if lado not in (videos.ACUSACAO, videos.DEFESA) or not _pode_enviar_video(protesto, lado):
+        if request.method == 'POST':
+            return jsonify({'erro': 'Envio de vídeo não permitido neste protesto.'}), 403
+        return redirect(url_for('public.my_profile'))
+    if request.method == 'POST':
+        dados = request.get_json(silent=True) or {}
+        try:
+            video = videos.iniciar(protesto, lado, current_user.pilot_profile.id, dados.get('nome'), dados.get('tamanho'))
+        except videos.EnvioInvalido as e:
+            return jsonify({'erro': str(e)}), e.status
+        return jsonify({**videos.estado(video), 'url': url_for('public.video_upload', video_id=video.id)})
+    return render_template('pilot/video.html', protesto=protesto, lado=lado, atual=protesto.video_enviado(lado))
+
+@public_bp.route('/video/<int:video_id>', methods=['GET', 'PUT'])
+@login_required
+def video_upload(video_id):
+    # GET: quanto já chegou; PUT ?offset=<n>: próxima parte, com o cabeçalho X-Parte-SHA256
+    video = VideoProtesto.query.get_or_404(video_id)
+    if not current_user.pilot_profile or video.pilot_id != current_user.pilot_profile.id:
+        return jsonify({'erro': 'Envio não encontrado.'}), 404
+    if request.method == 'PUT':
+        if not _pode_enviar_video(video.protesto, video.lado):
+            return jsonify({'erro': 'Protesto já julgado.'}), 403
+        try:
+            videos.receber_parte(video, request.args.get('offset', type=int), request.headers.get('X-Parte-SHA256'),
+                                 request.stream, request.content_length)
+        except videos.EnvioInvalido as e:
+            return jsonify({'erro': str(e), **videos.estado(video)}), e.status
+    return jsonify(videos.estado(video))
+
 @public_bp.route('/protesto/<int:protest_id>/delete', methods=['POST'])
 @login_required
 def delete_protest(protest_id):
     protesto = Protesto.query.get_or_404(protest_id)
     if protesto.acusador_id != current_user.pilot_profile.id: return redirect(url_for('public.my_profile'))
     if protesto.status == 'CONCLUIDO': return redirect(url_for('public.my_profile'))
-    VotoComissario.query.filter_by(protesto_id=protesto.id).delete()
-    db.session.delete(protesto)
+    db.session.delete(protesto) # Votos saem junto (ON DELETE CASCADE)
     db.session.commit()
     return redirect(url_for('public.my_profile'))
 
@@ -495,7 +525,7 @@ def update_profile():
                 
             ext = file.filename.rsplit('.', 1)[1].lower()
             timestamp = int(datetime.utcnow().timestamp())
-            nome = f"piloto_{current_user.pilot_profile.id}_{timestamp}.{ext}"
+            nome = ligas.nome_upload(f"piloto_{current_user.pilot_profile.id}_{timestamp}.{ext}")
             file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], nome))
             current_user.pilot_profile.foto_url = nome
     db.session.commit()
@@ -517,7 +547,12 @@ def open_protest():
             data_criacao=datetime.utcnow()
         )
         db.session.add(novo)
+        db.session.flush()
+        notificacoes.defesa_solicitada(novo)
         db.session.commit()
+        if not novo.video_link:
+            # Sem link: o vídeo vai como arquivo, enviado em partes
+            return redirect(url_for('public.protest_video', protest_id=novo.id, lado='acusacao'))
         return redirect(url_for('public.my_profile'))
     season_ativa = Season.query.filter_by(ativa=True).first()
 
@@ -0,0 +1,289 @@
+import json
+import os
+import secrets
+import time
+import traceback
+from datetime import datetime, timedelta
+import click
+from flask import current_app, g
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as upsert
+from app import ligas, pontuacao, recordes
+from app.changes import Alteracoes, entregar
+from app.models import db, ChangeLog, Tarefa, Season, User, PilotProfile, Team, Race, RaceResult, RaceRegistration, SeletivaEntry
+
+# --- TAREFAS EM SEGUNDO PLANO ---
+# Encerrar temporada/seletiva, excluir corrida ou conta e recalcular pontos
+# mexem em muitas linhas. A rota só valida e agenda uma Tarefa; o
+# 'flask tarefas worker' (processo à parte, ver Procfile) executa em lotes de
+# TAREFAS_LOTE linhas, com um commit por lote (as alterações de cada lote são
+# publicadas como as de qualquer rota). Etapa e cursor de cada tarefa ficam
+# gravados no mesmo commit do lote: se o worker morrer, outra passada retoma
+# do último lote confirmado depois que a reserva (RESERVA) vence.
+#
+# Disparar duas vezes a mesma operação (clique duplo, dois admins) devolve a
+# tarefa que já está na fila: o índice único parcial de Tarefa.chave só admite
+# uma tarefa ativa por chave. O progresso aparece no painel do admin.
+#
+# O mesmo worker publica as alterações de cada escrita (tarefa PUBLICAR,
+# agendada na própria transação da escrita, em app/changes.py): snapshots da API, páginas estáticas e recordes.
+
+# Tempo sem sinal do worker até outra passada assumir a tarefa
+RESERVA = timedelta(minutes=5)
+
+ATIVAS = ('PENDENTE', 'EXECUTANDO')
+
+# tipo -> passo(tarefa, parametros, estado, lote): executa um lote e devolve True quando terminou
+TIPOS = {}
+
+def tipo(nome):
+    def registrar(passo):
+        TIPOS[nome] = passo
+        return passo
+    return registrar
+
+def agendar(tipo_, chave, descricao, parametros, usuario_id=None):
+    """Agenda a tarefa (com commit). Devolve (tarefa, nova); nova=False se já havia uma ativa com a chave."""
+    resultado = db.session.execute(upsert(Tarefa).values(
+        tipo=tipo_, chave=chave, descricao=descricao, parametros=json.dumps(parametros), criada_por=usuario_id
+    ).on_conflict_do_nothing(index_elements=[Tarefa.chave], index_where=Tarefa.status.in_(ATIVAS)))
+    db.session.commit()
+    tarefa = Tarefa.query.filter(Tarefa.chave == chave, Tarefa.status.in_(ATIVAS)).first()
+    return tarefa, resultado.rowcount == 1
+
+def ativa(chave):
+    return Tarefa.query.filter(Tarefa.chave == chave, Tarefa.status.in_(ATIVAS)).first()
+
+def recentes(limite=10):
+    """Painel do admin: as ativas e as últimas terminadas (sem as publicações, que são internas)."""
+    do_admin = Tarefa.tipo != 'PUBLICAR'
+    ativas = Tarefa.query.filter(do_admin, Tarefa.status.in_(ATIVAS)).order_by(Tarefa.id).all()
+    terminadas = Tarefa.query.filter(do_admin, Tarefa.status.notin_(ATIVAS)).order_by(Tarefa.id.desc()).limit(limite).all()
+    return ativas + terminadas
+
+# --- TIPOS ---
+
+@tipo('ENCERRAR_TEMPORADA')
+def _encerrar_temporada(tarefa, parametros, estado, lote):
+    season = db.session.get(Season, parametros['season_id'])
+    if tarefa.etapa is None:
+        # Campeões de cada grid (antes de os pilotos saírem do grid), no mesmo commit que arquiva a temporada
+        if season.ativa:
+            recordes.registrar_titulos(season.id)
+            season.ativa = False
+        tarefa.etapa = 'pilotos'
+        tarefa.total = db.session.query(PilotProfile.id).join(User).filter(User.role != 'SUPER_ADM').count()
+        return False
+
+    if tarefa.etapa == 'pilotos':
+        # Resetar disciplina e demitir pilotos (exceto Super ADM): todos viram Free Agents
+        ids = [i for (i,) in db.session.query(PilotProfile.id).join(User).filter(
+            User.role != 'SUPER_ADM', PilotProfile.id > estado.get('apos', 0)
+        ).order_by(PilotProfile.id).limit(lote)]
+        if ids:
+            PilotProfile.query.filter(PilotProfile.id.in_(ids)).update(
+                {'pontos_cnh': 25, 'advertencias_acumuladas': 0, 'team_id': None, 'grid': 'SEM_GRID'},
+                synchronize_session=False)
+            estado['apos'] = ids[-1]
+            tarefa.feito += len(ids)
+            return False
+        tarefa.etapa = 'equipes'
+
+    # Arquivar equipes
+    Team.query.filter(Team.ativa.isnot(False)).update({'ativa': False}, synchronize_session=False)
+    tarefa.resultado = f'Temporada {season.nome} encerrada! Equipes arquivadas e {tarefa.feito} pilotos liberados.'
+    return True
+
+def grid_da_seletiva(posicao):
+    if posicao <= 20: return 'ELITE'
+    if posicao <= 40: return 'ADVANCED'
+    if posicao <= 60: return 'INITIAL'
+    return 'RESERVA'
+
+@tipo('ENCERRAR_SELETIVA')
+def _encerrar_seletiva(tarefa, parametros, estado, lote):
+    if tarefa.total is None:
+        tarefa.total = SeletivaEntry.query.count()
+    inicio = tarefa.feito
+    ids = [i for (i,) in db.session.query(SeletivaEntry.pilot_id).order_by(SeletivaEntry.tempo_ms, SeletivaEntry.id)
+           .offset(inicio).limit(lote)]
+    por_grid = {}
+    for posicao, pilot_id in enumerate(ids, inicio + 1):
+        por_grid.setdefault(grid_da_seletiva(posicao), []).append(pilot_id)
+    for grid, pilotos in por_grid.items():
+        PilotProfile.query.filter(PilotProfile.id.in_(pilotos)).update({'grid': grid}, synchronize_session=False)
+    tarefa.feito += len(ids)
+    if len(ids) < lote:
+        tarefa.resultado = f'Seletiva encerrada! {tarefa.feito} pilotos foram alocados em seus grids.'
+        return True
+    return False
+
+@tipo('EXCLUIR_CORRIDA')
+def _excluir_corrida(tarefa, parametros, estado, lote):
+    race_id = parametros['race_id']
+    # Estornar punições de W.O. (FNJ): +5 por FNJ, num único UPDATE correlacionado
+    fnj = (RaceResult.race_id == race_id) & (RaceResult.ausencia == 'FNJ')
+    vezes = select(func.count()).where(fnj, RaceResult.pilot_id == PilotProfile.id).scalar_subquery()
+    PilotProfile.query.filter(PilotProfile.id.in_(select(RaceResult.pilot_id).where(fnj)))\
+        .update({'pontos_cnh': PilotProfile.pontos_cnh + 5 * vezes}, synchronize_session=False)
+    # Resultados, check-ins, protestos e votos saem junto (ON DELETE CASCADE)
+    removidas = Race.query.filter_by(id=race_id).delete(synchronize_session=False)
+    tarefa.resultado = 'Corrida removida.' if removidas else 'Corrida já havia sido removida.'
+    return True
+
+def _remover_foto(nome):
+    if nome:
+        caminho = os.path.join(current_app.config['UPLOAD_FOLDER'], nome)
+        if os.path.exists(caminho): os.remove(caminho)
+
+@tipo('EXCLUIR_USUARIO')
+def _excluir_usuario(tarefa, parametros, estado, lote):
+    # origem 'piloto' (delete_pilot) ou 'admin' (delete_admin): mudam só os textos da anonimização
+    user = db.session.get(User, parametros['user_id'])
+    if user is None:
+        tarefa.resultado = 'Conta já havia sido removida.'
+        return True
+    profile = user.pilot_profile
+    piloto = parametros.get('origem') == 'piloto'
+
+    # Com histórico de corrida: ANONIMIZAR (preserva a pontuação das equipes)
+    if profile and RaceResult.query.filter_by(pilot_id=profile.id).first():
+        _remover_foto(profile.foto_url)
+        profile.foto_url = None
+        suffix = secrets.token_hex(4)
+        user.username = f"{'Ex-Piloto' if piloto else 'Ex-Admin'}_{user.id}_{suffix}"
+        user.email = f"deleted_{user.id}_{suffix}@fullgas.local"
+        user.set_password(secrets.token_hex(16))
+        user.role = 'INATIVO'
+        profile.nickname = 'Piloto Removido' if piloto else 'Usuário Removido'
+        profile.nome_real = 'Dados Removidos'
+        profile.team_id = None
+        if piloto:
+            profile.pontos_cnh = 0
+        RaceRegistration.query.filter_by(pilot_id=profile.id).delete(synchronize_session=False)
+        tarefa.resultado = (f"{'Piloto' if piloto else 'Administrador'} possuía histórico. "
+                            f"Conta anonimizada para preservar a pontuação das equipes.")
+        return True
+
+    # EXCLUSÃO TOTAL (sem histórico): perfil, check-ins, protestos (e votos) e tempos da seletiva saem junto (ON DELETE CASCADE)
+    if profile:
+        _remover_foto(profile.foto_url)
+    User.query.filter_by(id=user.id).delete(synchronize_session=False)
+    tarefa.resultado = ('Conta do usuário e perfil de piloto excluídos permanentemente.' if piloto
+                        else 'Administrador removido.')
+    return True
+
+@tipo('RECALCULAR_PONTOS')
+def _recalcular_pontos(tarefa, parametros, estado, lote):
+    if tarefa.etapa is None:
+        # A temporada é recalculada (vetorizado) uma vez só; os lotes gravam a lista a partir do cursor
+        diferencas = pontuacao.recalcular_temporada(parametros['season_id'])
+        estado['pontos'] = [[d['id'], d['depois']] for d in diferencas]
+        estado['apos'] = 0
+        tarefa.etapa, tarefa.total = 'gravando', len(diferencas)
+
+    fatia = estado['pontos'][estado['apos']:estado['apos'] + lote]
+    if fatia:
+        db.session.execute(update(RaceResult), [{'id': i, 'pontos_ganhos': p} for i, p in fatia])
+        estado['apos'] += len(fatia)
+        tarefa.feito += len(fatia)
+    if estado['apos'] >= len(estado['pontos']):
+        tarefa.resultado = f'Pontuação recalculada: {tarefa.feito} resultados atualizados.'
+        return True
+    return False
+
+@tipo('PUBLICAR')
+def _publicar(tarefa, parametros, estado, lote):
+    alt = Alteracoes.de_json(parametros)
+    # Rajada de escritas: as publicações que estão na fila entram nesta passada. O que foi
+    # juntado é gravado antes de publicar, então um worker que morrer no meio não perde nada.
+    juntadas = db.session.execute(delete(Tarefa).where(
+        Tarefa.tipo == 'PUBLICAR', Tarefa.status == 'PENDENTE', Tarefa.id != tarefa.id
+    ).returning(Tarefa.parametros)).scalars().all()
+    if juntadas:
+        for outra in juntadas:
+            alt.mesclar(Alteracoes.de_json(json.loads(outra)))
+        tarefa.parametros = json.dumps(alt.para_json())
+        db.session.commit()
+    entregar(alt)
+    # Só a última publicação concluída fica na tabela
+    db.session.execute(delete(Tarefa).where(Tarefa.tipo == 'PUBLICAR', Tarefa.status == 'CONCLUIDA'))
+    # Change log só das últimas CHANGELOG_RETENCAO versões: clientes mais antigos recebem o snapshot completo
+    corte = db.session.query(func.max(ChangeLog.versao)).scalar()
+    if corte is not None:
+        db.session.execute(delete(ChangeLog).where(ChangeLog.versao <= corte - current_app.config['CHANGELOG_RETENCAO']))
+    tarefa.resultado = f'{len(juntadas) + 1} escritas publicadas.'
+    return True
+
+# --- EXECUÇÃO ---
+
+def _reservar():
+    """Pega a próxima tarefa livre (ou abandonada) com um único UPDATE; None se não houver."""
+    agora = datetime.utcnow()
+    livre = or_(Tarefa.status == 'PENDENTE', and_(Tarefa.status == 'EXECUTANDO', Tarefa.reservada_ate < agora))
+    proxima = select(Tarefa.id).where(livre).order_by(Tarefa.id).limit(1).scalar_subquery()
+    tarefa_id = db.session.execute(
+        update(Tarefa).where(Tarefa.id == proxima, livre)
+        .values(status='EXECUTANDO', reservada_ate=agora + RESERVA).returning(Tarefa.id)
+    ).scalar()
+    db.session.commit()
+    return tarefa_id
+
+def executar(tarefa_id, lote):
+    """Roda a tarefa lote a lote até o fim (um commit por lote)."""
+    while True:
+        tarefa = db.session.get(Tarefa, tarefa_id)
+        tarefa.data_inicio = tarefa.data_inicio or datetime.utcnow()
+        estado = json.loads(tarefa.estado or '{}')
+        try:
+            terminou = TIPOS[tarefa.tipo](tarefa, json.loads(tarefa.parametros), estado, lote)
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Tarefa %s (%s) falhou', tarefa_id, tarefa.tipo)
+            tarefa = db.session.get(Tarefa, tarefa_id)
+            tarefa.status, tarefa.erro, tarefa.data_fim = 'FALHOU', traceback.format_exc()[-2000:], datetime.utcnow()
+            db.session.commit()
+            return False
+        tarefa.estado = json.dumps(estado)
+        tarefa.reservada_ate = datetime.utcnow() + RESERVA
+        if terminou:
+            tarefa.status, tarefa.data_fim, tarefa.reservada_ate = 'CONCLUIDA', datetime.utcnow(), None
+        db.session.commit()
+        if terminou:
+            return True
+
+def trabalhar(app, intervalo, uma_vez=False):
+    while True:
+        executou = False
+        for slug in ligas.bancos(app):
+            with app.app_context():
+                g.liga = slug
+                lote = app.config.get('TAREFAS_LOTE', 200)
+                while (tarefa_id := _reservar()) is not None:
+                    executou = True
+                    ok = executar(tarefa_id, lote)
+                    app.logger.info('Tarefa %s%s %s', tarefa_id, f' ({slug})' if slug else '', 'concluída' if ok else 'falhou')
+        if uma_vez:
+            return
+        if not executou:
+            time.sleep(intervalo)
+
+def init_app(app):
+    @app.cli.group('tarefas')
+    def tarefas_cli():
+        """Operações pesadas do admin em segundo plano."""
+
+    @tarefas_cli.command('worker')
+    @click.option('--uma-vez', is_flag=True, help='Executa o que estiver na fila e sai (cron).')
+    @click.option('--intervalo', type=float, default=None, help='Segundos entre as consultas à fila vazia (padrão: TAREFAS_INTERVALO).')
+    def worker_command(uma_vez, intervalo):
+        """Executa as tarefas agendadas de todas as ligas."""
+        app.logger.setLevel('INFO')
+        trabalhar(app, intervalo or app.config.get('TAREFAS_INTERVALO', 2), uma_vez)
+
+    @tarefas_cli.command('listar')
+    def listar_command():
+        """Tarefas ativas e as últimas terminadas."""
+        for t in recentes():
+            progresso = f'{t.feito}/{t.total}' if t.total is not None else str(t.feito)
+            print(f'#{t.id:<5} {t.status:<10} {t.tipo:<20} {progresso:>11}  {t.descricao}')
@@ -1,4 +1,6 @@
+import os
 import re
+import tempfile
 from flask import current_app
 
 PONTUACAO_NORMAL = {
@@ -8,6 +10,24 @@ PONTUACAO_NORMAL = {
     16: 5, 17: 4, 18: 3, 19: 2, 20: 1
 }
 
+# Multiplicador dos pontos de posição por tipo de etapa (NORMAL = 1)
+MULTIPLICADOR_ETAPA = {'SPRINT': 0.5, 'FINAL': 2.0}
+
+# Pontos descontados do resultado da etapa por veredito de protesto
+PERDA_VEREDITO = {'LEVE': 3, 'MEDIA': 5, 'GRAVE': 10}
+# A cada N advertências acumuladas, desconto automático
+ADVERTENCIAS_POR_PUNICAO = 3
+PERDA_ADVERTENCIAS = 3
+
+# Posições do campeonato que sobem para o grid de cima (zona de acesso na projeção)
+VAGAS_PROMOCAO = {'ADVANCED': 3, 'INITIAL': 3}
+
+# Dias antes da corrida em que o check-in abre (perfil do piloto e aviso do app/notificacoes.py)
+JANELA_CHECKIN_DIAS = 2
+
+# Largadas mínimas para o piloto entrar no ranking de taxa de DNF (página de recordes)
+RECORDES_MIN_LARGADAS = 5
+
 ORDEM_CARROS = [
     "Sauber", "Sauber", "Haas", "Haas", "Alpine", "Alpine", 
     "Racing Bulls", "Racing Bulls", "Williams", "Williams", 
@@ -30,4 +50,22 @@ def get_embed_url(url):
     match_drive = re.search(drive_pattern, url)
     if match_drive: return f'https://drive.google.com/file/d/{match_drive.group(1)}/preview'
         
-    return None
\ No newline at end of file
+    return None
+
+def escrever_atomico(caminho, conteudo):
+    # Grava em um arquivo temporário na mesma pasta e troca de uma vez (os.replace),
+    # para o servidor web nunca entregar um arquivo pela metade.
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=pasta, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(conteudo)
+        os.chmod(temporario, 0o644)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario): os.remove(temporario)
+        raise
+
+def remover_arquivo(caminho):
+    if os.path.exists(caminho): os.remove(caminho)
@@ -0,0 +1,198 @@
+import fcntl
+import hashlib
+import mimetypes
+import os
+from datetime import datetime, timedelta
+import click
+from flask import current_app, send_file
+from app import ligas
+from app.models import db, VideoProtesto
+
+# --- VÍDEOS DOS PROTESTOS (ENVIO EM PARTES) ---
+# Acusação e defesa podem anexar o próprio arquivo de vídeo em vez de um link.
+# Clipes de 50-200 MB não cabem numa requisição (MAX_CONTENT_LENGTH), então o
+# envio é feito em partes de VIDEOS_PARTE bytes:
+#   1. POST /protesto/<id>/video/<lado> {nome, tamanho} abre o envio (ou devolve
+#      o envio já começado do mesmo arquivo, para continuar de onde parou);
+#   2. PUT /video/<id>?offset=<n> com os bytes da parte e o cabeçalho
+#      X-Parte-SHA256; a parte é gravada direto no disco enquanto é lida e só
+#      conta se o hash conferir;
+#   3. GET /video/<id> diz quantos bytes já chegaram (após uma queda de rede).
+# A parte que chega completa é a última; o arquivo é renomeado e o vídeo passa a
+# valer no protesto (substituindo o anterior do mesmo lado). A Direção de Prova
+# assiste pelo view_protest, com suporte a Range (avançar/voltar no vídeo).
+
+ACUSACAO, DEFESA = 'ACUSACAO', 'DEFESA'
+ENVIANDO, COMPLETO = 'ENVIANDO', 'COMPLETO'
+
+# Leitura do corpo da requisição em blocos, sem montar a parte inteira na memória
+BLOCO = 64 * 1024
+
+class EnvioInvalido(Exception):
+    """Erro do envio, com o status HTTP da resposta."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+def caminho(video):
+    return os.path.join(current_app.config['VIDEOS_FOLDER'], video.arquivo)
+
+def estado(video):
+    return {'id': video.id, 'lado': video.lado, 'tamanho': video.tamanho, 'recebido': video.recebido,
+            'parte': current_app.config['VIDEOS_PARTE'], 'status': video.status}
+
+def iniciar(protesto, lado, pilot_id, nome, tamanho):
+    """Abre o envio de um arquivo (ou devolve o envio em andamento do mesmo arquivo). Com commit."""
+    nome = os.path.basename(nome or '')[:200]
+    ext = nome.rsplit('.', 1)[-1].lower() if '.' in nome else ''
+    if ext not in current_app.config['VIDEOS_EXTENSOES']:
+        raise EnvioInvalido(f'Formato não aceito. Envie {", ".join(sorted(current_app.config["VIDEOS_EXTENSOES"]))}.')
+    if not isinstance(tamanho, int) or tamanho <= 0:
+        raise EnvioInvalido('Tamanho do arquivo inválido.')
+    if tamanho > current_app.config['VIDEOS_MAX']:
+        raise EnvioInvalido(f'Arquivo acima de {current_app.config["VIDEOS_MAX"] // (1024 * 1024)} MB.', 413)
+
+    video = VideoProtesto.query.filter_by(protesto_id=protesto.id, lado=lado, pilot_id=pilot_id, status=ENVIANDO,
+                                          nome_original=nome, tamanho=tamanho).order_by(VideoProtesto.id.desc()).first()
+    if video and os.path.exists(caminho(video)):
+        return video
+
+    video = VideoProtesto(protesto_id=protesto.id, lado=lado, pilot_id=pilot_id, nome_original=nome, tamanho=tamanho,
+                          tipo=mimetypes.guess_type(nome)[0] or 'application/octet-stream')
+    db.session.add(video)
+    db.session.flush()
+    pasta = ligas.pasta(current_app.config['VIDEOS_FOLDER'])
+    os.makedirs(pasta, exist_ok=True)
+    video.arquivo = os.path.relpath(os.path.join(pasta, f'protesto_{protesto.id}_{lado.lower()}_{video.id}.{ext}.parte'),
+                                    current_app.config['VIDEOS_FOLDER'])
+    open(caminho(video), 'wb').close()
+    db.session.commit()
+    return video
+
+def receber_parte(video, offset, sha256, corpo, tamanho_corpo):
+    """Grava uma parte a partir de `offset`, lendo `corpo` (stream) em blocos. Com commit.
+
+    Partes fora de ordem são recusadas (409, com o `recebido` atual); a repetição
+    de uma parte já gravada (resposta perdida na rede) só devolve o estado.
+    """
+    if offset is None or offset < 0:
+        raise EnvioInvalido('Parâmetro offset inválido.')
+    if video.status == COMPLETO or offset < video.recebido:
+        return video
+    if offset > video.recebido:
+        raise EnvioInvalido('Parte fora de ordem.', 409)
+    if not sha256:
+        raise EnvioInvalido('Cabeçalho X-Parte-SHA256 obrigatório.')
+    if tamanho_corpo is None:
+        raise EnvioInvalido('Cabeçalho Content-Length obrigatório.', 411)
+    if tamanho_corpo <= 0 or tamanho_corpo > current_app.config['VIDEOS_PARTE']:
+        raise EnvioInvalido(f'Cada parte deve ter até {current_app.config["VIDEOS_PARTE"]} bytes.', 413)
+    if offset + tamanho_corpo > video.tamanho:
+        raise EnvioInvalido('A parte passa do tamanho informado do arquivo.')
+
+    with open(caminho(video), 'r+b') as arquivo:
+        # Um envio por vez em cada arquivo (entre os workers do gunicorn): a repetição
+        # de uma parte que ainda está chegando espera e depois vê o recebido novo
+        fcntl.flock(arquivo, fcntl.LOCK_EX)
+        db.session.refresh(video)
+        if video.status == COMPLETO or offset < video.recebido:
+            return video
+        if offset > video.recebido:
+            raise EnvioInvalido('Parte fora de ordem.', 409)
+
+        arquivo.seek(offset)
+        hash_parte = hashlib.sha256()
+        lidos = 0
+        while lidos < tamanho_corpo:
+            bloco = corpo.read(min(BLOCO, tamanho_corpo - lidos))
+            if not bloco:
+                break
+            hash_parte.update(bloco)
+            arquivo.write(bloco)
+            lidos += len(bloco)
+        if lidos != tamanho_corpo or hash_parte.hexdigest() != sha256.lower():
+            # Conexão caiu no meio ou bytes corrompidos: descarta o que entrou desta parte
+            arquivo.truncate(offset)
+            raise EnvioInvalido('Parte incompleta ou corrompida (SHA-256 não confere). Envie de novo.', 422)
+        arquivo.truncate()
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+
+        video.recebido = offset + lidos
+        video.data_atualizacao = datetime.utcnow()
+        substituidos, renomeado = [], None
+        if video.recebido == video.tamanho:
+            parte = caminho(video)
+            substituidos = _concluir(video)
+            renomeado = (caminho(video), parte)
+        try:
+            db.session.commit()
+        except Exception:
+            # A linha continua ENVIANDO, apontando para o .parte: o arquivo volta para lá (a parte pode ser reenviada)
+            if renomeado:
+                os.replace(*renomeado)
+            raise
+    # Só depois do commit: se ele falhar, as linhas antigas continuam apontando para arquivos que existem
+    for arquivo in substituidos:
+        if os.path.exists(arquivo):
+            os.remove(arquivo)
+    return video
+
+def _concluir(video):
+    # Arquivo inteiro: tira o .parte do nome e substitui o vídeo anterior do mesmo lado.
+    # Devolve os arquivos dos vídeos substituídos, apagados pelo chamador depois do commit.
+    final = video.arquivo[:-len('.parte')]
+    os.replace(caminho(video), os.path.join(current_app.config['VIDEOS_FOLDER'], final))
+    video.arquivo = final
+    video.status = COMPLETO
+    substituidos = []
+    for antigo in VideoProtesto.query.filter(VideoProtesto.protesto_id == video.protesto_id, VideoProtesto.lado == video.lado,
+                                             VideoProtesto.status == COMPLETO, VideoProtesto.id != video.id):
+        if antigo.arquivo:
+            substituidos.append(caminho(antigo))
+        db.session.delete(antigo)
+    return substituidos
+
+def _apagar_arquivo(video):
+    if video.arquivo and os.path.exists(caminho(video)):
+        os.remove(caminho(video))
+
+def enviar(video):
+    """Resposta com o vídeo; o send_file atende Range (206) para o player avançar sem baixar tudo."""
+    return send_file(caminho(video), mimetype=video.tipo, conditional=True, download_name=video.nome_original)
+
+def limpar(horas):
+    """Apaga envios parados há mais de `horas` e arquivos sem linha (protesto excluído). Com commit."""
+    limite = datetime.utcnow() - timedelta(hours=horas)
+    parados = VideoProtesto.query.filter(VideoProtesto.status == ENVIANDO, VideoProtesto.data_atualizacao < limite).all()
+    for video in parados:
+        _apagar_arquivo(video)
+        db.session.delete(video)
+    db.session.commit()
+
+    # A exclusão de protestos (e de corridas e pilotos) leva as linhas pelo ON DELETE CASCADE, não os arquivos
+    pasta = ligas.pasta(current_app.config['VIDEOS_FOLDER'])
+    if not os.path.isdir(pasta):
+        return len(parados), 0
+    conhecidos = {os.path.normpath(a) for (a,) in db.session.query(VideoProtesto.arquivo)}
+    orfaos = 0
+    for nome in os.listdir(pasta):
+        completo = os.path.join(pasta, nome)
+        if nome.startswith('protesto_') and os.path.isfile(completo) and \
+                os.path.relpath(completo, current_app.config['VIDEOS_FOLDER']) not in conhecidos:
+            os.remove(completo)
+            orfaos += 1
+    return len(parados), orfaos
+
+def init_app(app):
+    @app.cli.group('videos')
+    def videos_cli():
+        """Vídeos dos protestos enviados como arquivo."""
+
+    @videos_cli.command('limpar')
+    @click.option('--horas', type=int, default=None, help='Idade mínima dos envios parados (padrão: VIDEOS_EXPIRA_HORAS).')
+    def limpar_command(horas):
+        """Apaga envios abandonados e arquivos de protestos excluídos (rode com 'flask ligas executar' para cada liga)."""
+        parados, orfaos = limpar(horas if horas is not None else app.config['VIDEOS_EXPIRA_HORAS'])
+        print(f'{parados} envios parados e {orfaos} arquivos sem protesto removidos.')
@@ -12,11 +12,92 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f'sqlite:///{db_path}'
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # --- ENGINES (ESCRITA / LEITURA) ---
+    # Escritas esperam o lock em vez de falhar na hora (noite de corrida)
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 15}}
+    # Engine somente leitura para a API e os GETs públicos.
+    # Se não for definido, é derivado da URI principal (apenas SQLite).
+    SQLALCHEMY_READ_DATABASE_URI = os.environ.get('READ_DATABASE_URL')
+    SQLALCHEMY_READ_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 10,
+        'pool_timeout': 5,
+        'connect_args': {'timeout': 5}
+    }
+    
+    # Cabeçalho X-Consultas e aviso quando uma tela passa do limite de comandos SQL (app/queries.py)
+    QUERY_BUDGETS = os.environ.get('QUERY_BUDGETS') == '1'
+    
+    # Temporadas simuladas por grid na projeção do campeonato (app/projecao.py).
+    # 20 mil com 20 pilotos e 10 etapas restantes: ~200 ms por grid, uma vez por versão da temporada.
+    PROJECAO_SIMULACOES = int(os.environ.get('PROJECAO_SIMULACOES', 20000))
     
+    # --- MULTI-LIGAS ---
+    # JSON {"slug": {"banco": "/caminho/liga.db", "hosts": ["liga.exemplo.com"]}} (app/ligas.py).
+    # Sem registro, o sistema atende uma única liga no SQLALCHEMY_DATABASE_URI.
+    LIGAS_ARQUIVO = os.environ.get('LIGAS_ARQUIVO')
+    # Engines de uma liga sem acesso há este tempo (segundos) são fechados
+    LIGAS_OCIOSIDADE = 600
+
+    # --- NOTIFICAÇÕES AOS PILOTOS (app/notificacoes.py) ---
+    # Transporte dos avisos: 'arquivo' (uma linha JSON por mensagem, para testes), 'http' (gateway de WhatsApp/SMS)
+    # ou vazio para não gravar avisos. A fila é enviada pelo 'flask notificacoes worker' (Procfile).
+    NOTIFICACOES_TRANSPORTE = os.environ.get('NOTIFICACOES_TRANSPORTE', '')
+    NOTIFICACOES_ARQUIVO = os.environ.get('NOTIFICACOES_ARQUIVO') or os.path.join(basedir, 'notificacoes.jsonl')
+    NOTIFICACOES_URL = os.environ.get('NOTIFICACOES_URL')
+    NOTIFICACOES_TOKEN = os.environ.get('NOTIFICACOES_TOKEN')
+    NOTIFICACOES_TIMEOUT = 10
+    # Mensagens por lote, limite por minuto de cada transporte e tentativas até desistir
+    NOTIFICACOES_LOTE = 50
+    NOTIFICACOES_POR_MINUTO = int(os.environ.get('NOTIFICACOES_POR_MINUTO', 60))
+    NOTIFICACOES_TENTATIVAS = 6
+    # Segundos entre as passadas do worker
+    NOTIFICACOES_INTERVALO = 5
+
+    # --- TAREFAS EM SEGUNDO PLANO (app/tarefas.py) ---
+    # Linhas por lote (um commit por lote; a tarefa retoma do último lote gravado)
+    TAREFAS_LOTE = int(os.environ.get('TAREFAS_LOTE', 200))
+    # Segundos entre as consultas do worker à fila vazia
+    TAREFAS_INTERVALO = 2
+    # Versões dos dados mantidas no change log (/api/changes); quem estiver mais atrás recebe o snapshot completo
+    CHANGELOG_RETENCAO = int(os.environ.get('CHANGELOG_RETENCAO', 5000))
+
+    # --- AUDITORIA DO PAINEL ADMIN (app/auditoria.py) ---
+    # O gravador do processo insere o buffer a cada AUDITORIA_INTERVALO segundos,
+    # ou antes disso se juntar AUDITORIA_LOTE linhas
+    AUDITORIA_LOTE = 200
+    AUDITORIA_INTERVALO = 2
+
     # --- CONFIGURAÇÃO DE UPLOAD ---
     # Define a pasta onde as fotos vão ficar
     UPLOAD_FOLDER = os.path.join(basedir, 'app', 'static', 'uploads')
     # Tamanho máximo do arquivo (ex: 2MB)
     MAX_CONTENT_LENGTH = 2 * 1024 * 1024 
     # Extensões permitidas
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
\ No newline at end of file
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+    # --- VÍDEOS DOS PROTESTOS (app/videos.py) ---
+    # Arquivos enviados pelos pilotos, fora de static: só a Direção de Prova assiste
+    VIDEOS_FOLDER = os.environ.get('VIDEOS_FOLDER') or os.path.join(basedir, 'videos')
+    # Bytes por parte (cada parte é uma requisição, abaixo do MAX_CONTENT_LENGTH) e tamanho máximo do vídeo
+    VIDEOS_PARTE = 1024 * 1024
+    VIDEOS_MAX = 300 * 1024 * 1024
+    VIDEOS_EXTENSOES = {'mp4', 'mov', 'm4v', 'webm', 'mkv'}
+    # Envios parados há mais que isso são apagados pelo 'flask videos limpar'
+    VIDEOS_EXPIRA_HORAS = 48
+
+    # --- SNAPSHOTS ESTÁTICOS DA API ---
+    # JSON da /api regravado a cada alteração e servido direto pelo servidor web (/static/api/)
+    API_SNAPSHOTS = os.environ.get('API_SNAPSHOTS', '1') == '1'
+    API_SNAPSHOT_FOLDER = os.path.join(basedir, 'app', 'static', 'api')
+
+    # --- PÁGINAS PÚBLICAS PRÉ-RENDERIZADAS ---
+    # HTML da home, equipes, pilotos e notícias regerado a cada alteração (visitantes anônimos)
+    STATIC_PAGES = os.environ.get('STATIC_PAGES', '1') == '1'
+    STATIC_PAGES_FOLDER = os.path.join(basedir, 'app', 'static', 'paginas')
+
+    # --- COMPRESSÃO (gzip / brotli) ---
+    COMPRESS_MIN_SIZE = 500
+    # Cache dos bytes já comprimidos, por versão de conteúdo
+    COMPRESS_CACHE_BYTES = 32 * 1024 * 1024
\ No newline at end of file
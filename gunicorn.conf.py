@@ -0,0 +1,11 @@
+# Configuração do gunicorn (Procfile: gunicorn -c gunicorn.conf.py run:app)
+# Número de workers: variável WEB_CONCURRENCY ou -w.
+
+# O app é importado uma vez no mestre e compartilhado com os workers (copy-on-write)
+preload_app = True
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from app.preload import aquecer
+        from run import app
+        aquecer(app)
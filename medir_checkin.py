@@ -0,0 +1,149 @@
+import http.client
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+# --- CARGA DE PICO DO CHECK-IN ---
+# Simula a abertura da janela de check-in: um grid inteiro já logado responde
+# ao mesmo tempo, cada piloto com vários cliques simultâneos (clique duplo,
+# app + site), contra o gunicorn com N workers. Os cliques alternam presença e
+# ausência, para exercitar a atualização da mesma linha. Mostra os percentis de
+# latência, as respostas com erro e quantas linhas duplicadas sobraram no banco.
+#
+#   python medir_checkin.py [pilotos] [workers] [cliques por piloto]   (padrão: 20 4 3)
+#
+# Usa um banco SQLite temporário preparado aqui (DATABASE_URL é ignorado).
+
+PREPARO = r'''
+import sys
+from datetime import date, timedelta
+import run
+from app.cli import bootstrap_banco
+from app.models import db, Season, Race, Team, User, PilotProfile
+pilotos = int(sys.argv[1])
+with run.app.app_context():
+    bootstrap_banco()
+    season = Season(nome='Carga', ativa=True, data_inicio=date.today())
+    db.session.add(season)
+    db.session.flush()
+    race = Race(season_id=season.id, nome_gp='GP Carga', pista='Interlagos', grid='ELITE', data_corrida=date.today() + timedelta(days=2))
+    db.session.add(race)
+    equipes = [Team(nome=f'Equipe {i}', grid='ELITE') for i in range(-(-pilotos // 2))]
+    db.session.add_all(equipes)
+    db.session.flush()
+    for i in range(pilotos):
+        user = User(username=f'carga{i}', email=f'carga{i}@carga.local', role='PILOTO')
+        user.set_password('carga')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(PilotProfile(user_id=user.id, nickname=f'Carga {i}', nome_real=f'Piloto de Carga {i}', grid='ELITE', team_id=equipes[i // 2].id))
+    db.session.commit()
+    print(race.id)
+'''
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _post(porta, caminho, campos, cookie=None):
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+    cabecalhos = {'Content-Type': 'application/x-www-form-urlencoded'}
+    if cookie:
+        cabecalhos['Cookie'] = cookie
+    conexao.request('POST', caminho, urllib.parse.urlencode(campos), cabecalhos)
+    resposta = conexao.getresponse()
+    resposta.read()
+    conexao.close()
+    return resposta
+
+def _login(porta, i):
+    resposta = _post(porta, '/login', {'email': f'carga{i}@carga.local', 'password': 'carga'})
+    return resposta.getheader('Set-Cookie').split(';')[0]
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+def main():
+    pilotos = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    cliques = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    banco = os.path.join(tempfile.mkdtemp(), 'checkin.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{banco}')
+    env.pop('READ_DATABASE_URL', None)
+    env.setdefault('API_SNAPSHOTS', '0')
+    env.setdefault('STATIC_PAGES', '0')
+    race_id = int(subprocess.run([sys.executable, '-c', PREPARO, str(pilotos)], env=env, capture_output=True, text=True,
+                                 check=True, cwd=raiz).stdout.split()[-1])
+
+    porta = _porta_livre()
+    comando = [sys.executable, '-m', 'gunicorn', '-c', os.devnull, '-w', str(workers), '-b', f'127.0.0.1:{porta}', 'run:app']
+    servidor = subprocess.Popen(comando, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=raiz)
+    try:
+        for _ in range(300):
+            try:
+                http.client.HTTPConnection('127.0.0.1', porta, timeout=1).request('GET', '/login')
+                break
+            except OSError:
+                time.sleep(0.1)
+        cookies = [_login(porta, i) for i in range(pilotos)]
+
+        latencias, erros = [], []
+        largada = threading.Barrier(pilotos * cliques)
+        trava = threading.Lock()
+
+        def clicar(i, k):
+            if k % 2:
+                caminho, campos = f'/checkin/absent/{race_id}', {'justificativa': 'Viagem'}
+            else:
+                caminho, campos = f'/checkin/confirm/{race_id}', {}
+            largada.wait()
+            inicio = time.perf_counter()
+            try:
+                status = _post(porta, caminho, campos, cookies[i]).status
+            except OSError as e:
+                status = type(e).__name__
+            duracao = (time.perf_counter() - inicio) * 1000
+            with trava:
+                latencias.append(duracao)
+                if status != 302:
+                    erros.append(status)
+
+        threads = [threading.Thread(target=clicar, args=(i, k)) for i in range(pilotos) for k in range(cliques)]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        total = time.perf_counter() - inicio
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    conexao = sqlite3.connect(banco)
+    linhas = conexao.execute('SELECT count(*) FROM race_registration WHERE race_id = ?', (race_id,)).fetchone()[0]
+    duplicadas = conexao.execute(
+        'SELECT coalesce(sum(n - 1), 0) FROM (SELECT count(*) AS n FROM race_registration '
+        'WHERE race_id = ? GROUP BY pilot_id HAVING count(*) > 1)', (race_id,)
+    ).fetchone()[0]
+    respondidos = conexao.execute('SELECT count(DISTINCT pilot_id) FROM race_registration WHERE race_id = ?',
+                                  (race_id,)).fetchone()[0]
+    conexao.close()
+
+    print(f'{pilotos} pilotos x {cliques} cliques simultâneos, {workers} workers: {len(latencias)} requisições em {total:.2f} s')
+    print(f'latência: p50 {_percentil(latencias, 50):.1f} ms | p90 {_percentil(latencias, 90):.1f} ms | '
+          f'p99 {_percentil(latencias, 99):.1f} ms | máx {max(latencias):.1f} ms | média {statistics.mean(latencias):.1f} ms')
+    print(f'erros: {len(erros)} {sorted(set(map(str, erros))) if erros else ""}')
+    print(f'check-ins gravados: {linhas} linhas, {respondidos}/{pilotos} pilotos, {duplicadas} duplicadas')
+
+if __name__ == '__main__':
+    main()
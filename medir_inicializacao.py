@@ -0,0 +1,65 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# --- TEMPO DE INICIALIZAÇÃO DO WORKER ---
+# Mede, em processos novos (como um worker do gunicorn recém-criado), o tempo
+# de importar o run.py e o tempo da primeira requisição.
+#
+#   python medir_inicializacao.py [repeticoes] [url]
+#
+# Usa um banco SQLite temporário já preparado, a não ser que DATABASE_URL
+# esteja definido.
+
+MEDICAO = r'''
+import sys, time
+t0 = time.perf_counter()
+import run
+t1 = time.perf_counter()
+resposta = run.app.test_client().get(sys.argv[1])
+t2 = time.perf_counter()
+print((t1 - t0) * 1000, (t2 - t1) * 1000, resposta.status_code)
+'''
+
+PREPARO = r'''
+import run
+try:
+    from app.cli import bootstrap_banco
+except ImportError:  # versões sem o comando 'flask bootstrap' criam o banco na importação
+    pass
+else:
+    with run.app.app_context():
+        bootstrap_banco()
+'''
+
+def medir(url, env):
+    saida = subprocess.run([sys.executable, '-c', MEDICAO, url], env=env, capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+    importacao, primeira, status = saida.stdout.split()[-3:]
+    return float(importacao), float(primeira), status
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    url = sys.argv[2] if len(sys.argv) > 2 else '/'
+    env = dict(os.environ)
+    if 'DATABASE_URL' not in env:
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'inicializacao.db')
+    env.setdefault('API_SNAPSHOTS', '0')
+    env.setdefault('STATIC_PAGES', '0')
+
+    # Prepara o banco e aquece o cache de bytecode
+    subprocess.run([sys.executable, '-c', PREPARO], env=env, capture_output=True, check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    medir(url, env)
+    amostras = [medir(url, env) for _ in range(repeticoes)]
+    importacoes = [a[0] for a in amostras]
+    primeiras = [a[1] for a in amostras]
+    print(f'{repeticoes} processos, GET {url} -> {amostras[-1][2]}')
+    print(f'importação:          mediana {statistics.median(importacoes):7.1f} ms   (min {min(importacoes):.1f})')
+    print(f'primeira requisição: mediana {statistics.median(primeiras):7.1f} ms   (min {min(primeiras):.1f})')
+    print(f'total:               mediana {statistics.median(i + p for i, p, _ in amostras):7.1f} ms')
+
+if __name__ == '__main__':
+    main()
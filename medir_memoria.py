@@ -0,0 +1,89 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# --- MEMÓRIA DOS WORKERS (com e sem preload) ---
+# Sobe o gunicorn com N workers sem preload (cada worker monta o próprio app) e
+# com o gunicorn.conf.py (app montado e aquecido no mestre), faz requisições
+# para todos os workers usarem as telas e soma a memória lida de /proc (Linux):
+#
+#   PSS  memória proporcional (páginas compartilhadas divididas entre os processos)
+#   USS  memória exclusiva de cada worker
+#
+#   python medir_memoria.py [workers ...]       (padrão: 2 4)
+#
+# Usa um banco SQLite temporário já preparado, a não ser que DATABASE_URL esteja definido.
+
+URLS = ['/', '/login', '/transparencia', '/api/bundle', '/api/pilots']
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _memoria(pid):
+    campos = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for linha in f:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == 'kB':
+                campos[partes[0].rstrip(':')] = int(partes[1])
+    return campos['Pss'], campos['Private_Clean'] + campos['Private_Dirty']
+
+def _filhos(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+def medir(workers, preload, env):
+    porta = _porta_livre()
+    # Sem -c o gunicorn carregaria o ./gunicorn.conf.py (preload) sozinho
+    configuracao = 'gunicorn.conf.py' if preload else os.devnull
+    comando = [sys.executable, '-m', 'gunicorn', '-c', configuracao, '-w', str(workers), '-b', f'127.0.0.1:{porta}']
+    mestre = subprocess.Popen(comando + ['run:app'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+    try:
+        for _ in range(300):
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{porta}/login', timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+        while len(_filhos(mestre.pid)) < workers:
+            time.sleep(0.1)
+        for _ in range(10 * workers):
+            for url in URLS:
+                urllib.request.urlopen(f'http://127.0.0.1:{porta}{url}').read()
+        time.sleep(0.5)
+
+        pss_mestre, _ = _memoria(mestre.pid)
+        memoria_workers = [_memoria(pid) for pid in _filhos(mestre.pid)]
+        pss_total = pss_mestre + sum(pss for pss, _ in memoria_workers)
+        uss_medio = sum(uss for _, uss in memoria_workers) / len(memoria_workers)
+        return pss_total, uss_medio
+    finally:
+        mestre.terminate()
+        mestre.wait()
+
+def main():
+    contagens = [int(n) for n in sys.argv[1:]] or [2, 4]
+    env = dict(os.environ)
+    if 'DATABASE_URL' not in env:
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'memoria.db')
+    env.setdefault('API_SNAPSHOTS', '0')
+    env.setdefault('STATIC_PAGES', '0')
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'run', 'bootstrap'], env=env, check=True,
+                   capture_output=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    print(f'{"workers":>7} | {"modo":<12} | {"PSS total":>10} | {"USS/worker":>10}')
+    for workers in contagens:
+        for preload in (False, True):
+            pss, uss = medir(workers, preload, env)
+            modo = 'preload' if preload else 'sem preload'
+            print(f'{workers:>7} | {modo:<12} | {pss / 1024:7.1f} MB | {uss / 1024:7.1f} MB')
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 import logging
 from logging.config import fileConfig
 
-from flask import current_app
+from flask import current_app, g
 
 from alembic import context
 
@@ -16,6 +16,10 @@ logger = logging.getLogger('alembic.env')
 
 
 def get_engine():
+    # Multi-ligas: 'flask ligas executar db upgrade' migra o banco de cada liga
+    ligas = current_app.extensions.get('ligas')
+    if ligas is not None and g.get('liga'):
+        return ligas.engine(g.liga)
     try:
         # this works with Flask-SQLAlchemy<3 and Alchemical
         return current_app.extensions['migrate'].db.get_engine()
@@ -94,9 +98,21 @@ def run_migrations_online():
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
+    # Índices FTS5 (busca_*) e as tabelas internas deles são criados por app/busca.py
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == 'table' and reflected and name.startswith('busca_'))
+
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
+
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # Migrações em lote do SQLite recriam a tabela (DROP + cópia): com as chaves
+        # estrangeiras ligadas, o DROP dispararia os ON DELETE CASCADE dos filhos
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -0,0 +1,90 @@
+"""Exclusões em cascata nas chaves estrangeiras
+
+Revision ID: 1834382713a8
+Revises: c6051130fb58
+Create Date: 2026-10-19 15:31:02.114235
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1834382713a8'
+down_revision = 'c6051130fb58'
+branch_labels = None
+depends_on = None
+
+# As chaves estrangeiras antigas não têm nome: a convenção deixa o modo em lote achá-las
+CONVENCAO = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+# Índices da busca textual sobre as tabelas recriadas, como estavam nesta revisão (cópia de app/busca.py)
+BUSCA = (
+    ('busca_news', 'news', ('titulo', 'subtitulo', 'texto')),
+    ('busca_piloto', 'pilot_profile', ('nickname', 'nome_real')),
+    ('busca_protesto', 'protesto', ('descricao', 'argumento_defesa', 'justificativa_texto')),
+)
+
+# (tabela, coluna, tabela referida, ondelete), na ordem em que os órfãos são limpos (pais antes dos filhos)
+CHAVES = [
+    ('pilot_profile', 'user_id', 'user', 'CASCADE'),
+    ('pilot_profile', 'team_id', 'team', 'SET NULL'),
+    ('race', 'season_id', 'season', 'CASCADE'),
+    ('race_registration', 'race_id', 'race', 'CASCADE'),
+    ('race_registration', 'pilot_id', 'pilot_profile', 'CASCADE'),
+    ('race_result', 'race_id', 'race', 'CASCADE'),
+    ('race_result', 'pilot_id', 'pilot_profile', 'CASCADE'),
+    ('race_result', 'team_id', 'team', 'SET NULL'),
+    ('protesto', 'etapa_id', 'race', 'CASCADE'),
+    ('protesto', 'acusador_id', 'pilot_profile', 'CASCADE'),
+    ('protesto', 'acusado_id', 'pilot_profile', 'CASCADE'),
+    ('voto_comissario', 'protesto_id', 'protesto', 'CASCADE'),
+    ('voto_comissario', 'admin_id', 'user', 'CASCADE'),
+    ('seletiva_entry', 'pilot_id', 'pilot_profile', 'CASCADE'),
+    ('news', 'autor_id', 'user', 'SET NULL'),
+]
+
+
+def _remover_orfaos():
+    # Exclusões antigas (sem chaves estrangeiras ativas) deixaram linhas apontando para o nada:
+    # o que a cascata teria apagado é apagado agora; o que seria SET NULL é anulado
+    for tabela, coluna, referida, ondelete in CHAVES:
+        orfao = f'{coluna} IS NOT NULL AND {coluna} NOT IN (SELECT id FROM "{referida}")'
+        if ondelete == 'CASCADE':
+            op.execute(f'DELETE FROM "{tabela}" WHERE {orfao}')
+        else:
+            op.execute(f'UPDATE "{tabela}" SET {coluna} = NULL WHERE {orfao}')
+
+
+def _recriar_chaves(ondelete_de):
+    tabelas = {}
+    for tabela, coluna, referida, ondelete in CHAVES:
+        tabelas.setdefault(tabela, []).append((coluna, referida, ondelete))
+    for tabela, chaves in tabelas.items():
+        with op.batch_alter_table(tabela, schema=None, naming_convention=CONVENCAO) as batch_op:
+            for coluna, referida, ondelete in chaves:
+                nome = f'fk_{tabela}_{coluna}_{referida}'
+                batch_op.drop_constraint(nome, type_='foreignkey')
+                batch_op.create_foreign_key(nome, referida, [coluna], ['id'], ondelete=ondelete_de(ondelete))
+    # Recriar a tabela leva junto os triggers da busca textual (news, pilot_profile, protesto)
+    _recriar_triggers_busca()
+
+
+def _recriar_triggers_busca():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for fts, origem, colunas in BUSCA:
+        lista = ', '.join(colunas)
+        remover = f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {', '.join(f'old.{c}' for c in colunas)});"
+        inserir = f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {', '.join(f'new.{c}' for c in colunas)});"
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {origem} BEGIN {inserir} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {origem} BEGIN {remover} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {lista} ON {origem} BEGIN {remover} {inserir} END")
+
+
+def upgrade():
+    _remover_orfaos()
+    _recriar_chaves(lambda ondelete: ondelete)
+
+
+def downgrade():
+    _recriar_chaves(lambda ondelete: None)
@@ -0,0 +1,59 @@
+"""Adiciona busca textual (FTS5)
+
+Revision ID: 9d1f4b2c6e80
+Revises: 5c3e9a1d7b42
+Create Date: 2026-10-19 16:52:41.904417
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d1f4b2c6e80'
+down_revision = '5c3e9a1d7b42'
+branch_labels = None
+depends_on = None
+
+# Índices como estavam nesta revisão (cópia de app/busca.py): a migração não depende do código do app
+INDICES = (
+    ('busca_news', 'news', ('titulo', 'subtitulo', 'texto')),
+    ('busca_piloto', 'pilot_profile', ('nickname', 'nome_real')),
+    ('busca_equipe', 'team', ('nome',)),
+    ('busca_protesto', 'protesto', ('descricao', 'argumento_defesa', 'justificativa_texto')),
+)
+
+
+def _comandos(fts, origem, colunas):
+    lista = ', '.join(colunas)
+    novos = ', '.join(f'new.{c}' for c in colunas)
+    antigos = ', '.join(f'old.{c}' for c in colunas)
+    remover = f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos});"
+    inserir = f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({lista}, content='{origem}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {origem} BEGIN {inserir} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {origem} BEGIN {remover} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {lista} ON {origem} BEGIN {remover} {inserir} END",
+    ]
+
+
+def upgrade():
+    # Tabelas virtuais FTS5 + triggers de sincronização; indexa as linhas existentes
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    existentes = {nome for (nome,) in op.get_bind().exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for fts, origem, colunas in INDICES:
+        for comando in _comandos(fts, origem, colunas):
+            op.execute(comando)
+        if fts not in existentes:
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for fts, _, _ in INDICES:
+        for sufixo in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {fts}_{sufixo}')
+        op.execute(f'DROP TABLE IF EXISTS {fts}')
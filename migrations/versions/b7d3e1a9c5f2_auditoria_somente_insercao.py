@@ -0,0 +1,29 @@
+"""Auditoria somente inserção
+
+Revision ID: b7d3e1a9c5f2
+Revises: a4c7e2d9b1f6
+Create Date: 2026-10-19 21:40:12.514302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e1a9c5f2'
+down_revision = 'a4c7e2d9b1f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Mesmo SQL de app/auditoria.py (TRAVAS), copiado: a migração não depende do código do app
+    op.execute("CREATE TRIGGER IF NOT EXISTS auditoria_sem_update BEFORE UPDATE ON auditoria "
+               "BEGIN SELECT RAISE(ABORT, 'auditoria: somente inserção'); END")
+    op.execute("CREATE TRIGGER IF NOT EXISTS auditoria_sem_delete BEFORE DELETE ON auditoria "
+               "BEGIN SELECT RAISE(ABORT, 'auditoria: somente inserção'); END")
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS auditoria_sem_delete')
+    op.execute('DROP TRIGGER IF EXISTS auditoria_sem_update')
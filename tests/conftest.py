@@ -0,0 +1,91 @@
+import os
+import sys
+from datetime import date, timedelta
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app import create_app
+from app.models import db, User, PilotProfile, Team, Season, Race, RaceResult
+from app.utils import PONTUACAO_NORMAL
+
+GRIDS = ('ELITE', 'ADVANCED')
+
+def configuracao(pasta, **extra):
+    """Config de teste: banco e pastas geradas dentro de `pasta`."""
+    valores = {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{pasta / "liga.db"}',
+        'API_SNAPSHOT_FOLDER': str(pasta / 'api'),
+        'STATIC_PAGES_FOLDER': str(pasta / 'paginas'),
+        'UPLOAD_FOLDER': str(pasta / 'uploads'),
+        'VIDEOS_FOLDER': str(pasta / 'videos'),
+        'NOTIFICACOES_TRANSPORTE': '',
+        **extra,
+    }
+    return type('ConfigTeste', (Config,), valores)
+
+def semear():
+    """Temporada ativa, 2 grids x 3 equipes x 6 pilotos e 4 corridas por grid (as 2 primeiras com resultado)."""
+    season = Season(nome='Temporada 1', ativa=True, data_inicio=date(2026, 1, 1))
+    db.session.add(season)
+    db.session.flush()
+    for grid in GRIDS:
+        equipes = [Team(nome=f'{grid}-Equipe{i}', grid=grid, ativa=True) for i in range(3)]
+        db.session.add_all(equipes)
+        db.session.flush()
+        pilotos = []
+        for i in range(6):
+            user = User(username=f'{grid}{i}', email=f'{grid.lower()}{i}@x.com', role='PILOTO')
+            user.set_password('x')
+            db.session.add(user)
+            db.session.flush()
+            piloto = PilotProfile(user_id=user.id, nickname=f'{grid}-P{i}', nome_real='Piloto', grid=grid,
+                                  team_id=equipes[i // 2].id)
+            db.session.add(piloto)
+            pilotos.append(piloto)
+        db.session.flush()
+        for r in range(4):
+            race = Race(season_id=season.id, nome_gp=f'GP {grid} {r}', pista='Interlagos', grid=grid,
+                        data_corrida=date(2026, 1, 1) + timedelta(days=7 * r),
+                        status='Concluida' if r < 2 else 'Agendada', tipo_etapa='NORMAL')
+            db.session.add(race)
+            db.session.flush()
+            if r < 2:
+                ordem = pilotos if r == 0 else pilotos[::-1]
+                for pos, piloto in enumerate(ordem, 1):
+                    db.session.add(RaceResult(race_id=race.id, pilot_id=piloto.id, team_id=piloto.team_id, posicao=pos,
+                                              pontos_ganhos=float(PONTUACAO_NORMAL[pos])))
+    db.session.commit()
+    return season
+
+@pytest.fixture
+def app(tmp_path):
+    from app.cli import bootstrap_banco
+    app = create_app(configuracao(tmp_path))
+    with app.app_context():
+        bootstrap_banco()
+        semear()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def entrar(client, email, senha='x', prefixo=''):
+    resposta = client.post(f'{prefixo}/login', data={'email': email, 'password': senha})
+    assert resposta.status_code == 302
+    return client
+
+@pytest.fixture
+def admin(client):
+    return entrar(client, 'admin@fullgas.com', 'admin123')
+
+def rodar_tarefas(app):
+    """Executa o que estiver na fila de tarefas em segundo plano (app/tarefas.py), como o 'flask tarefas worker --uma-vez'."""
+    from app import tarefas
+    tarefas.trabalhar(app, 0, uma_vez=True)
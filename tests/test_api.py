@@ -0,0 +1,36 @@
+from app.models import db, News
+from app.payloads import GRIDS
+
+# /api/bundle (app/routes/api.py): as mesmas seções dos endpoints individuais, em uma resposta
+# com ETag pela versão dos dados.
+
+def test_bundle_igual_aos_endpoints(app, client):
+    with app.app_context():
+        db.session.add(News(titulo='Abertura', subtitulo='s', texto='t', autor_id=1))
+        db.session.commit()
+    bundle = client.get('/api/bundle').get_json()
+
+    assert bundle['news'] == client.get('/api/news').get_json()
+    assert bundle['teams'] == client.get('/api/teams').get_json()
+    assert set(bundle['standings']) == set(bundle['calendar']) == set(GRIDS)
+    for grid in GRIDS:
+        assert bundle['standings'][grid] == client.get(f'/api/standings/{grid}').get_json()
+        assert bundle['calendar'][grid] == client.get(f'/api/calendar/{grid}').get_json()
+    assert bundle['standings']['ELITE'] and bundle['calendar']['ELITE']
+
+def test_bundle_responde_304_ate_a_proxima_escrita(app, client):
+    resposta = client.get('/api/bundle')
+    etag = resposta.headers['ETag']
+    assert etag == f'"v{resposta.get_json()["versao"]}"'
+
+    repetida = client.get('/api/bundle', headers={'If-None-Match': etag})
+    assert repetida.status_code == 304
+    assert repetida.get_data() == b''
+
+    with app.app_context():
+        db.session.add(News(titulo='Depois', subtitulo='s', texto='t', autor_id=1))
+        db.session.commit()
+    nova = client.get('/api/bundle', headers={'If-None-Match': etag})
+    assert nova.status_code == 200
+    assert nova.headers['ETag'] != etag
+    assert [n['titulo'] for n in nova.get_json()['news']] == ['Depois']
@@ -0,0 +1,41 @@
+import json
+import pytest
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Auditoria, User
+
+# Trilha de auditoria (app/auditoria.py): uma linha antes/depois por alteração do painel,
+# gravada pelo Gravador em lote, e só de inserção no banco.
+
+def test_edicao_do_admin_gera_uma_linha_com_senha_mascarada(app, admin):
+    app.config['AUDITORIA_INTERVALO'] = 3600  # Só o descarregar() do teste grava
+    with app.app_context():
+        outro = User(username='Comissario', email='comissario@x.com', role='ADM')
+        outro.set_password('antiga')
+        db.session.add(outro)
+        db.session.commit()
+        outro_id = outro.id
+
+    assert admin.post(f'/admin/users/{outro_id}/reset_password', data={'new_password': 'nova'}).status_code == 302
+    with app.app_context():
+        # Até o gravador descarregar o buffer, nada no banco
+        assert Auditoria.query.count() == 0
+    app.extensions['auditoria'].descarregar()
+
+    with app.app_context():
+        linha = Auditoria.query.one()
+        assert (linha.admin_id, linha.rota, linha.acao, linha.entidade, linha.entidade_id) == \
+            (1, 'admin.reset_admin_password', 'ATUALIZADO', 'User', outro_id)
+        assert json.loads(linha.antes) == {'password_hash': '***'}
+        assert json.loads(linha.depois) == {'password_hash': '***'}
+
+def test_auditoria_nao_aceita_update_nem_delete(app, admin):
+    admin.post('/admin/users/1/reset_password', data={'new_password': 'admin123'})
+    app.extensions['auditoria'].descarregar()
+    with app.app_context():
+        assert Auditoria.query.count() == 1
+        for comando in (update(Auditoria).values(depois=None), delete(Auditoria)):
+            with pytest.raises(IntegrityError, match='somente inserção'):
+                db.session.execute(comando)
+            db.session.rollback()
+        assert Auditoria.query.count() == 1
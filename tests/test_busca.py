@@ -0,0 +1,26 @@
+from app.models import db, PilotProfile
+
+# Busca textual (app/busca.py): a /api/search pública casa pilotos só pelo nick; o nome
+# real, que as páginas públicas não mostram, só aparece na busca da Direção de Prova.
+
+def _piloto(app):
+    with app.app_context():
+        piloto = PilotProfile.query.filter_by(nickname='ELITE-P0').one()
+        piloto.nome_real = 'Fulgencio Secreto'
+        db.session.commit()
+        return piloto.id
+
+def _pilotos(client, termo):
+    return client.get('/api/search', query_string={'q': termo, 'tipo': 'pilotos'}).get_json()['resultados']
+
+def test_busca_publica_nao_expoe_o_nome_real(app, client, admin):
+    piloto_id = _piloto(app)
+    # Direção de Prova (admin logado) acha pelo nome real
+    assert [r['id'] for r in _pilotos(admin, 'fulgencio')] == [piloto_id]
+    admin.get('/logout')
+
+    assert _pilotos(client, 'fulgencio') == []
+    assert _pilotos(client, 'secreto') == []
+    resultados = _pilotos(client, 'ELITE P0')
+    assert [r['id'] for r in resultados] == [piloto_id]
+    assert 'Fulgencio' not in resultados[0]['trecho'] and 'ELITE' in resultados[0]['trecho']
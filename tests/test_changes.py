@@ -0,0 +1,119 @@
+import json
+import os
+from app.models import db, DataVersion, ChangeLog, News, PilotProfile, Race, RaceResult, Season, Tarefa, Team
+from conftest import rodar_tarefas
+
+def _como_banco_migrado():
+    # Migrações 242456a7ad0c/f7a7a76f0ab2: tabelas de versão criadas vazias sobre dados existentes
+    ChangeLog.query.delete()
+    DataVersion.query.delete()
+    db.session.commit()
+
+def test_cliente_novo_recebe_tudo_em_banco_migrado(app, client):
+    with app.app_context():
+        _como_banco_migrado()
+        totais = {'pilots': PilotProfile.query.count(), 'teams': Team.query.count(), 'races': Race.query.count(),
+                  'results': RaceResult.query.count(), 'seasons': Season.query.count()}
+
+    resposta = client.get('/api/changes?since=0').get_json()
+    assert resposta['completo'] is True
+    for chave, total in totais.items():
+        assert len(resposta[chave]['alterados']) == total > 0
+
+    # Depois da primeira alteração registrada, quem parte do zero continua recebendo tudo
+    with app.app_context():
+        noticia = News(titulo='Nova', subtitulo='s', texto='t', autor_id=1)
+        db.session.add(noticia)
+        db.session.commit()
+        noticia_id = noticia.id
+    resposta = client.get('/api/changes?since=0').get_json()
+    assert resposta['completo'] is True
+    assert len(resposta['pilots']['alterados']) == totais['pilots']
+
+    # A partir daí, quem guardou a versão recebe só o delta
+    with app.app_context():
+        noticia = db.session.get(News, noticia_id)
+        noticia.titulo = 'Nova (editada)'
+        db.session.commit()
+    delta = client.get(f'/api/changes?since={resposta["versao"]}').get_json()
+    assert delta['completo'] is False
+    assert [n['id'] for n in delta['news']['alterados']] == [noticia_id]
+    assert delta['pilots'] == {'alterados': [], 'removidos': []}
+
+def test_delta_em_banco_novo(app, client):
+    versao = client.get('/api/changes?since=0').get_json()['versao']
+    with app.app_context():
+        piloto = PilotProfile.query.first()
+        piloto.nickname = 'Renomeado'
+        db.session.commit()
+        piloto_id = piloto.id
+    delta = client.get(f'/api/changes?since={versao}').get_json()
+    assert delta['completo'] is False
+    assert [p['id'] for p in delta['pilots']['alterados']] == [piloto_id]
+    assert delta['teams']['alterados'] == []
+
+def test_escrita_agenda_publicacao_para_o_worker(app, admin, tmp_path):
+    pagina = tmp_path / 'paginas' / 'news' / '{}.html'
+    rodar_tarefas(app)  # Publicação da carga inicial (semear)
+    for titulo in ('Primeira', 'Segunda'):
+        assert admin.post('/admin/news/new', data={'titulo': titulo, 'subtitulo': 's', 'texto': 't'}).status_code == 302
+    with app.app_context():
+        ids = [n.id for n in News.query.order_by(News.id)]
+        # A requisição só incrementou a versão e agendou a publicação
+        assert db.session.query(DataVersion.versao).scalar() > 0
+        fila = Tarefa.query.filter_by(tipo='PUBLICAR', status='PENDENTE').order_by(Tarefa.id).all()
+        assert [json.loads(t.parametros)['ids']['News'] for t in fila] == [[i] for i in ids]
+    assert not any(os.path.exists(str(pagina).format(i)) for i in ids)
+    assert not (tmp_path / 'api' / 'news.json').exists()
+
+    # Uma passada do worker publica as duas escritas juntas
+    rodar_tarefas(app)
+    assert all(os.path.exists(str(pagina).format(i)) for i in ids)
+    noticias = json.loads((tmp_path / 'api' / 'news.json').read_text())
+    assert {n['titulo'] for n in noticias} == {'Primeira', 'Segunda'}
+    with app.app_context():
+        publicacoes = Tarefa.query.filter_by(tipo='PUBLICAR').all()
+        assert [(t.status, t.resultado) for t in publicacoes] == [('CONCLUIDA', '2 escritas publicadas.')]
+
+def test_publicacao_vai_na_transacao_da_escrita(app):
+    with app.app_context():
+        Tarefa.query.delete()
+        db.session.commit()
+        versao = db.session.query(DataVersion.versao).scalar()
+
+        # Escrita desfeita: nem versão nova nem tarefa
+        db.session.add(News(titulo='Desfeita', subtitulo='s', texto='t', autor_id=1))
+        db.session.flush()
+        db.session.rollback()
+        assert Tarefa.query.count() == 0
+        assert db.session.query(DataVersion.versao).scalar() == versao
+
+        # Confirmada: a tarefa entra no mesmo commit, sem depender de nada depois dele
+        db.session.add(News(titulo='Confirmada', subtitulo='s', texto='t', autor_id=1))
+        db.session.commit()
+        tarefa = Tarefa.query.one()
+        assert (tarefa.tipo, tarefa.status) == ('PUBLICAR', 'PENDENTE')
+        assert json.loads(tarefa.parametros)['ids']['News'] == [News.query.filter_by(titulo='Confirmada').one().id]
+        assert db.session.query(DataVersion.versao).scalar() == versao + 1
+
+def test_cliente_a_frente_do_banco_recebe_tudo(app, client):
+    versao = client.get('/api/changes?since=0').get_json()['versao']
+    # Banco restaurado de um backup (ou outra liga): a versão do app está no futuro
+    resposta = client.get(f'/api/changes?since={versao + 10}').get_json()
+    assert resposta['completo'] is True
+    assert len(resposta['news']['alterados']) == 0 and len(resposta['pilots']['alterados']) > 0
+
+def test_change_log_e_podado_pelo_worker(app, client):
+    app.config['CHANGELOG_RETENCAO'] = 2
+    with app.app_context():
+        for i in range(4):
+            db.session.add(News(titulo=f'N{i}', subtitulo='s', texto='t', autor_id=1))
+            db.session.commit()
+        versao = db.session.query(DataVersion.versao).scalar()
+    rodar_tarefas(app)
+    with app.app_context():
+        assert sorted({v for (v,) in db.session.query(ChangeLog.versao)}) == [versao - 1, versao]
+    # Dentro da retenção: delta; mais atrás: snapshot completo
+    delta = client.get(f'/api/changes?since={versao - 2}').get_json()
+    assert delta['completo'] is False and [n['titulo'] for n in delta['news']['alterados']] == ['N2', 'N3']
+    assert client.get(f'/api/changes?since={versao - 3}').get_json()['completo'] is True
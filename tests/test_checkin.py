@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+from app.models import db, Race, RaceRegistration, Season
+from conftest import entrar
+
+def _corrida(app, grid, dias):
+    with app.app_context():
+        season = Season.query.filter_by(ativa=True).first()
+        race = Race(season_id=season.id, nome_gp=f'GP Check-in {grid}', pista='Interlagos', grid=grid,
+                    data_corrida=date.today() + timedelta(days=dias), status='Agendada')
+        db.session.add(race)
+        db.session.commit()
+        return race.id
+
+def _respostas(app):
+    with app.app_context():
+        return [(r.race_id, r.status) for r in RaceRegistration.query.all()]
+
+def test_checkin_da_corrida_aberta(app, client):
+    race_id = _corrida(app, 'ELITE', 1)
+    entrar(client, 'elite0@x.com')
+    assert client.post(f'/checkin/confirm/{race_id}').status_code == 302
+    assert client.post(f'/checkin/absent/{race_id}', data={'justificativa': 'viagem'}).status_code == 302
+    assert _respostas(app) == [(race_id, 'JUSTIFICADO')]
+
+def test_checkin_de_corrida_inexistente(app, client):
+    entrar(client, 'elite0@x.com')
+    assert client.post('/checkin/confirm/99999').status_code == 404
+    assert client.post('/checkin/absent/99999', data={'justificativa': 'x'}).status_code == 404
+    assert _respostas(app) == []
+
+def test_checkin_fora_do_grid_ou_da_janela(app, client):
+    outro_grid = _corrida(app, 'ADVANCED', 1)
+    distante = _corrida(app, 'ELITE', 20)
+    entrar(client, 'elite0@x.com')
+    for race_id in (outro_grid, distante):
+        assert client.post(f'/checkin/confirm/{race_id}').status_code == 302
+    assert _respostas(app) == []
@@ -0,0 +1,90 @@
+from datetime import date
+from app import confrontos, cubo, progressao, projecao, queries
+from app.changes import versao_dados, versao_temporada
+from app.models import db, News, PilotProfile, Race, RaceResult, Season
+
+# Cubos por versão da temporada (app/cubo.py, changes.versao_temporada): só escritas
+# que afetam a temporada descartam o cubo dela.
+
+def _nova_temporada():
+    season = Season(nome='Temporada 2', ativa=False, data_inicio=date(2027, 1, 1))
+    db.session.add(season)
+    db.session.flush()
+    race = Race(season_id=season.id, nome_gp='GP Novo', pista='Monza', grid='ELITE', data_corrida=date(2027, 1, 1),
+                status='Agendada', tipo_etapa='NORMAL')
+    db.session.add(race)
+    db.session.commit()
+    return season.id, race.id
+
+def test_escritas_de_fora_nao_descartam_o_cubo(app):
+    with app.app_context():
+        s1 = Season.query.filter_by(nome='Temporada 1').one().id
+        s2, race2 = _nova_temporada()
+        antes = cubo.cubo(s1)
+        season = db.session.get(Season, s1)
+        derivados = lambda: (confrontos.confrontos(s1, 'ELITE'), progressao.progressao(s1, 'ELITE'), projecao.projecoes(season))
+        derivados_antes = derivados()
+
+        db.session.add(News(titulo='Notícia', subtitulo='s', texto='t', autor_id=1))
+        db.session.commit()
+        piloto = PilotProfile.query.filter_by(grid='ELITE').first()
+        db.session.add(RaceResult(race_id=race2, pilot_id=piloto.id, posicao=1, pontos_ganhos=25.0))
+        piloto.telefone = '11999999999'
+        db.session.commit()
+        assert cubo.cubo(s1) is antes
+        assert all(a is b for a, b in zip(derivados(), derivados_antes))
+        assert versao_temporada(s2) == versao_dados() > versao_temporada(s1)
+
+        # Resultado da temporada: cubo novo
+        resultado = RaceResult.query.join(Race).filter(Race.season_id == s1).first()
+        resultado.pontos_ganhos += 1
+        db.session.commit()
+        depois = cubo.cubo(s1)
+        assert depois is not antes
+        assert not any(a is b for a, b in zip(derivados(), derivados_antes))
+        assert versao_temporada(s1) == versao_dados()
+
+        # Nickname/grid/equipe/penalidade do piloto entram no cubo de todas as temporadas
+        piloto.nickname = 'Renomeado'
+        db.session.commit()
+        assert cubo.cubo(s1) is not depois
+        assert versao_temporada(s1) == versao_temporada(s2) == versao_dados()
+
+def test_historico_de_carreira_confere_com_o_cubo(app):
+    with app.app_context():
+        season = Season.query.filter_by(nome='Temporada 1').one()
+        season.ativa = False
+        # Uma corrida do piloto em outro grid e um DNF na frente (não conta como vitória)
+        race = Race.query.filter_by(grid='ADVANCED', status='Concluida').first()
+        piloto = PilotProfile.query.filter_by(grid='ELITE').order_by(PilotProfile.id).first()
+        RaceResult.query.filter_by(race_id=race.id, posicao=1).update({'dnf': True})
+        db.session.add(RaceResult(race_id=race.id, pilot_id=piloto.id, posicao=1, pontos_ganhos=25.0))
+        db.session.commit()
+        temporada = cubo.cubo(season.id)
+
+        for p in PilotProfile.query.filter(PilotProfile.grid.in_(['ELITE', 'ADVANCED'])):
+            assert queries.historico_de_carreira(p.id) == [{'season_nome': 'Temporada 1', **temporada.resumo(p.id)}]
+        assert queries.historico_de_carreira(1) == []
+
+def test_cubo_e_por_banco(app, tmp_path):
+    # Dois bancos com a mesma temporada na mesma versão (testes, banco restaurado): cada um tem o seu cubo
+    from app import create_app
+    from app.cli import bootstrap_banco
+    from conftest import configuracao, semear
+    (tmp_path / 'outro').mkdir()
+    outro = create_app(configuracao(tmp_path / 'outro'))
+    with outro.app_context():
+        bootstrap_banco()
+        semear()
+    pontos = []
+    for a, extra in ((app, 0), (outro, 10)):
+        with a.app_context():
+            resultado = RaceResult.query.order_by(RaceResult.id).first()
+            resultado.pontos_ganhos += extra + 1
+            db.session.commit()
+            pontos.append((versao_temporada(resultado.race.season_id), float(cubo.cubo(resultado.race.season_id).pontos([resultado.pilot_id])[0])))
+    assert pontos[0][0] == pontos[1][0]
+    assert pontos[1][1] == pontos[0][1] + 10
+    with outro.app_context():
+        db.session.remove()
+        db.engine.dispose()
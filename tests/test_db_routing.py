@@ -0,0 +1,59 @@
+from flask import jsonify
+from sqlalchemy import update
+from app.db_routing import usar_engine_leitura
+from app.models import db, News, PilotProfile, User
+from conftest import entrar
+
+# Roteamento leitura/escrita (app/db_routing.py): GETs públicos leem do engine
+# somente leitura, mas qualquer escrita vai para o principal e prende a sessão nele.
+
+def _rotas(app):
+    @app.get('/_teste/dml')
+    def dml():
+        usar_engine_leitura()
+        db.session.execute(update(News).values(titulo='Editada'))
+        db.session.commit()
+        return jsonify(ok=True)
+
+    @app.get('/_teste/escreve-e-le')
+    def escreve_e_le():
+        usar_engine_leitura()
+        db.session.add(News(titulo='Nova', subtitulo='s', texto='t', autor_id=1))
+        db.session.flush()
+        # Ainda não confirmada: só aparece se a leitura for no mesmo engine da escrita
+        titulos = [n.titulo for n in News.query.all()]
+        db.session.rollback()
+        return jsonify(titulos=titulos, depois=[n.titulo for n in News.query.all()])
+
+    @app.get('/_teste/query-delete')
+    def query_delete():
+        usar_engine_leitura()
+        apagadas = News.query.delete()
+        db.session.commit()
+        return jsonify(apagadas=apagadas)
+
+def test_get_que_escreve_e_le(app, client):
+    _rotas(app)
+    with app.app_context():
+        db.session.add(News(titulo='Antiga', subtitulo='s', texto='t', autor_id=1))
+        db.session.commit()
+
+    assert client.get('/_teste/escreve-e-le').get_json() == {'titulos': ['Antiga', 'Nova'], 'depois': ['Antiga']}
+    assert client.get('/_teste/dml').status_code == 200
+    with app.app_context():
+        assert [n.titulo for n in News.query.all()] == ['Editada']
+    assert client.get('/_teste/query-delete').get_json() == {'apagadas': 1}
+    with app.app_context():
+        assert News.query.count() == 0
+
+def test_meu_perfil_de_admin_cria_o_perfil_no_get(app, client):
+    with app.app_context():
+        user = User(username='Comissario', email='comissario@x.com', role='ADM')
+        user.set_password('x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    entrar(client, 'comissario@x.com')
+    assert client.get('/meu-perfil').status_code == 200
+    with app.app_context():
+        assert PilotProfile.query.filter_by(user_id=user_id).one().grid == 'SEM_GRID'
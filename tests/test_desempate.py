@@ -0,0 +1,55 @@
+import numpy as np
+from flask import template_rendered
+from app.desempate import ordenar
+from app.models import db, User, PilotProfile, Race
+from conftest import entrar
+
+# Classificação com desempate (app/desempate.py): pontos, countback (vitórias, 2º lugares...),
+# melhor resultado mais recente e id; a mesma ordem em todas as telas.
+
+def test_ordenar_pelos_criterios_em_sequencia():
+    ids = [1, 2, 3, 4, 5, 6, 7]
+    pontos = [50, 50, 50, 50, 50, 50, 51]
+    # Colunas: vitórias, 2º lugares, 3º lugares
+    histograma = np.array([[1, 1, 0], [1, 1, 0], [1, 1, 0], [1, 1, 0], [1, 2, 0], [2, 0, 0], [0, 0, 3]])
+    ultima_melhor = [1, 1, 2, 3, 1, 1, 1]
+    ordem = [ids[i] for i in ordenar(ids, pontos, histograma, ultima_melhor)]
+    # 7: mais pontos, sem vitória; 6: mais vitórias; 5: mais 2º lugares; 4 e 3: melhor resultado
+    # mais recente; 1 e 2: empate em tudo, decide o id
+    assert ordem == [7, 6, 5, 4, 3, 1, 2]
+
+def _novo_piloto(nome):
+    user = User(username=nome, email=f'{nome.lower()}@x.com', role='PILOTO')
+    user.set_password('x')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(PilotProfile(user_id=user.id, nickname=nome, nome_real='Piloto', grid='ELITE'))
+
+def test_mesma_ordem_na_home_na_api_e_no_gerador_de_grid(app, client):
+    with app.app_context():
+        # Semeado: P0..P5 na 1ª etapa, ordem inversa na 2ª. Empates de pontos dois a dois
+        # (P0/P5, P1/P4, P2/P3), decididos pelo melhor resultado mais recente (2ª etapa)
+        PilotProfile.query.filter_by(nickname='ELITE-P4').one().penalidade_campeonato = 0.5
+        # Sem resultados: empate em zero decidido pelo id
+        _novo_piloto('Novato2')
+        _novo_piloto('Novato1')
+        db.session.commit()
+        race_id = Race.query.filter_by(grid='ELITE').order_by(Race.data_corrida).first().id
+    esperado = ['ELITE-P5', 'ELITE-P0', 'ELITE-P1', 'ELITE-P4', 'ELITE-P3', 'ELITE-P2', 'Novato2', 'Novato1']
+
+    contextos = {}
+    def guardar(_app, template, context, **_):
+        contextos[template.name] = context
+    entrar(client, 'admin@fullgas.com', 'admin123')
+    with template_rendered.connected_to(guardar, app):
+        client.get('/')
+        client.get(f'/admin/race/{race_id}/generate_grid')
+    home = contextos['home.html']['standings']['ELITE']
+    api = client.get('/api/standings/ELITE').get_json()
+
+    assert [l['piloto'].nickname for l in home] == esperado
+    assert [l['nickname'] for l in api] == esperado
+    assert [l['nickname'] for l in contextos['admin/grid_text.html']['lista']] == esperado
+    # A penalidade de campeonato sai dos pontos em todas as telas
+    assert [l['pontos'] for l in home] == [l['pontos'] for l in api]
+    assert api[esperado.index('ELITE-P4')]['pontos'] == api[esperado.index('ELITE-P1')]['pontos'] - 0.5
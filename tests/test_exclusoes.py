@@ -0,0 +1,120 @@
+from datetime import date
+import pytest
+from app import recordes
+from app.cli import orfaos
+from app.models import (db, User, PilotProfile, Race, RaceResult, RaceRegistration, Protesto, VotoComissario,
+                        SeletivaEntry, RecordePiloto, TituloTemporada, Season, News)
+from conftest import entrar, rodar_tarefas
+
+# Exclusões pelo ON DELETE CASCADE (migração 1834382713a8): nenhuma rota pode deixar
+# linhas órfãs (PRAGMA foreign_key_check vazio) nem dependentes para trás.
+
+def _contar(modelo, *filtros):
+    return modelo.query.filter(*filtros).count()
+
+@pytest.fixture
+def cenario(app):
+    """Piloto sem histórico e comissário ADM, cada um com check-in, protestos, votos, seletiva e recordes."""
+    with app.app_context():
+        race = Race.query.filter_by(grid='ELITE', status='Concluida').order_by(Race.id).first()
+        aberta = Race.query.filter_by(grid='ELITE', status='Agendada').order_by(Race.id).first()
+        rival = PilotProfile.query.filter_by(grid='ELITE').order_by(PilotProfile.id).first()
+
+        contas = {}
+        for nome, role in (('novato', 'PILOTO'), ('comissario', 'ADM')):
+            user = User(username=nome, email=f'{nome}@x.com', role=role)
+            user.set_password('x')
+            db.session.add(user)
+            db.session.flush()
+            perfil = PilotProfile(user_id=user.id, nickname=nome, nome_real='N', grid='ELITE')
+            db.session.add(perfil)
+            db.session.flush()
+            contas[nome] = (user, perfil)
+        novato, comissario = contas['novato'][1], contas['comissario'][0]
+
+        db.session.add(RaceRegistration(race_id=aberta.id, pilot_id=novato.id, status='CONFIRMADO'))
+        db.session.add(RaceRegistration(race_id=race.id, pilot_id=rival.id, status='CONFIRMADO'))
+        db.session.add(SeletivaEntry(pilot_id=novato.id, tempo_ms=95800, tempo_str='1:35.800'))
+        protestos = [Protesto(etapa_id=race.id, acusador_id=novato.id, acusado_id=rival.id, descricao='a'),
+                     Protesto(etapa_id=race.id, acusador_id=rival.id, acusado_id=novato.id, descricao='b'),
+                     Protesto(etapa_id=race.id, acusador_id=rival.id, acusado_id=rival.id, descricao='c')]
+        db.session.add_all(protestos)
+        db.session.flush()
+        for protesto in protestos:
+            db.session.add(VotoComissario(protesto_id=protesto.id, admin_id=comissario.id, escolha='ABSOLVIDO'))
+            db.session.add(VotoComissario(protesto_id=protesto.id, admin_id=1, escolha='ABSOLVIDO'))
+        db.session.add(News(titulo='Do comissário', subtitulo='s', texto='t', autor_id=comissario.id))
+
+        # Recordes: totais de todos e um título antigo do novato
+        arquivada = Season(nome='Temporada 0', ativa=False, data_inicio=date(2025, 1, 1))
+        db.session.add(arquivada)
+        db.session.flush()
+        db.session.add(TituloTemporada(season_id=arquivada.id, grid='ELITE', pilot_id=novato.id))
+        recordes.refazer()
+        db.session.commit()
+        assert orfaos() == {}
+        return {'race': race.id, 'novato': novato.id, 'novato_user': contas['novato'][0].id,
+                'comissario': comissario.id, 'comissario_perfil': contas['comissario'][1].id,
+                'protestos': [p.id for p in protestos]}
+
+def test_excluir_corrida(app, admin, cenario):
+    with app.app_context():
+        pilotos = [p for (p,) in db.session.query(RaceResult.pilot_id).filter_by(race_id=cenario['race'])]
+    admin.post(f'/admin/race/{cenario["race"]}/delete')
+    rodar_tarefas(app)
+    with app.app_context():
+        assert db.session.get(Race, cenario['race']) is None
+        assert _contar(RaceResult, RaceResult.race_id == cenario['race']) == 0
+        assert _contar(RaceRegistration, RaceRegistration.race_id == cenario['race']) == 0
+        assert _contar(Protesto, Protesto.id.in_(cenario['protestos'])) == 0
+        assert _contar(VotoComissario, VotoComissario.protesto_id.in_(cenario['protestos'])) == 0
+        # Recordes refeitos sem a corrida: sobra uma largada por piloto
+        assert {r.pilot_id: r.largadas for r in RecordePiloto.query.filter(RecordePiloto.pilot_id.in_(pilotos))} == \
+            {p: 1 for p in pilotos}
+        assert orfaos() == {}
+
+def test_excluir_piloto(app, admin, cenario):
+    admin.post(f'/admin/pilots/delete/{cenario["novato"]}')
+    rodar_tarefas(app)
+    with app.app_context():
+        novato = cenario['novato']
+        assert db.session.get(User, cenario['novato_user']) is None
+        assert db.session.get(PilotProfile, novato) is None
+        assert _contar(RaceRegistration, RaceRegistration.pilot_id == novato) == 0
+        assert _contar(SeletivaEntry, SeletivaEntry.pilot_id == novato) == 0
+        assert _contar(Protesto, (Protesto.acusador_id == novato) | (Protesto.acusado_id == novato)) == 0
+        assert _contar(VotoComissario, VotoComissario.protesto_id.in_(cenario['protestos'][:2])) == 0
+        assert _contar(RecordePiloto, RecordePiloto.pilot_id == novato) == 0
+        assert _contar(TituloTemporada, TituloTemporada.pilot_id == novato) == 0
+        # O protesto entre terceiros continua, com os dois votos
+        assert _contar(VotoComissario, VotoComissario.protesto_id == cenario['protestos'][2]) == 2
+        assert orfaos() == {}
+
+def test_excluir_admin(app, admin, cenario):
+    admin.post(f'/admin/users/{cenario["comissario"]}/delete')
+    rodar_tarefas(app)
+    with app.app_context():
+        assert db.session.get(User, cenario['comissario']) is None
+        assert db.session.get(PilotProfile, cenario['comissario_perfil']) is None
+        assert _contar(VotoComissario, VotoComissario.admin_id == cenario['comissario']) == 0
+        assert _contar(VotoComissario) == 3 # os votos do Super Admin ficam
+        assert News.query.filter_by(titulo='Do comissário').one().autor_id is None
+        assert orfaos() == {}
+
+def test_excluir_protesto_pelo_admin(app, admin, cenario):
+    protesto = cenario['protestos'][2]
+    admin.post(f'/admin/protests/{protesto}/delete')
+    with app.app_context():
+        assert db.session.get(Protesto, protesto) is None
+        assert _contar(VotoComissario, VotoComissario.protesto_id == protesto) == 0
+        assert _contar(Protesto) == 2
+        assert orfaos() == {}
+
+def test_excluir_protesto_pelo_acusador(app, client, cenario):
+    protesto = cenario['protestos'][0]
+    entrar(client, 'novato@x.com')
+    client.post(f'/protesto/{protesto}/delete')
+    with app.app_context():
+        assert db.session.get(Protesto, protesto) is None
+        assert _contar(VotoComissario, VotoComissario.protesto_id == protesto) == 0
+        assert orfaos() == {}
@@ -0,0 +1,85 @@
+import json
+import time
+import pytest
+from flask import g
+from app import create_app
+from app.cli import bootstrap_banco
+from app.models import db, News
+from conftest import configuracao, semear, entrar
+
+# Multi-ligas (app/ligas.py): cada liga do registro tem o seu banco, a sua sessão
+# de login e os seus engines; nada de uma pode aparecer na outra.
+
+SLUGS = ('liga-a', 'liga-b')
+
+@pytest.fixture
+def app(tmp_path):
+    registro = {slug: {'banco': str(tmp_path / f'{slug}.db')} for slug in SLUGS}
+    (tmp_path / 'ligas.json').write_text(json.dumps(registro))
+    app = create_app(configuracao(tmp_path, LIGAS_ARQUIVO=str(tmp_path / 'ligas.json')))
+    for slug in (None,) + SLUGS:
+        with app.app_context():
+            g.liga = slug
+            bootstrap_banco()
+            semear()
+    yield app
+    reg = app.extensions['ligas']
+    reg.despejar_ociosos(agora=time.monotonic() + reg.ociosidade + 1)
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+def _noticias(app, slug):
+    with app.app_context():
+        g.liga = slug
+        return [n.titulo for n in News.query.all()]
+
+def test_dados_de_uma_liga_nao_aparecem_na_outra(app, client):
+    entrar(client, 'admin@fullgas.com', 'admin123', prefixo='/liga-a')
+    resposta = client.post('/liga-a/admin/news/new', data={'titulo': 'Só da liga A', 'subtitulo': 's', 'texto': 't'})
+    assert resposta.status_code == 302
+
+    assert _noticias(app, 'liga-a') == ['Só da liga A']
+    assert _noticias(app, 'liga-b') == []
+    assert _noticias(app, None) == []
+    with app.app_context():
+        g.liga = 'liga-a'
+        news_id = News.query.one().id
+    assert client.get(f'/liga-a/news/{news_id}').status_code == 200
+    assert client.get(f'/liga-b/news/{news_id}').status_code == 404
+    assert 'Só da liga A' not in client.get('/liga-b/').get_data(as_text=True)
+
+def test_sessao_de_uma_liga_nao_vale_na_outra(app, client):
+    entrar(client, 'admin@fullgas.com', 'admin123', prefixo='/liga-a')
+    assert client.get('/liga-a/admin/dashboard').status_code == 200
+
+    # O cookie fica restrito a /liga-a; copiado para a raiz, chega à liga B com o mesmo user_id (1)
+    cookie = client.get_cookie('session', path='/liga-a')
+    assert cookie is not None
+    client.set_cookie('session', cookie.value, path='/')
+    resposta = client.get('/liga-b/admin/dashboard')
+    assert resposta.status_code == 302
+    assert '/login' in resposta.headers['Location']
+    # Nem no banco principal
+    assert client.get('/admin/dashboard').status_code == 302
+
+def test_engine_despejado_e_reaberto(app, client):
+    reg = app.extensions['ligas']
+    assert client.get('/liga-a/').status_code == 200
+    entrar(client, 'admin@fullgas.com', 'admin123', prefixo='/liga-b')
+    client.post('/liga-b/admin/news/new', data={'titulo': 'Antes do despejo', 'subtitulo': 's', 'texto': 't'})
+    antigo = reg.engine('liga-b')
+
+    assert sorted(reg.despejar_ociosos(agora=time.monotonic() + reg.ociosidade + 1)) == sorted(SLUGS)
+    assert reg.engines == {}
+
+    # O próximo acesso reabre o engine da liga certa, com os dados e a sessão de antes
+    assert 'Antes do despejo' in client.get('/liga-b/').get_data(as_text=True)
+    assert client.get('/liga-b/admin/dashboard').status_code == 200
+    assert list(reg.engines) == ['liga-b']
+    novo = reg.engine('liga-b')
+    assert novo is not antigo
+    assert str(novo.url) == reg.uri('liga-b')
+    client.post('/liga-b/admin/news/new', data={'titulo': 'Depois do despejo', 'subtitulo': 's', 'texto': 't'})
+    assert sorted(_noticias(app, 'liga-b')) == ['Antes do despejo', 'Depois do despejo']
+    assert _noticias(app, 'liga-a') == []
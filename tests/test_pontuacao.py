@@ -0,0 +1,45 @@
+from datetime import date, datetime, timedelta
+from app import pontuacao
+from app.models import db, PilotProfile, Protesto, Race, RaceResult, Season
+from app.utils import PONTUACAO_NORMAL, PERDA_ADVERTENCIAS
+
+def _advertencia(race, acusado, acusador, fechamento):
+    db.session.add(Protesto(etapa_id=race.id, acusado_id=acusado.id, acusador_id=acusador.id, descricao='x',
+                            status='CONCLUIDO', veredito_final='ADVERTENCIA', data_fechamento=fechamento))
+
+def test_advertencias_contadas_por_temporada(app):
+    with app.app_context():
+        s1 = Season.query.filter_by(nome='Temporada 1').one()
+        s1.ativa = False
+        pilotos = PilotProfile.query.filter_by(grid='ELITE').order_by(PilotProfile.id).all()
+        espalhado, concentrado, acusador = pilotos[:3]
+        etapas_s1 = Race.query.filter_by(season_id=s1.id, grid='ELITE', status='Concluida').order_by(Race.id).all()
+
+        s2 = Season(nome='Temporada 2', ativa=True, data_inicio=date(2027, 1, 1))
+        db.session.add(s2)
+        db.session.flush()
+        etapas_s2 = []
+        for r in range(3):
+            race = Race(season_id=s2.id, nome_gp=f'GP S2 {r}', pista='Interlagos', grid='ELITE',
+                        data_corrida=date(2027, 1, 1) + timedelta(days=7 * r), status='Concluida')
+            db.session.add(race)
+            db.session.flush()
+            etapas_s2.append(race)
+            for pos, piloto in enumerate(pilotos, 1):
+                db.session.add(RaceResult(race_id=race.id, pilot_id=piloto.id, team_id=piloto.team_id, posicao=pos,
+                                          pontos_ganhos=float(PONTUACAO_NORMAL[pos])))
+
+        inicio = datetime(2026, 2, 1)
+        # 2 advertências na temporada 1 e 1 na temporada 2: o contador zerou no encerramento, sem desconto
+        _advertencia(etapas_s1[0], espalhado, acusador, inicio)
+        _advertencia(etapas_s1[1], espalhado, acusador, inicio + timedelta(days=1))
+        _advertencia(etapas_s2[0], espalhado, acusador, inicio + timedelta(days=400))
+        # 3 advertências na temporada 2: desconto na etapa da terceira
+        for i, race in enumerate(etapas_s2):
+            _advertencia(race, concentrado, acusador, inicio + timedelta(days=401 + i))
+        db.session.commit()
+
+        diferencas = pontuacao.recalcular_temporada(s2.id)
+        assert [(d['race_id'], d['pilot_id'], d['antes'] - d['depois']) for d in diferencas] == \
+            [(etapas_s2[2].id, concentrado.id, PERDA_ADVERTENCIAS)]
+        assert pontuacao.recalcular_temporada(s1.id) == []
@@ -0,0 +1,38 @@
+from app.changes import Alteracoes
+from app.models import db, PilotProfile, Race, RaceResult, Team
+from app.prerender import paginas_afetadas
+from conftest import rodar_tarefas
+
+# Páginas refeitas a cada escrita (app/prerender.py): todo perfil do grid depende de
+# todos os resultados dele (posição no campeonato, evolução, confrontos diretos).
+
+def _perfis(grid):
+    return ({('piloto', p.id) for p in PilotProfile.query.filter_by(grid=grid)} |
+            {('equipe', t.id) for t in Team.query.filter_by(grid=grid)})
+
+def test_resultado_refaz_o_grid_inteiro(app):
+    with app.app_context():
+        resultado = RaceResult.query.join(Race).filter(Race.grid == 'ELITE').first()
+        alt = Alteracoes()
+        alt.registrar('RaceResult', resultado.id, {'race_id': [resultado.race_id], 'pilot_id': [resultado.pilot_id],
+                                                    'team_id': [resultado.team_id]}, ['pontos_ganhos'])
+        paginas = paginas_afetadas(alt)
+        assert _perfis('ELITE') | {('home', None)} == paginas
+        assert not paginas & _perfis('ADVANCED')
+
+def test_corrida_refaz_o_grid_inteiro(app):
+    with app.app_context():
+        race = Race.query.filter_by(grid='ADVANCED').first()
+        alt = Alteracoes()
+        alt.registrar('Race', race.id, {'season_id': [race.season_id], 'grid': [race.grid]}, ['status'])
+        assert paginas_afetadas(alt) == _perfis('ADVANCED') | {('home', None)}
+
+def test_colega_de_grid_e_refeito_pelo_worker(app, admin, tmp_path):
+    with app.app_context():
+        resultado = RaceResult.query.join(Race).filter(Race.grid == 'ELITE').order_by(RaceResult.id).first()
+        colega = PilotProfile.query.filter(PilotProfile.grid == 'ELITE', PilotProfile.id != resultado.pilot_id).first().id
+        resultado.pontos_ganhos += 100
+        db.session.commit()
+    rodar_tarefas(app)
+    # O colega não estava no resultado, mas a posição dele no campeonato mudou
+    assert (tmp_path / 'paginas' / 'piloto' / f'{colega}.html').exists()
@@ -0,0 +1,58 @@
+import time
+import numpy as np
+from config import Config
+from app.projecao import BONUS_MAXIMO, eliminacao, simular
+from app.pontuacao import tabela_pontos
+
+# Projeção do campeonato (app/projecao.py): eliminação matemática exata e Monte Carlo.
+
+def _maximo(pontos, etapas):
+    # Vencer todas as etapas que faltam com todos os bônus
+    return np.asarray(pontos, dtype=float) + etapas * (tabela_pontos()[1] + BONUS_MAXIMO)
+
+def test_piloto_fora_e_titulo_garantido():
+    pontos = np.array([200.0, 150.0, 100.0, 10.0])
+    chances = eliminacao(pontos, _maximo(pontos, 2), vagas=3)  # máximo = pontos + 76
+    assert chances['pode_titulo'].tolist() == [True, True, False, False]
+    assert chances['pode_top3'].tolist() == [True, True, True, False]
+    assert chances['pode_zona'].tolist() == [True, True, True, False]
+    assert not chances['campeao'].any()
+
+    # Uma etapa a menos: ninguém mais alcança o líder
+    chances = eliminacao(pontos, _maximo(pontos, 1), vagas=3)  # máximo = pontos + 38
+    assert chances['campeao'].tolist() == [True, False, False, False]
+    assert chances['pode_titulo'].tolist() == [True, False, False, False]
+
+def test_empate_no_maximo_fica_em_aberto():
+    pontos = np.array([138.0, 100.0, 50.0])
+    chances = eliminacao(pontos, _maximo(pontos, 1))  # o 2º chega a 138: empate, decide o countback
+    assert chances['pode_titulo'].tolist() == [True, True, False]
+    assert not chances['campeao'][0]
+
+def test_sem_vagas_ninguem_pode_zona():
+    pontos = np.array([30.0, 20.0, 10.0])
+    chances = eliminacao(pontos, _maximo(pontos, 5), vagas=0)
+    assert not chances['pode_zona'].any()
+    _, _, zona = simular(pontos, np.full(3, 20.0), np.full(3, 0.1), np.ones(5), 1000, np.random.default_rng(0), vagas=0)
+    assert not zona.any()
+
+def test_simulacao_sorteia_os_bonus():
+    # Uma etapa e dois pilotos: o 2º só passa vencendo (35 x 6 + 30) e levando mais bônus que o líder
+    pontos = np.array([6.0, 0.0])
+    titulo, _, _ = simular(pontos, np.full(2, 20.0), np.zeros(2), np.ones(1), 5000, np.random.default_rng(1))
+    assert eliminacao(pontos, _maximo(pontos, 1))['pode_titulo'].all()
+    assert 0 < titulo[1] < titulo[0]
+
+def test_tempo_da_simulacao_de_um_grid_grande():
+    n, etapas = 20, 10
+    rng = np.random.default_rng(0)
+    pontos = np.sort(rng.integers(0, 600, n)).astype(float)[::-1]
+    inicio = time.perf_counter()
+    titulo, _, _ = simular(pontos, rng.uniform(10, 35, n), np.full(n, 0.1), np.ones(etapas),
+                           Config.PROJECAO_SIMULACOES, rng, vagas=3)
+    # ~200 ms nesta configuração (comentário de PROJECAO_SIMULACOES); folga para máquinas lentas
+    assert time.perf_counter() - inicio < 2.0
+    assert np.isclose(titulo.sum(), 1)
+    # Quem está matematicamente fora nunca é campeão na simulação
+    eliminados = ~eliminacao(pontos, _maximo(pontos, etapas))['pode_titulo']
+    assert eliminados.any() and not titulo[eliminados].any()
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime
+import pytest
+from flask import g
+from app import create_app
+from app.cli import bootstrap_banco
+from app.models import db, PilotProfile, Race, Team, Protesto, VotoComissario
+from app.queries import LIMITE_CONSULTAS, LIMITE_CONSULTAS_FRIO
+from conftest import configuracao, semear, entrar
+
+# Limite de comandos SQL por tela (LIMITE_CONSULTAS em app/queries.py), medido
+# pelo cabeçalho X-Consultas com QUERY_BUDGETS ligado.
+
+def semear_protestos():
+    """Protestos em cada situação do tribunal, com votos, para as relações aparecerem nas telas."""
+    race = Race.query.filter_by(grid='ELITE', status='Concluida').first()
+    pilotos = PilotProfile.query.filter_by(grid='ELITE').order_by(PilotProfile.id).all()
+    for i, status in enumerate(['AGUARDANDO_DEFESA', 'EM_VOTACAO', 'CONCLUIDO'] * 3):
+        protesto = Protesto(etapa_id=race.id, acusador_id=pilotos[i % 6].id, acusado_id=pilotos[(i + 1) % 6].id,
+                            descricao='Toque', status=status)
+        if status == 'CONCLUIDO':
+            protesto.veredito_final, protesto.data_fechamento = 'ABSOLVIDO', datetime(2026, 1, 2)
+        db.session.add(protesto)
+        db.session.flush()
+        db.session.add(VotoComissario(protesto_id=protesto.id, admin_id=1, escolha='ABSOLVIDO'))
+    db.session.commit()
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(configuracao(tmp_path, QUERY_BUDGETS=True))
+    with app.app_context():
+        bootstrap_banco()
+        semear()
+        semear_protestos()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+def _urls(app, liga=None):
+    with app.app_context():
+        g.liga = liga
+        race = Race.query.filter_by(grid='ELITE', status='Concluida').first()
+        team = Team.query.filter_by(grid='ELITE').first()
+        piloto = PilotProfile.query.filter_by(grid='ELITE').order_by(PilotProfile.id).first()
+        return {
+            'public.home': '/',
+            'public.public_profile': f'/piloto/{piloto.id}',
+            'admin.overview': '/admin/overview',
+            'admin.race_results': f'/admin/race/{race.id}/results',
+            'admin.list_pilots': '/admin/pilots',
+            'admin.protests': '/admin/protests',
+            'admin.edit_team': f'/admin/teams/edit/{team.id}',
+        }
+
+def _consultas(client, url):
+    # Duas vezes: a primeira monta os caches por versão (X-Consultas-Cache), a segunda é a tela de sempre
+    client.get(url)
+    resposta = client.get(url)
+    assert resposta.status_code == 200
+    return int(resposta.headers['X-Consultas'])
+
+def test_todas_as_telas_tem_limite(app):
+    assert set(_urls(app)) == set(LIMITE_CONSULTAS)
+
+@pytest.mark.parametrize('endpoint', sorted(LIMITE_CONSULTAS))
+def test_limite_de_consultas(app, admin, endpoint):
+    consultas = _consultas(admin, _urls(app)[endpoint])
+    assert 0 < consultas <= LIMITE_CONSULTAS[endpoint]
+
+@pytest.mark.parametrize('endpoint', sorted(LIMITE_CONSULTAS_FRIO))
+def test_limite_com_os_caches_frios(app, admin, endpoint):
+    # Primeira requisição no banco novo: a tela monta o cubo e os derivados, e tudo conta
+    resposta = admin.get(_urls(app)[endpoint])
+    assert resposta.status_code == 200
+    cache = int(resposta.headers['X-Consultas-Cache'])
+    assert cache > 0
+    assert int(resposta.headers['X-Consultas']) + cache <= LIMITE_CONSULTAS_FRIO[endpoint]
+
+def test_home_sem_login(app, client):
+    assert 0 < _consultas(client, '/') < LIMITE_CONSULTAS['public.home']
+
+def test_consultas_das_ligas_sao_contadas(tmp_path):
+    (tmp_path / 'ligas.json').write_text(json.dumps({'liga-a': {'banco': str(tmp_path / 'liga-a.db')}}))
+    app = create_app(configuracao(tmp_path, QUERY_BUDGETS=True, LIGAS_ARQUIVO=str(tmp_path / 'ligas.json')))
+    with app.app_context():
+        g.liga = 'liga-a'
+        bootstrap_banco()
+        semear()
+        semear_protestos()
+    client = app.test_client()
+    entrar(client, 'admin@fullgas.com', 'admin123', prefixo='/liga-a')
+    for endpoint, url in _urls(app, 'liga-a').items():
+        consultas = _consultas(client, f'/liga-a{url}')
+        assert 0 < consultas <= LIMITE_CONSULTAS[endpoint], endpoint
+    app.extensions['ligas'].despejar_ociosos(agora=float('inf'))
+    with app.app_context():
+        db.engine.dispose()
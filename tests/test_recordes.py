@@ -0,0 +1,46 @@
+from sqlalchemy import event
+from app import recordes
+from app.models import db, PilotProfile, RecordePiloto
+from app.utils import RECORDES_MIN_LARGADAS
+
+# Recordes de todos os tempos (app/recordes.py): o top de cada categoria sai do banco
+# já ordenado e limitado, uma consulta por categoria, qualquer que seja o tamanho da liga.
+
+def _esperado(linhas, chave, limite):
+    # Ordem da página, sobre todas as linhas
+    if chave == 'taxa_dnf':
+        candidatos = [r for r in linhas if r['largadas'] >= RECORDES_MIN_LARGADAS]
+        candidatos.sort(key=lambda r: (r['dnfs'] / r['largadas'], -r['largadas'], r['nickname']))
+    else:
+        candidatos = [r for r in linhas if r[chave]]
+        candidatos.sort(key=lambda r: (-r[chave], r['largadas'], r['nickname']))
+    return [r['pilot_id'] for r in candidatos[:limite]]
+
+def test_top_de_cada_categoria(app):
+    with app.app_context():
+        pilotos = PilotProfile.query.order_by(PilotProfile.id).all()
+        db.session.query(RecordePiloto).delete()
+        linhas = []
+        for i, piloto in enumerate(pilotos):
+            # Empates em cada categoria, decididos por largadas e nick; alguns zerados e abaixo do mínimo de largadas
+            linha = {'pilot_id': piloto.id, 'largadas': 3 + i % 4, 'vitorias': i % 3, 'podios': (i * 2) % 5,
+                     'titulos': i % 2, 'voltas_rapidas': 0 if i % 4 else 1, 'pilotos_do_dia': i % 3,
+                     'dnfs': i % 3, 'pontos': 10.0 * i}
+            db.session.add(RecordePiloto(**linha))
+            linhas.append({**linha, 'nickname': piloto.nickname})
+        db.session.commit()
+
+        consultas = []
+        ouvinte = lambda *args: consultas.append(1)
+        event.listen(db.engine, 'before_cursor_execute', ouvinte)
+        try:
+            tabelas = recordes.recordes(limite=3)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', ouvinte)
+
+    assert len(consultas) == len(recordes.CATEGORIAS)
+    for chave, _ in recordes.CATEGORIAS:
+        assert [p['id'] for p in tabelas[chave]['pilotos']] == _esperado(linhas, chave, 3), chave
+    dnf = tabelas['taxa_dnf']['pilotos'][0]
+    linha = next(r for r in linhas if r['pilot_id'] == dnf['id'])
+    assert dnf['valor'] == round(linha['dnfs'] / linha['largadas'] * 100, 1)
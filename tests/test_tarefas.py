@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app import pontuacao, tarefas
+from app.models import db, Race, RaceResult, Season, Tarefa
+from conftest import rodar_tarefas
+
+# Tarefas em segundo plano (app/tarefas.py): lotes com cursor gravado, retomada
+# depois que a reserva de um worker morto vence e uma tarefa ativa por chave.
+
+def _bagunçar_pontos():
+    # Todos os resultados da temporada com pontos errados: o recálculo tem o que gravar
+    for r in RaceResult.query:
+        r.pontos_ganhos += 1
+    db.session.commit()
+    return RaceResult.query.count()
+
+def test_recalculo_retoma_depois_do_worker_morto(app, monkeypatch):
+    app.config['TAREFAS_LOTE'] = 5
+    rodar_tarefas(app)  # Publicações da carga inicial
+    with app.app_context():
+        season_id = Season.query.one().id
+        total = _bagunçar_pontos()
+        Tarefa.query.delete()
+        db.session.commit()
+        tarefa, _ = tarefas.agendar('RECALCULAR_PONTOS', f'pontos:{season_id}', 'Recalcular', {'season_id': season_id})
+        tarefa_id = tarefa.id
+
+    calculos, passos = [], []
+    recalcular = pontuacao.recalcular_temporada
+    monkeypatch.setattr(pontuacao, 'recalcular_temporada', lambda *a, **k: calculos.append(a) or recalcular(*a, **k))
+    passo = tarefas.TIPOS['RECALCULAR_PONTOS']
+    def morre_no_terceiro_lote(*args):
+        passos.append(1)
+        if len(passos) == 3:
+            raise KeyboardInterrupt  # Processo morto: nada de FALHOU, a reserva fica
+        return passo(*args)
+    monkeypatch.setitem(tarefas.TIPOS, 'RECALCULAR_PONTOS', morre_no_terceiro_lote)
+
+    with pytest.raises(KeyboardInterrupt):
+        rodar_tarefas(app)
+    with app.app_context():
+        db.session.rollback()
+        tarefa = db.session.get(Tarefa, tarefa_id)
+        assert (tarefa.status, tarefa.feito, tarefa.total) == ('EXECUTANDO', 10, total)
+        # Reserva ainda valendo: outro worker não assume
+        rodar_tarefas(app)
+        db.session.refresh(tarefa)
+        assert tarefa.feito == 10
+        tarefa.reservada_ate = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+    rodar_tarefas(app)
+    # A temporada foi recalculada uma vez: os lotes (inclusive os da retomada) só seguem o cursor
+    assert len(calculos) == 1
+    assert len(passos) == -(-total // 5) + 1  # Lotes de 5, mais o que morreu
+    with app.app_context():
+        tarefa = db.session.get(Tarefa, tarefa_id)
+        assert (tarefa.status, tarefa.feito) == ('CONCLUIDA', total)
+        assert recalcular(season_id) == []
+
+def test_segundo_disparo_reaproveita_a_tarefa_ativa(app, admin):
+    with app.app_context():
+        season = Season.query.one()
+        _bagunçar_pontos()
+        season_id, nome = season.id, season.nome
+    for _ in range(2):
+        assert admin.post(f'/admin/seasons/{season_id}/recalcular').status_code == 302
+    with app.app_context():
+        ativas = Tarefa.query.filter_by(tipo='RECALCULAR_PONTOS').all()
+        assert [(t.chave, t.status) for t in ativas] == [(f'pontos:{season_id}', 'PENDENTE')]
+        # O índice único parcial barra outra tarefa ativa com a mesma chave, mesmo fora de tarefas.agendar
+        db.session.add(Tarefa(tipo='RECALCULAR_PONTOS', chave=f'pontos:{season_id}', descricao=f'Recalcular pontos de {nome}'))
+        with pytest.raises(IntegrityError, match='tarefa.chave'):
+            db.session.commit()
+        db.session.rollback()
+
+    # Terminada, a chave fica livre para um novo disparo
+    rodar_tarefas(app)
+    assert admin.post(f'/admin/seasons/{season_id}/recalcular').status_code == 302
+    with app.app_context():
+        assert [t.status for t in Tarefa.query.filter_by(tipo='RECALCULAR_PONTOS').order_by(Tarefa.id)] == ['CONCLUIDA', 'PENDENTE']
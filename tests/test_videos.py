@@ -0,0 +1,107 @@
+import hashlib
+import os
+import pytest
+from app.models import db, PilotProfile, Protesto, Race, VideoProtesto
+from conftest import entrar
+
+# Vídeos dos protestos enviados em partes (app/videos.py): ordem, integridade,
+# repetição idempotente, substituição do vídeo anterior e Range para o player.
+
+PARTE = 1024
+
+@pytest.fixture
+def protesto_id(app):
+    app.config['VIDEOS_PARTE'] = PARTE
+    with app.app_context():
+        race = Race.query.filter_by(grid='ELITE', status='Concluida').first()
+        acusador, acusado = PilotProfile.query.filter_by(grid='ELITE').order_by(PilotProfile.id)[:2]
+        protesto = Protesto(etapa_id=race.id, acusador_id=acusador.id, acusado_id=acusado.id, descricao='Toque',
+                            status='AGUARDANDO_DEFESA')
+        db.session.add(protesto)
+        db.session.commit()
+        return protesto.id
+
+def _abrir(client, protesto_id, conteudo, nome='lance.mp4'):
+    resposta = client.post(f'/protesto/{protesto_id}/video/acusacao', json={'nome': nome, 'tamanho': len(conteudo)})
+    assert resposta.status_code == 200
+    return resposta.get_json()['url']
+
+def _parte(client, url, conteudo, offset, sha=None):
+    dados = conteudo[offset:offset + PARTE]
+    return client.put(url, query_string={'offset': offset}, data=dados,
+                      headers={'X-Parte-SHA256': sha or hashlib.sha256(dados).hexdigest()})
+
+def _enviar(client, url, conteudo):
+    for offset in range(0, len(conteudo), PARTE):
+        resposta = _parte(client, url, conteudo, offset)
+        assert resposta.status_code == 200
+    return resposta.get_json()
+
+def _arquivo(app, video_id):
+    with app.app_context():
+        return os.path.join(app.config['VIDEOS_FOLDER'], db.session.get(VideoProtesto, video_id).arquivo)
+
+def test_envio_em_partes(app, client, protesto_id):
+    entrar(client, 'elite0@x.com')
+    conteudo = os.urandom(2 * PARTE + 300)
+    url = _abrir(client, protesto_id, conteudo)
+    video_id = int(url.rsplit('/', 1)[-1])
+
+    # Fora de ordem: 409 com o que já chegou
+    resposta = _parte(client, url, conteudo, PARTE)
+    assert resposta.status_code == 409 and resposta.get_json()['recebido'] == 0
+
+    # Hash que não confere: 422 e nada da parte fica no disco
+    resposta = _parte(client, url, conteudo, 0, sha='0' * 64)
+    assert resposta.status_code == 422 and resposta.get_json()['recebido'] == 0
+    assert os.path.getsize(_arquivo(app, video_id)) == 0
+
+    # Parte repetida (resposta perdida na rede): só devolve o estado
+    for _ in range(2):
+        resposta = _parte(client, url, conteudo, 0)
+        assert resposta.status_code == 200 and resposta.get_json()['recebido'] == PARTE
+    assert os.path.getsize(_arquivo(app, video_id)) == PARTE
+
+    estado = _enviar(client, url, conteudo)
+    assert (estado['status'], estado['recebido']) == ('COMPLETO', len(conteudo))
+    with open(_arquivo(app, video_id), 'rb') as f:
+        assert f.read() == conteudo
+
+    # Direção de Prova assiste com Range: 206 só com o trecho pedido
+    client.get('/logout')
+    entrar(client, 'admin@fullgas.com', 'admin123')
+    resposta = client.get(f'/admin/protests/{protesto_id}/video/acusacao', headers={'Range': 'bytes=100-299'})
+    assert resposta.status_code == 206
+    assert resposta.get_data() == conteudo[100:300]
+    assert resposta.headers['Content-Range'] == f'bytes 100-299/{len(conteudo)}'
+
+def test_novo_video_substitui_o_anterior_depois_do_commit(app, client, protesto_id, monkeypatch):
+    entrar(client, 'elite0@x.com')
+    primeiro = os.urandom(PARTE + 10)
+    url = _abrir(client, protesto_id, primeiro)
+    _enviar(client, url, primeiro)
+    antigo_id = int(url.rsplit('/', 1)[-1])
+    antigo = _arquivo(app, antigo_id)
+
+    segundo = os.urandom(PARTE + 20)
+    url = _abrir(client, protesto_id, segundo, nome='outro.mp4')
+    assert _parte(client, url, segundo, 0).status_code == 200
+
+    # Commit da última parte falha: o vídeo anterior continua no banco e no disco
+    def falha():
+        raise RuntimeError('banco fora do ar')
+    monkeypatch.setattr(db.session, 'commit', falha)
+    with pytest.raises(RuntimeError):
+        _parte(client, url, segundo, PARTE)
+    monkeypatch.undo()
+    with app.app_context():
+        assert db.session.get(VideoProtesto, antigo_id).status == 'COMPLETO'
+    assert os.path.exists(antigo)
+
+    # Reenviada a última parte: substitui o anterior, que sai do banco e do disco
+    estado = _enviar(client, url, segundo)
+    assert estado['status'] == 'COMPLETO'
+    with app.app_context():
+        assert db.session.get(VideoProtesto, antigo_id) is None
+        assert db.session.get(Protesto, protesto_id).video_enviado('ACUSACAO').id == estado['id']
+    assert not os.path.exists(antigo)